@@ -1,16 +1,21 @@
 """Main application file for the ZASCA Report Generator."""
 
-import asyncio
 import streamlit as st
-from src.ui import tabs, data_tabs, report, sidebar
+from src.ui import tabs, data_tabs, report, sidebar, diagnostics
 from src.data.loaders import load_data
 from src.utils.state import init_session_state
 from src.utils.errors import safe_operation, show_error
 from src.utils.constants import MESSAGES
+from src.services.runtime import run
+from src.services.throughput import record_run
+from src.utils.metrics import collect_metrics
+from src.utils.telemetry import configure_telemetry
 
 
 async def main() -> None:
     """Main application function."""
+    configure_telemetry()
+
     # Initialize session state
     session_state = init_session_state()
 
@@ -28,12 +33,25 @@ async def main() -> None:
 
     # Render sidebar elements
     uploaded_file = sidebar.render_file_uploader()
-    model_name, generate_report, skip_editing = sidebar.render_sidebar_controls()
+    (
+        model_name,
+        generate_report,
+        estimate_report,
+        skip_editing,
+        summary_mode,
+        batch_sections,
+        routing_policy,
+        diagnostics_container,
+    ) = sidebar.render_sidebar_controls()
 
     if uploaded_file:
         try:
             # Load and process data
-            df = safe_operation(load_data, "file_error", uploaded_file)
+            with collect_metrics() as ingest_metrics:
+                df = safe_operation(load_data, "file_error", uploaded_file)
+            # Nothing is recorded when the data comes from the cache
+            if ingest_metrics.records:
+                session_state.run_metrics["ingest"] = ingest_metrics
             if df is None:
                 return
 
@@ -49,28 +67,68 @@ async def main() -> None:
             with data_tab3:
                 data_tabs.render_variable_selector(df)
 
-            if generate_report:
-                error = await sidebar.handle_report_generation(
-                    df, cohort_info, model_name, skip_editing
+            if estimate_report:
+                error = sidebar.handle_preflight_estimate(
+                    df,
+                    cohort_info,
+                    model_name,
+                    skip_editing,
+                    summary_mode,
+                    batch_sections,
+                    routing_policy,
                 )
                 if error:
                     st.error(error)
 
-            # Display download buttons and results if report is finalised
-            if session_state.report_finalised:
-                # Show persistent success message
-                if session_state.success_message:
-                    st.sidebar.success(session_state.success_message)
+            if generate_report:
+                with collect_metrics() as generation_metrics:
+                    error = await sidebar.handle_report_generation(
+                        df,
+                        cohort_info,
+                        model_name,
+                        skip_editing,
+                        summary_mode,
+                        batch_sections,
+                        routing_policy,
+                    )
+                session_state.run_metrics["generation"] = generation_metrics
+                session_state.run_metrics.pop("output", None)
+                if error:
+                    st.error(error)
+                else:
+                    # Keeps the latency of the pre-flight estimates up to date
+                    record_run(generation_metrics)
+
+        except Exception as e:  # pylint: disable=broad-except
+            show_error(MESSAGES["errors"]["unexpected_error"].format(str(e)))
+
+    # Reports generated earlier can be loaded without uploading the data again
+    report.render_stored_reports()
 
+    # Display download buttons and results if report is finalised
+    if session_state.report_finalised:
+        try:
+            # Show persistent success message
+            if session_state.success_message:
+                st.sidebar.success(session_state.success_message)
+
+            with collect_metrics() as output_metrics:
                 report.render_download_buttons(session_state)
                 report.render_report_results(session_state)
 
                 # Add visualisation downloads to sidebar
                 sidebar.render_download_visualisations(session_state)
+            if output_metrics.records:
+                session_state.run_metrics["output"] = output_metrics
 
         except Exception as e:  # pylint: disable=broad-except
             show_error(MESSAGES["errors"]["unexpected_error"].format(str(e)))
 
+    if session_state.show_diagnostics:
+        diagnostics.render_diagnostics(
+            diagnostics_container, session_state.run_metrics
+        )
+
     # Footer with Logos
     st.markdown("---")
     _, col1, _, col3, _ = st.columns([1, 2, 3, 2, 1])
@@ -81,4 +139,4 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
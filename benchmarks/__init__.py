@@ -0,0 +1 @@
+"""Benchmarks for the report generation pipeline."""
@@ -0,0 +1,205 @@
+"""End-to-end benchmark of the report pipeline against the offline LLM stand-in.
+
+Runs the report pipeline (src/pipeline/report.py) as the Streamlit "Generar Reporte"
+button does (aggregation, section generation, executive summary, editing and JSON
+output) with the LLM calls served by services/fake_llm, and reports wall time per
+stage with p50/p95/max over all runs. --targets adds the Word documents and charts.
+Results are reproducible for a given seed and fake provider configuration.
+
+Usage:
+    python -m benchmarks.pipeline --data cohorte.xlsx --runs 5 --concurrency 4
+    python -m benchmarks.pipeline --firms 500 --runs 5
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List
+from src.services.fake_llm import FakeLLMConfig, FakeLLMServer
+from src.services.runtime import run
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarise(timings: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """Compute p50, p95 and max of every stage over all runs."""
+    stages = {stage for timing in timings for stage in timing}
+    return {
+        stage: {
+            "p50": round(percentile(values, 50), 3),
+            "p95": round(percentile(values, 95), 3),
+            "max": round(max(values), 3),
+        }
+        for stage in sorted(stages)
+        for values in [[timing[stage] for timing in timings if stage in timing]]
+    }
+
+
+async def run_report(
+    df, sections_config: dict, args: argparse.Namespace, cohort_info: str
+) -> Dict[str, float]:
+    """Generate one report and return the wall time of each pipeline stage."""
+    # pylint: disable=import-outside-toplevel
+    from src.pipeline.report import ReportOptions
+    from src.pipeline.report import run_report as run_pipeline
+
+    timings = {}
+
+    def on_event(event) -> None:
+        if event.duration_s is not None:
+            timings[event.stage] = event.duration_s
+
+    start = time.perf_counter()
+    await run_pipeline(
+        cohort_info,
+        ReportOptions(
+            model_name=args.model,
+            skip_editing=not args.edit,
+            summary_mode=args.summary_mode,
+            batch_sections=args.batch_sections,
+            routing_policy=args.routing_policy,
+        ),
+        df=df,
+        selected_config=sections_config,
+        targets=args.targets,
+        on_event=on_event,
+    )
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+async def run_benchmark(args: argparse.Namespace, server: FakeLLMServer) -> Dict:
+    """Run all benchmark rounds and collect the results."""
+    # pylint: disable=import-outside-toplevel
+    from src.data.loaders import load_data
+    from src.data.availability import process_sections_config
+
+    if args.firms:
+        # pylint: disable=import-outside-toplevel
+        from src.data.synthetic import SyntheticCohortConfig, write_cohort
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            df = load_data(
+                write_cohort(
+                    SyntheticCohortConfig(n_firms=args.firms, seed=args.fake_seed),
+                    os.path.join(data_dir, "cohorte.xlsx"),
+                )
+            )
+    else:
+        df = load_data(args.data)
+    _, sections_config, _ = process_sections_config(df)
+
+    timings = []
+    round_walls = []
+    with tempfile.TemporaryDirectory() as store_dir:
+        # Reports stored by the report_id / stored_* targets are discarded afterwards
+        os.environ["ZASCA_REPORT_STORE"] = store_dir
+        for round_id in range(args.runs):
+            round_start = time.perf_counter()
+            # Each concurrent report gets its own cohort info, and so its own prompts:
+            # identical reports would be coalesced into the LLM calls of a single one
+            results = await asyncio.gather(
+                *(
+                    run_report(
+                        df, sections_config, args, f"{args.cohort_info}, reporte: {i}"
+                    )
+                    for i in range(1, args.concurrency + 1)
+                )
+            )
+            round_walls.append(time.perf_counter() - round_start)
+            timings.extend(results)
+            logger.info("Round %d/%d: %.2fs", round_id + 1, args.runs, round_walls[-1])
+
+    return {
+        "settings": {
+            key: value for key, value in vars(args).items() if key not in ("output",)
+        },
+        "stages": summarise(timings),
+        "round_wall_s": summarise([{"round": wall} for wall in round_walls])["round"],
+        "reports_per_minute": round(60 * len(timings) / sum(round_walls), 2),
+        "provider": dict(server.stats),
+    }
+
+
+def main() -> None:
+    """Parse arguments, start the stand-in and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    data = parser.add_mutually_exclusive_group(required=True)
+    data.add_argument("--data", help="Excel workbook with cohort data")
+    data.add_argument(
+        "--firms", type=int, help="Use a synthetic cohort with this many firms"
+    )
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    parser.add_argument("--runs", type=int, default=3, help="Number of rounds")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Reports generated concurrently per round",
+    )
+    parser.add_argument(
+        "--summary-mode",
+        default="standard",
+        choices=["standard", "hierarchical", "speculative"],
+    )
+    parser.add_argument("--batch-sections", action="store_true")
+    parser.add_argument(
+        "--routing-policy",
+        default="selected",
+        choices=["selected", "balanced", "economy"],
+        help="Model routing policy (see ROUTING_POLICIES)",
+    )
+    parser.add_argument("--edit", action="store_true", help="Run the editing step")
+    parser.add_argument(
+        "--targets",
+        nargs="+",
+        default=["report_json", "executive_summary", "edited_output"],
+        help="Pipeline values to compute, e.g. report_json docx charts",
+    )
+    parser.add_argument("--cohort-info", default="centro: Benchmark, cohorte: 1")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    for name, field in FakeLLMConfig.model_fields.items():
+        parser.add_argument(
+            f"--fake-{name.replace('_', '-')}",
+            dest=f"fake_{name}",
+            type=type(field.default) if field.default is not None else int,
+            default=field.default,
+            help=field.description,
+        )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    config = FakeLLMConfig(
+        **{name: getattr(args, f"fake_{name}") for name in FakeLLMConfig.model_fields}
+    )
+    with FakeLLMServer(config) as server:
+        # The API clients read these when src.services is first imported
+        os.environ["OPENAI_BASE_URL"] = f"{server.base_url}/v1"
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["GEMINI_BASE_URL"] = server.base_url
+        os.environ["GEMINI_API_KEY"] = "fake"
+
+        results = run(run_benchmark(args, server))
+
+    output = json.dumps(results, indent=4, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
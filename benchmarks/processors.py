@@ -0,0 +1,244 @@
+"""Microbenchmarks for the variable processors and aggregate_data.
+
+Each processor is run over synthetic cohorts (see src/data/synthetic.py) of several sizes
+(number of firms) and widths (months in the production series). Each case is called
+repeatedly and its median and fastest wall time are recorded; peak memory is the tracemalloc
+peak of a single call.
+
+Results can be saved as a baseline and later compared against it; the comparison uses the
+fastest call, which is the least affected by machine noise, and exits with status 1 when any
+case is slower or uses more memory than the baseline allows.
+
+Usage:
+    python -m benchmarks.processors --save benchmarks/baselines/processors.json
+    python -m benchmarks.processors --compare benchmarks/baselines/processors.json
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+import pandas as pd
+from src.config.sections import get_sections_config
+from src.data.process import aggregate_data
+from src.data.processors import (
+    ArrayProcessor,
+    BooleanProcessor,
+    CategoricalProcessor,
+    DummyProcessor,
+    IndicatorProcessor,
+    NumericProcessor,
+)
+from src.data.synthetic import SyntheticCohortConfig, generate_cohort
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "processors.json"
+
+# Processor and the variable of get_sections_config it is benchmarked with
+PROCESSOR_CASES = {
+    "numeric": (NumericProcessor, "emp_total"),
+    "boolean": (BooleanProcessor, "knowsinput"),
+    "categorical": (CategoricalProcessor, "price_system"),
+    "dummy": (DummyProcessor, "qualityprocess_sample"),
+    "indicator": (IndicatorProcessor, "production_efficiency"),
+}
+
+# No configured variable is an array yet, so use a multi-select column of the cohort
+ARRAY_CASE = (
+    ("quality_processes", "quality_processesc"),
+    {"name": "quality_processes", "description": "Procesos de calidad implementados"},
+)
+
+
+def build_cases(df: pd.DataFrame) -> Dict[str, Callable[[], object]]:
+    """Build the benchmark callables for one cohort."""
+    variables = {
+        var_name: var_config
+        for section in get_sections_config(df).values()
+        for var_name, var_config in section.items()
+    }
+    cases = {}
+    for case, (processor_class, var_name) in PROCESSOR_CASES.items():
+        var_config = variables[var_name]
+        cases[case] = (
+            lambda processor=processor_class(), var_config=var_config: processor.process(
+                df, var_config["var_pairs"][0], var_config["metadata"]
+            )
+        )
+    cases["array"] = lambda processor=ArrayProcessor(): processor.process(
+        df, *ARRAY_CASE
+    )
+    cases["aggregate_data"] = lambda: aggregate_data(df, get_sections_config(df))
+    return cases
+
+
+def measure(func: Callable[[], object], min_time: float, max_repeats: int) -> Dict:
+    """Time func until min_time has elapsed (at least 3 calls) and record peak memory."""
+    timings = []
+    while len(timings) < 3 or (
+        sum(timings) < min_time and len(timings) < max_repeats
+    ):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "repeats": len(timings),
+        "peak_mb": peak / 2**20,
+    }
+
+
+def run_benchmarks(
+    sizes: List[int],
+    months: List[int],
+    only: List[str],
+    min_time: float,
+    max_repeats: int,
+) -> Dict[str, Dict]:
+    """Run every selected case for every cohort size and width."""
+    results = {}
+    for n_firms in sizes:
+        for n_months in months:
+            df = generate_cohort(
+                SyntheticCohortConfig(n_firms=n_firms, months=n_months, seed=0)
+            )
+            for case, func in build_cases(df).items():
+                if only and case not in only:
+                    continue
+                case_id = f"{case}[firms={n_firms},months={n_months}]"
+                results[case_id] = measure(func, min_time, max_repeats)
+                logger.info(
+                    "%-45s %9.2f ms %8.1f MB",
+                    case_id,
+                    results[case_id]["median_s"] * 1000,
+                    results[case_id]["peak_mb"],
+                )
+    return results
+
+
+def compare(
+    results: Dict[str, Dict],
+    baseline: Dict[str, Dict],
+    time_tolerance: float,
+    memory_tolerance: float,
+    min_delta_s: float,
+) -> List[str]:
+    """Return a description of every case that regressed against the baseline."""
+    regressions = []
+    for case_id, current in results.items():
+        reference = baseline.get(case_id)
+        if not reference:
+            continue
+        slower = current["min_s"] - reference["min_s"]
+        if (
+            current["min_s"] > reference["min_s"] * (1 + time_tolerance)
+            and slower > min_delta_s
+        ):
+            regressions.append(
+                f"{case_id}: {reference['min_s'] * 1000:.2f} ms -> "
+                f"{current['min_s'] * 1000:.2f} ms"
+            )
+        if current["peak_mb"] > reference["peak_mb"] * (1 + memory_tolerance) + 0.1:
+            regressions.append(
+                f"{case_id}: {reference['peak_mb']:.1f} MB -> {current['peak_mb']:.1f} MB"
+            )
+    return regressions
+
+
+def machine_info() -> Dict[str, str]:
+    """Describe the machine the results were recorded on."""
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def main() -> None:
+    """Run the processor benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--months", type=int, nargs="+", default=[3, 12])
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        default=[],
+        choices=[*PROCESSOR_CASES, "array", "aggregate_data"],
+        help="Run only these cases",
+    )
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--max-repeats", type=int, default=50)
+    parser.add_argument("--save", type=Path, help="Save the results as a baseline")
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        help="Compare against a baseline and exit with 1 on regressions",
+    )
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.10)
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=1.0,
+        help="Ignore time differences smaller than this",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+    # Per-variable log lines would otherwise dominate the aggregate_data timings
+    logging.getLogger("src.data.process").setLevel(logging.WARNING)
+
+    results = run_benchmarks(
+        args.sizes, args.months, args.only, args.min_time, args.max_repeats
+    )
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"machine": machine_info(), "results": results}, f, indent=4)
+        logger.info("Baseline saved to %s", args.save)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["machine"] != machine_info():
+            logger.warning(
+                "Baseline was recorded on a different machine: %s", baseline["machine"]
+            )
+        regressions = compare(
+            results,
+            baseline["results"],
+            args.time_tolerance,
+            args.memory_tolerance,
+            args.min_delta_ms / 1000,
+        )
+        if regressions:
+            logger.error("Regressions against %s:", args.compare)
+            for regression in regressions:
+                logger.error("  %s", regression)
+            sys.exit(1)
+        logger.info("No regressions against %s", args.compare)
+
+
+if __name__ == "__main__":
+    main()
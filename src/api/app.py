@@ -0,0 +1,279 @@
+"""HTTP API for report generation, without the Streamlit UI.
+
+Endpoints:
+
+    POST   /workbooks                                    upload a workbook -> its id
+    POST   /jobs                                         start a job -> job_id
+    GET    /jobs/{job_id}                                status and progress of a job
+    DELETE /jobs/{job_id}                                cancel a job
+    GET    /jobs/{job_id}/report.json                    JSON output
+    GET    /jobs/{job_id}/documents/{version}            Word document (edited/unedited)
+    GET    /jobs/{job_id}/charts/{chart_id}.{fmt}        chart (png, svg, pdf or json)
+    GET    /jobs/{job_id}/bundle.zip                     ZIP with every artifact
+    GET    /reports                                      reports in the report store
+    GET    /reports/{report_id}                          sections of a stored report
+    GET    /reports/{report_id}/artifacts/{name}         artifact of a stored report
+    GET    /reports/{report_id}/charts/{chart_id}.{fmt}  chart of a stored report
+    GET    /reports/{report_id}/bundle.zip               ZIP with every artifact
+
+Jobs are kept for API_JOB_TTL_S; their reports remain available under /reports. Every
+JSON response except the artifacts and /reports/{report_id} (a Report) is an
+APIResponse. The ZIP bundles are streamed as they are written (see utils/bundle).
+Charts are served from the report store when saved there, and otherwise rendered (and
+cached) on request; json is the Plotly spec, for drawing the chart in a browser. Run
+it with python -m src.api.server.
+"""
+
+import asyncio
+import mimetypes
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from fastapi.responses import Response, StreamingResponse
+from ..config.api import API_MAX_UPLOAD_BYTES
+from ..models.sections import APIResponse, Report
+from ..services.report_store import get_report_store
+from ..services.runtime import close_loop_locals
+from ..utils.bundle import iter_zip, stored_bundle_entries
+from ..utils.constants import (
+    BUNDLE_FILENAME,
+    CHART_DOWNLOAD_FORMATS,
+    CHARTS_DIRNAME,
+    DOCX_FILENAMES,
+    JSON_FILENAME,
+    MIME_TYPES,
+)
+from ..utils.document import stored_docx_name
+from ..utils.plot_downloads import chart_spec, render_chart_image
+from .jobs import Job, JobManager, JobRequest
+
+
+@asynccontextmanager
+async def lifespan(api: FastAPI):
+    """Create the job manager; on shutdown, cancel its pending jobs and close clients."""
+    api.state.jobs = JobManager()
+    yield
+    await api.state.jobs.shutdown()
+    await close_loop_locals()
+
+
+app = FastAPI(title="ZASCA report generator", lifespan=lifespan)
+
+
+def get_job(request: Request, job_id: str) -> Job:
+    """Look up a job, raising a 404 if it is unknown or has expired."""
+    try:
+        return request.app.state.jobs.get(job_id)
+    except KeyError as err:
+        raise HTTPException(404, f"Unknown job {job_id}") from err
+
+
+def get_finished_job(request: Request, job_id: str) -> Job:
+    """Look up a job whose artifacts are ready, raising a 409 otherwise."""
+    job = get_job(request, job_id)
+    if job.status.status != "succeeded":
+        raise HTTPException(409, f"Job {job_id} is {job.status.status}")
+    return job
+
+
+async def artifact_response(
+    report_id: str, name: str, filename: Optional[str] = None
+) -> Response:
+    """Serve an artifact of a stored report, raising a 404 if it is unknown."""
+    try:
+        content = await asyncio.to_thread(
+            get_report_store().get_artifact, report_id, name
+        )
+    except KeyError as err:
+        raise HTTPException(404, f"Unknown artifact {name} of {report_id}") from err
+
+    extension = name.rsplit(".", 1)[-1]
+    media_type = MIME_TYPES.get(extension) or mimetypes.guess_type(name)[0]
+    headers = (
+        {"Content-Disposition": f'attachment; filename="{filename}"'}
+        if filename
+        else None
+    )
+    return Response(content, media_type=media_type, headers=headers)
+
+
+async def chart_response(report_id: str, chart_id: str, fmt: str) -> Response:
+    """Serve a chart of a stored report, raising a 404 if it is unavailable."""
+    if fmt != "json" and fmt not in CHART_DOWNLOAD_FORMATS:
+        raise HTTPException(404, f"Unknown chart format {fmt}")
+    store = get_report_store()
+    try:
+        content = await asyncio.to_thread(
+            store.get_artifact, report_id, f"{CHARTS_DIRNAME}/{chart_id}.{fmt}"
+        )
+    except KeyError:
+        variables = {}
+        for section in await asyncio.to_thread(store.get_sections, report_id):
+            variables.update(section.variables)
+        render = chart_spec if fmt == "json" else render_chart_image
+        args = (chart_id, variables) if fmt == "json" else (chart_id, variables, fmt)
+        try:
+            content = await asyncio.to_thread(render, *args)
+        except Exception as err:  # pylint: disable=broad-except
+            raise HTTPException(
+                500, f"Could not render chart {chart_id}: {err}"
+            ) from err
+    if content is None:
+        raise HTTPException(404, f"Chart {chart_id} is not available for {report_id}")
+    return Response(content, media_type=MIME_TYPES[fmt])
+
+
+async def bundle_response(report_id: str) -> StreamingResponse:
+    """Stream the ZIP bundle of a stored report, raising a 404 if it is unknown."""
+    try:
+        entries = await asyncio.to_thread(stored_bundle_entries, report_id)
+    except KeyError as err:
+        raise HTTPException(404, f"Unknown report {report_id}") from err
+    # The entries are loaded and compressed in a worker thread as the body is sent
+    return StreamingResponse(
+        iter_zip(entries),
+        media_type=MIME_TYPES["zip"],
+        headers={"Content-Disposition": f'attachment; filename="{BUNDLE_FILENAME}"'},
+    )
+
+
+@app.post("/workbooks", response_model=APIResponse, status_code=201)
+async def upload_workbook(request: Request, file: UploadFile) -> APIResponse:
+    """Upload an Excel workbook with the cohort data."""
+    content = await file.read(API_MAX_UPLOAD_BYTES + 1)
+    if len(content) > API_MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            413, f"Workbooks are limited to {API_MAX_UPLOAD_BYTES} bytes"
+        )
+    try:
+        workbook_id = await request.app.state.jobs.add_workbook(content)
+    except Exception as err:  # pylint: disable=broad-except
+        raise HTTPException(422, f"Could not read the workbook: {err}") from err
+    return APIResponse(
+        status="success",
+        message="Workbook uploaded.",
+        data={"workbook_id": workbook_id},
+    )
+
+
+@app.post("/jobs", response_model=APIResponse, status_code=202)
+async def start_job(request: Request, job_request: JobRequest) -> APIResponse:
+    """Start generating a report from an uploaded workbook."""
+    try:
+        job = request.app.state.jobs.submit(job_request)
+    except KeyError as err:
+        raise HTTPException(
+            404, f"Unknown workbook {job_request.workbook_id}, upload it again"
+        ) from err
+    except OverflowError as err:
+        raise HTTPException(429, str(err)) from err
+    return APIResponse(
+        status="success", message="Job queued.", data=job.status.model_dump()
+    )
+
+
+@app.get("/jobs/{job_id}", response_model=APIResponse)
+async def job_status(request: Request, job_id: str) -> APIResponse:
+    """Status and progress of a job."""
+    job = get_job(request, job_id)
+    return APIResponse(status=job.status.status, data=job.status.model_dump())
+
+
+@app.delete("/jobs/{job_id}", response_model=APIResponse)
+async def cancel_job(request: Request, job_id: str) -> APIResponse:
+    """Cancel a queued or running job."""
+    get_job(request, job_id)
+    job = request.app.state.jobs.cancel(job_id)
+    return APIResponse(
+        status=job.status.status,
+        message="Cancellation requested." if job.pending else None,
+        data=job.status.model_dump(),
+    )
+
+
+@app.get("/jobs/{job_id}/report.json")
+async def report_json(request: Request, job_id: str) -> Response:
+    """JSON output of a finished job, as downloaded from the app."""
+    job = get_finished_job(request, job_id)
+    return await artifact_response(job.status.report_id, JSON_FILENAME)
+
+
+@app.get("/jobs/{job_id}/documents/{version}")
+async def report_document(request: Request, job_id: str, version: str) -> Response:
+    """Edited or unedited Word document of a finished job."""
+    job = get_finished_job(request, job_id)
+    if version not in DOCX_FILENAMES:
+        raise HTTPException(404, f"Unknown document version {version}")
+    return await artifact_response(
+        job.status.report_id,
+        stored_docx_name(version, job.request.include_charts),
+        DOCX_FILENAMES[version],
+    )
+
+
+@app.get("/jobs/{job_id}/charts/{chart_id}.{fmt}")
+async def report_chart(
+    request: Request, job_id: str, chart_id: str, fmt: str
+) -> Response:
+    """Chart of a finished job as png, svg, pdf or a Plotly JSON spec."""
+    job = get_finished_job(request, job_id)
+    return await chart_response(job.status.report_id, chart_id, fmt)
+
+
+@app.get("/jobs/{job_id}/bundle.zip")
+async def report_bundle(request: Request, job_id: str) -> StreamingResponse:
+    """ZIP with the documents, JSON, chart images and variables of a finished job."""
+    job = get_finished_job(request, job_id)
+    return await bundle_response(job.status.report_id)
+
+
+@app.get("/reports", response_model=APIResponse)
+async def list_reports(
+    limit: int = 20, inputs_hash: Optional[str] = None
+) -> APIResponse:
+    """Most recent stored reports, optionally only those generated from given inputs."""
+    reports = await asyncio.to_thread(
+        get_report_store().list_reports, limit, inputs_hash
+    )
+    return APIResponse(
+        status="success",
+        data={
+            "reports": [
+                stored.model_dump(exclude={"executive_summary", "edited_output"})
+                for stored in reports
+            ]
+        },
+    )
+
+
+@app.get("/reports/{report_id}", response_model=Report)
+async def stored_report(report_id: str) -> Report:
+    """Sections of a stored report, with their generated content and variables."""
+    store = get_report_store()
+    try:
+        stored = await asyncio.to_thread(store.get_report, report_id)
+    except KeyError as err:
+        raise HTTPException(404, f"Unknown report {report_id}") from err
+    return Report(
+        title=f"Reporte ZASCA {stored.cohort_info}".strip()[:100],
+        sections=await asyncio.to_thread(store.get_sections, report_id),
+        generated_at=stored.created_at,
+    )
+
+
+@app.get("/reports/{report_id}/artifacts/{name:path}")
+async def stored_artifact(report_id: str, name: str) -> Response:
+    """Artifact of a stored report, e.g. report.json or graficos/<chart_id>.png."""
+    return await artifact_response(report_id, name, name.rsplit("/", 1)[-1])
+
+
+@app.get("/reports/{report_id}/bundle.zip")
+async def stored_bundle(report_id: str) -> StreamingResponse:
+    """ZIP with the documents, JSON, chart images and variables of a stored report."""
+    return await bundle_response(report_id)
+
+
+@app.get("/reports/{report_id}/charts/{chart_id}.{fmt}")
+async def stored_chart(report_id: str, chart_id: str, fmt: str) -> Response:
+    """Chart of a stored report as png, svg, pdf or a Plotly JSON spec."""
+    return await chart_response(report_id, chart_id, fmt)
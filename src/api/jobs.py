@@ -0,0 +1,224 @@
+"""Report generation jobs of the HTTP service.
+
+Uploaded workbooks are parsed once and kept in memory by content hash, so several jobs
+on the same workbook share the data. Each job runs the report pipeline in its own
+task on the service's event loop, at most API_MAX_CONCURRENT_JOBS at a time; the
+others wait in a queue. Since every job runs on the same loop, they share one OpenAI
+and one Gemini client (see services.runtime.loop_local), the Gemini context caches and
+the coalescing of identical calls.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import pandas as pd
+from pydantic import BaseModel, Field
+from ..config.api import (
+    API_JOB_TTL_S,
+    API_MAX_CONCURRENT_JOBS,
+    API_MAX_PENDING_JOBS,
+    API_MAX_WORKBOOKS,
+)
+from ..data.loaders import read_workbook
+from ..models.sections import User
+from ..pipeline.engine import StageEvent
+from ..pipeline.report import ReportOptions, run_report
+from ..services.cancellation import finish_run, start_run
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = ("queued", "running")
+
+
+class JobRequest(BaseModel):
+    """Parameters of a report generation job."""
+
+    workbook_id: str = Field(..., description="Identifier returned by the upload.")
+    cohort_info: str = Field("", description="e.g. 'centro: Ciudad Bolívar'.")
+    options: ReportOptions = Field(default_factory=ReportOptions)
+    include_charts: bool = Field(True, description="Whether to render the charts.")
+    requested_by: Optional[User] = None
+
+
+class JobStatus(BaseModel):
+    """Public state of a job."""
+
+    job_id: str
+    workbook_id: str
+    status: str = Field(
+        ..., description="queued, running, succeeded, failed or cancelled."
+    )
+    stage: Optional[str] = Field(None, description="Pipeline stage last started.")
+    progress: float = Field(0.0, description="Fraction of the sections generated.")
+    message: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stage_durations_s: Dict[str, float] = Field(default_factory=dict)
+    report_id: Optional[str] = Field(
+        None, description="Identifier of the report in the report store, once stored."
+    )
+    charts: List[str] = Field(default_factory=list)
+    requested_by: Optional[User] = None
+
+
+class Job:
+    """A report generation job.
+
+    The artifacts are saved in the report store, not kept with the job.
+    """
+
+    def __init__(self, request: JobRequest, df: pd.DataFrame):
+        self.job_id = uuid.uuid4().hex
+        self.request = request
+        self.df = df
+        self.token = start_run(self.job_id, job="api_report")
+        self.task: Optional[asyncio.Task] = None
+        self.status = JobStatus(
+            job_id=self.job_id,
+            workbook_id=request.workbook_id,
+            status="queued",
+            created_at=time.time(),
+            requested_by=request.requested_by,
+        )
+
+    @property
+    def pending(self) -> bool:
+        """Whether the job is queued or running."""
+        return self.status.status in PENDING_STATUSES
+
+    def on_event(self, event: StageEvent) -> None:
+        """Record the progress of a pipeline stage."""
+        if event.status == "started":
+            self.status.stage = event.stage
+        elif event.status == "progress":
+            self.status.progress = event.fraction
+            self.status.message = event.message
+        elif event.status == "finished":
+            self.status.stage_durations_s[event.stage] = round(event.duration_s, 3)
+
+
+class JobManager:
+    """Workbooks and jobs of one service process."""
+
+    def __init__(self):
+        self.workbooks: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self.jobs: Dict[str, Job] = {}
+        self._slots = asyncio.Semaphore(API_MAX_CONCURRENT_JOBS)
+
+    async def add_workbook(self, content: bytes) -> str:
+        """Parse a workbook, returning its identifier (the hash of its content).
+
+        Raises:
+            ValueError: If the workbook has no complete diagnostics
+        """
+        workbook_id = hashlib.sha256(content).hexdigest()
+        if workbook_id in self.workbooks:
+            self.workbooks.move_to_end(workbook_id)
+            return workbook_id
+
+        df = await asyncio.to_thread(read_workbook, io.BytesIO(content))
+        self.workbooks[workbook_id] = df
+        while len(self.workbooks) > API_MAX_WORKBOOKS:
+            self.workbooks.popitem(last=False)
+        return workbook_id
+
+    def submit(self, request: JobRequest) -> Job:
+        """Queue a job.
+
+        Raises:
+            KeyError: If the workbook is unknown (never uploaded or evicted)
+            OverflowError: If API_MAX_PENDING_JOBS jobs are already pending
+        """
+        self._prune()
+        df = self.workbooks[request.workbook_id]
+        self.workbooks.move_to_end(request.workbook_id)
+        if sum(job.pending for job in self.jobs.values()) >= API_MAX_PENDING_JOBS:
+            raise OverflowError(f"{API_MAX_PENDING_JOBS} jobs are already pending")
+
+        job = Job(request, df)
+        self.jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job))
+        logger.info("Job %s queued for workbook %s", job.job_id, request.workbook_id)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """Look up a job.
+
+        Raises:
+            KeyError: If the job is unknown or has expired
+        """
+        return self.jobs[job_id]
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancel a job, whether queued or running."""
+        job = self.get(job_id)
+        if job.pending:
+            job.token.cancel("cancelled through the API")
+            job.task.cancel()
+        return job
+
+    async def shutdown(self) -> None:
+        """Cancel every pending job and wait until they have stopped."""
+        tasks = [job.task for job in self.jobs.values() if job.pending]
+        for job in self.jobs.values():
+            if job.pending:
+                job.token.cancel("service shutting down")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _prune(self) -> None:
+        """Drop the jobs that finished more than API_JOB_TTL_S ago.
+
+        Their reports remain available in the report store.
+        """
+        expiry = time.time() - API_JOB_TTL_S
+        for job_id in [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job.status.finished_at and job.status.finished_at < expiry
+        ]:
+            del self.jobs[job_id]
+
+    async def _run(self, job: Job) -> None:
+        targets = ["report_id", "stored_docx"] + (
+            ["stored_charts"] if job.request.include_charts else []
+        )
+        try:
+            async with self._slots:
+                job.status.status = "running"
+                job.status.started_at = time.time()
+                results = await run_report(
+                    job.request.cohort_info,
+                    job.request.options,
+                    df=job.df,
+                    targets=targets,
+                    on_event=job.on_event,
+                    run_token=job.token,
+                    include_charts=job.request.include_charts,
+                )
+        except asyncio.CancelledError:
+            job.status.status = "cancelled"
+            job.status.error = job.token.reason
+            logger.info("Job %s cancelled", job.job_id)
+        except Exception as err:  # pylint: disable=broad-except
+            job.status.status = "failed"
+            job.status.error = str(err)
+            logger.error("Job %s failed: %s", job.job_id, err)
+        else:
+            job.status.report_id = results["report_id"]
+            job.status.charts = sorted(results.get("charts", {}))
+            job.status.progress = 1.0
+            job.status.status = "succeeded"
+            logger.info("Job %s succeeded", job.job_id)
+        finally:
+            job.status.finished_at = time.time()
+            job.df = None
+            finish_run(job.token)
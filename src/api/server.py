@@ -0,0 +1,58 @@
+"""Run the report generation HTTP API.
+
+Jobs and uploaded workbooks live in the memory of the process, so the service runs as
+a single uvicorn worker; concurrent jobs are served by its event loop. With
+--fake-llm, the OpenAI and Gemini calls are answered by the offline stand-in
+(services/fake_llm), which allows running the service without API keys.
+
+Usage:
+    python -m src.api.server --port 8000
+    python -m src.api.server --fake-llm --fake-time-scale 0.05
+"""
+
+import argparse
+import logging
+import os
+import uvicorn
+from ..services.fake_llm import FakeLLMConfig, FakeLLMServer
+
+
+def main() -> None:
+    """Parse arguments and serve the API."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--fake-llm", action="store_true", help="Use the offline LLM stand-in"
+    )
+    parser.add_argument(
+        "--fake-time-scale",
+        type=float,
+        default=FakeLLMConfig.model_fields["time_scale"].default,
+        help=FakeLLMConfig.model_fields["time_scale"].description,
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    fake_server = None
+    if args.fake_llm:
+        fake_server = FakeLLMServer(FakeLLMConfig(time_scale=args.fake_time_scale))
+        fake_server.start()
+        # The API clients read these when src.services is first imported
+        os.environ["OPENAI_BASE_URL"] = f"{fake_server.base_url}/v1"
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["GEMINI_BASE_URL"] = fake_server.base_url
+        os.environ["GEMINI_API_KEY"] = "fake"
+
+    from .app import app  # pylint: disable=import-outside-toplevel
+
+    try:
+        uvicorn.run(app, host=args.host, port=args.port)
+    finally:
+        if fake_server is not None:
+            fake_server.stop()
+
+
+if __name__ == "__main__":
+    main()
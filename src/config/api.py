@@ -0,0 +1,18 @@
+"""Configuration of the HTTP report generation service (src/api)."""
+
+# Jobs generating at the same time in one worker process; further jobs wait in a
+# queue. The LLM calls of all jobs share the process-wide clients and rate limits.
+API_MAX_CONCURRENT_JOBS = 8
+
+# Jobs that can be queued or running at once before new ones are rejected (HTTP 429)
+API_MAX_PENDING_JOBS = 100
+
+# Finished jobs and their artifacts are kept in memory for this long
+API_JOB_TTL_S = 3600
+
+# Parsed workbooks kept in memory, least recently used evicted first. Jobs already
+# submitted keep their data regardless.
+API_MAX_WORKBOOKS = 16
+
+# Largest accepted workbook upload
+API_MAX_UPLOAD_BYTES = 50 * 1024 * 1024
@@ -0,0 +1,149 @@
+"""Configuration for the LLM generation pipeline."""
+
+# Hierarchical (map-reduce) executive summary: each section is condensed into a
+# digest and the executive summary is built from the digests only, so its prompt
+# stays bounded regardless of how long the individual sections are.
+DIGEST_MAX_CHARS = 600
+
+# Multi-section batching: sections with at most BATCH_MAX_VARIABLES variables are
+# packed, up to BATCH_MAX_SECTIONS at a time, into a single structured JSON request.
+BATCH_MAX_VARIABLES = 4
+BATCH_MAX_SECTIONS = 3
+
+# Gemini context caching: the system prompt and the static section instructions are
+# stored as cached content and reused across sections and sessions until they expire.
+GEMINI_CONTEXT_CACHE = True
+GEMINI_CACHE_TTL_SECONDS = 3600
+# Prefixes shorter than this (estimated at ~4 characters per token) are not cached,
+# as the API rejects cached contents below the model's minimum size
+GEMINI_CACHE_MIN_TOKENS = 1024
+# After a failed cache creation, wait this long before trying again for that prefix
+GEMINI_CACHE_RETRY_SECONDS = 600
+
+# OpenAI continuation engine: when a response stops because of the token limit, the
+# partial output is sent back as the assistant turn and the model is asked to continue,
+# for up to OPENAI_MAX_CONTINUATION_ROUNDS rounds.
+OPENAI_MAX_TOKENS = 4096
+OPENAI_CONTINUATION_MAX_TOKENS = 2048
+OPENAI_MAX_CONTINUATION_ROUNDS = 3
+# Minimum overlap (in characters) between the end of the partial output and the start
+# of a continuation for the repeated text to be dropped when stitching
+CONTINUATION_MIN_OVERLAP_CHARS = 20
+CONTINUATION_MAX_OVERLAP_CHARS = 1000
+
+# Pre-flight estimator: context window (prompt plus completion) of each model, and the
+# maximum completion of the models without a continuation engine.
+MODEL_CONTEXT_TOKENS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4-0125-preview": 128000,
+    "gemini-2.0-flash": 1048576,
+}
+MODEL_MAX_OUTPUT_TOKENS = {"gemini-2.0-flash": 8192}
+# Expected completion size of each kind of call. The edit step rewrites the whole
+# report, so its completion is estimated as the sum of the section completions.
+PREFLIGHT_COMPLETION_TOKENS = {
+    "section": 700,
+    "digest": 150,
+    "summary": 800,
+}
+# Output throughput and fixed per-call overhead used until runs of a model have been
+# recorded in the throughput history, which keeps the last THROUGHPUT_HISTORY_SIZE calls.
+DEFAULT_MODEL_THROUGHPUT = {
+    "gpt-3.5-turbo": {"output_tokens_per_s": 80.0, "overhead_s": 0.6},
+    "gpt-4-0125-preview": {"output_tokens_per_s": 25.0, "overhead_s": 1.2},
+    "gemini-2.0-flash": {"output_tokens_per_s": 150.0, "overhead_s": 0.5},
+}
+THROUGHPUT_HISTORY_SIZE = 200
+
+# Interpretation compaction (see services/compaction): categories at or below
+# COMPACTION_MIN_SHARE percent at both points are dropped, labels longer than
+# COMPACTION_MAX_LABEL_CHARS are replaced by codes, and sections over
+# SECTION_INTERPRETATION_TOKEN_BUDGET tokens have their long labels abbreviated. No
+# other category is dropped to meet the budget.
+COMPACT_INTERPRETATIONS = True
+COMPACTION_MIN_SHARE = 1
+COMPACTION_MAX_LABEL_CHARS = 60
+SECTION_INTERPRETATION_TOKEN_BUDGET = 1200
+
+# Model routing (see services/routing): each call is routed by the policy selected in
+# the sidebar. Calls whose purpose is in "fast_purposes", and sections below
+# "small_prompt_tokens" (None: any size) that are not in HIGH_IMPORTANCE_SECTIONS, use
+# the fast model of the selected provider.
+ROUTING_POLICIES = {
+    "selected": {"enabled": False},
+    "balanced": {
+        "enabled": True,
+        "fast_purposes": ["digest", "draft"],
+        "small_prompt_tokens": 1500,
+    },
+    "economy": {
+        "enabled": True,
+        "fast_purposes": ["digest", "draft", "batch", "summary", "edit"],
+        "small_prompt_tokens": None,
+    },
+}
+FAST_MODELS = {"openai": "gpt-3.5-turbo", "gemini": "gemini-2.0-flash"}
+# Sections always generated with the selected model
+HIGH_IMPORTANCE_SECTIONS = ["Optimización operativa", "Financiero"]
+
+# Provider failover (see services/failover): the circuit breaker of a provider opens
+# when more than FAILOVER_FAILURE_RATE of its calls over the last FAILOVER_WINDOW_S
+# seconds failed or timed out, once at least FAILOVER_MIN_CALLS calls have been
+# observed. While it is open, calls to the provider, including those in flight, move to
+# its model in FALLBACK_MODELS. After FAILOVER_OPEN_S seconds a single probe call is let
+# through to check for recovery. Calls that fail or time out are retried once on the
+# fallback model. A call times out after FAILOVER_TIMEOUT_FACTOR times the time its
+# model needs to write the longest output it may return (at its recorded throughput),
+# and never before FAILOVER_MIN_CALL_TIMEOUT_S.
+FAILOVER_ENABLED = True
+FALLBACK_MODELS = {"openai": "gemini-2.0-flash", "gemini": "gpt-3.5-turbo"}
+FAILOVER_FAILURE_RATE = 0.5
+FAILOVER_MIN_CALLS = 4
+FAILOVER_WINDOW_S = 120
+FAILOVER_OPEN_S = 30
+FAILOVER_TIMEOUT_FACTOR = 1.5
+FAILOVER_MIN_CALL_TIMEOUT_S = 30
+# Default output limit of the Gemini models, which the calls do not lower
+GEMINI_MAX_OUTPUT_TOKENS = 8192
+
+# Single-flight coalescing (see services/coalescing): identical LLM calls made while one
+# is in flight share its response, across Streamlit sessions in the same process, and
+# across processes when ZASCA_COALESCING_DIR points to a directory they all share.
+# Waiting for another process's call gives up after COALESCING_MAX_WAIT_S seconds.
+COALESCE_LLM_CALLS = True
+COALESCING_LOCK_POLL_S = 0.1
+COALESCING_MAX_WAIT_S = 180
+
+# Cancellation and deadlines (see services/cancellation): maximum seconds of each stage
+# of a report run. When the section stage runs out, the sections still pending keep the
+# error placeholder; when the summary or editing stage runs out, the speculative draft
+# (if any) or the placeholder, and the unedited sections, are used instead.
+STAGE_DEADLINES_S = {
+    "generating_sections": 600,
+    "generating_summary": 240,
+    "editing_report": 300,
+}
+# How often a Streamlit run checks whether its session asked to stop or rerun
+RUN_WATCH_INTERVAL_S = 1.0
+
+# Pipeline engine (see src/pipeline): threads shared by the blocking stages (data
+# aggregation, JSON, Word documents and charts) of all runs in the process.
+PIPELINE_THREAD_WORKERS = 4
+
+# Word documents are kept in memory by a hash of their content (the last
+# DOCX_CACHE_SIZE builds), and with DOCX_PREFETCH both versions are built in the
+# background right after a report is generated, so the download buttons never wait
+DOCX_CACHE_SIZE = 32
+DOCX_PREFETCH = True
+DOCX_BUILD_WORKERS = 2
+# With DOCX_EMBED_CHARTS, the charts of each section are inserted at its end, this wide
+DOCX_EMBED_CHARTS = True
+DOCX_CHART_WIDTH_IN = 6.0
+
+# Chart images (see utils/plot_downloads) are rendered by CHART_RENDER_PROCESSES worker
+# processes, each keeping a kaleido (headless Chrome) instance running; 0 renders them
+# one at a time in a background thread. The last CHART_CACHE_SIZE images are kept in
+# memory by chart, data and parameters.
+CHART_RENDER_PROCESSES = 4
+CHART_RENDER_SCALE = 2
+CHART_CACHE_SIZE = 256
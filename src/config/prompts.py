@@ -4,9 +4,7 @@
 
 section_prompts = {
     "Optimización operativa": (
-        """A continuación, se presentan las interpretaciones de los cambios observados en la productividad y eficiencia operativa de las unidades productivas, antes y después de la intervención del programa:
-
-        {interpretations}
+        """Al final de este mensaje se presentan las interpretaciones de los cambios observados en la productividad y eficiencia operativa de las unidades productivas, antes y después de la intervención del programa, junto con las características de la cohorte y centro ZASCA.
 
         Tu tarea es elaborar un análisis estructurado que integre **únicamente** las interpretaciones proporcionadas. Sigue la estructura de títulos del ejemplo, pero **desarrolla una narrativa coherente y detallada** basada en los datos.
 
@@ -14,11 +12,8 @@ section_prompts = {
         - Cambios en el proceso productivo (ej. eficiencia, uso del espacio).
         - Factores asociados a estos cambios (ej. seguimiento de indicadores, gestión de inventarios).
 
-        Características específicas de la cohorte y centro ZASCA (utiliza esta información para contexto si es relevante):
-        {cohort_details}
-
         Guía para la elaboración del análisis:
-        - **Basa tu análisis exclusivamente en los datos e interpretaciones de `{interpretations}`.** No incluyas información o variables no presentes.
+        - **Basa tu análisis exclusivamente en los datos e interpretaciones proporcionados.** No incluyas información o variables no presentes.
         - Mantén la estructura de títulos de sección del ejemplo.
         - **Construye una narrativa fluida y conectada.** Integra las diferentes interpretaciones para explicar la evolución observada en esta sección. Ve más allá de simplemente listar los cambios.
         - **Elabora sobre las conexiones e implicaciones lógicas que se derivan *directamente* de las interpretaciones proporcionadas.** Por ejemplo, si un indicador de gestión mejora y la eficiencia también, puedes señalar esa conexión si los datos la sugieren.
@@ -30,7 +25,7 @@ section_prompts = {
           * Usa "se duplicó" o similar para cambios >= 100%.
         - Descarta o menciona brevemente cambios muy pequeños si no son relevantes para la narrativa general.
 
-        **Ejemplo de Estructura y Estilo (Ilustrativo - Basa tu contenido REAL en `{interpretations}`):**
+        **Ejemplo de Estructura y Estilo (Ilustrativo - Basa tu contenido REAL en las interpretaciones proporcionadas):**
         '''
             ## OPTIMIZACIÓN OPERATIVA
             Durante el periodo de intervención, se observaron cambios en la eficiencia operativa y la gestión de procesos de las unidades productivas participantes, basados en los indicadores monitoreados.
@@ -45,9 +40,7 @@ section_prompts = {
         """
     ),
     "Mayor Calidad del Producto": (
-        """A continuación, se presentan las interpretaciones de los cambios observados en la calidad del producto y los procesos de control, antes y después de la intervención del programa:
-
-        {interpretations}
+        """Al final de este mensaje se presentan las interpretaciones de los cambios observados en la calidad del producto y los procesos de control, antes y después de la intervención del programa, junto con las características de la cohorte y centro ZASCA.
 
         Tu tarea es elaborar un análisis estructurado que integre **únicamente** las interpretaciones proporcionadas. Sigue la estructura de títulos del ejemplo, pero **desarrolla una narrativa coherente y detallada** basada en los datos.
 
@@ -57,11 +50,8 @@ section_prompts = {
         - Empaque y presentación del producto.
         - Uso de tecnología en los procesos de diseño.
 
-        Características específicas de la cohorte y centro ZASCA (utiliza esta información para contexto si es relevante):
-        {cohort_details}
-
         Guía para la elaboración del análisis:
-        - **Basa tu análisis exclusivamente en los datos e interpretaciones de `{interpretations}`.** No incluyas información o variables no presentes.
+        - **Basa tu análisis exclusivamente en los datos e interpretaciones proporcionados.** No incluyas información o variables no presentes.
         - Mantén la estructura de títulos de sección del ejemplo.
         - **Construye una narrativa fluida y conectada.** Integra las diferentes interpretaciones para explicar la evolución observada en esta sección. Ve más allá de simplemente listar los cambios.
         - **Elabora sobre las conexiones e implicaciones lógicas que se derivan *directamente* de las interpretaciones proporcionadas.**
@@ -73,7 +63,7 @@ section_prompts = {
           * Usa "se duplicó" o similar para cambios >= 100%.
         - Descarta o menciona brevemente cambios muy pequeños.
 
-        **Ejemplo de Estructura y Estilo (Ilustrativo - Basa tu contenido REAL en `{interpretations}`):**
+        **Ejemplo de Estructura y Estilo (Ilustrativo - Basa tu contenido REAL en las interpretaciones proporcionadas):**
         '''
             ## MAYOR CALIDAD DEL PRODUCTO
             Se registraron cambios en las métricas y procesos asociados a la calidad del producto durante el periodo de intervención, abarcando controles, documentación, empaque y tecnología.
@@ -93,9 +83,7 @@ section_prompts = {
         """
     ),
     "Talento Humano": (
-        """A continuación, se presentan las interpretaciones de los cambios observados en la gestión del talento humano, antes y después de la intervención del programa:
-
-        {interpretations}
+        """Al final de este mensaje se presentan las interpretaciones de los cambios observados en la gestión del talento humano, antes y después de la intervención del programa, junto con las características de la cohorte y centro ZASCA.
 
         Tu tarea es elaborar un análisis estructurado que integre **únicamente** las interpretaciones proporcionadas. Sigue la estructura de títulos del ejemplo, pero **desarrolla una narrativa coherente y detallada** basada en los datos.
 
@@ -103,11 +91,8 @@ section_prompts = {
         - Estructura salarial del líder empresarial.
         - Estabilidad y evolución del personal (ej. número total, empleados de nómina).
 
-        Características específicas de la cohorte y centro ZASCA (utiliza esta información para contexto si es relevante):
-        {cohort_details}
-
         Guía para la elaboración del análisis:
-        - **Basa tu análisis exclusivamente en los datos e interpretaciones de `{interpretations}`.** No incluyas información o variables no presentes.
+        - **Basa tu análisis exclusivamente en los datos e interpretaciones proporcionados.** No incluyas información o variables no presentes.
         - Mantén la estructura de títulos de sección del ejemplo.
         - **Construye una narrativa fluida y conectada.** Integra las diferentes interpretaciones para explicar la evolución observada en esta sección.
         - **Elabora sobre las conexiones e implicaciones lógicas que se derivan *directamente* de las interpretaciones proporcionadas.**
@@ -119,7 +104,7 @@ section_prompts = {
           * Usa "se duplicó" o similar para cambios >= 100%.
         - Descarta o menciona brevemente cambios muy pequeños.
 
-        **Ejemplo de Estructura y Estilo (Ilustrativo - Basa tu contenido REAL en `{interpretations}`):**
+        **Ejemplo de Estructura y Estilo (Ilustrativo - Basa tu contenido REAL en las interpretaciones proporcionadas):**
         '''
             ## GESTIÓN DE TALENTO HUMANO
             Se observaron cambios en la gestión del talento humano durante el periodo de intervención, particularmente en la estructura salarial de los líderes y la composición del personal.
@@ -133,9 +118,7 @@ section_prompts = {
         """
     ),
     "Practicas Gerenciales": (
-        """A continuación, se presentan las interpretaciones de los cambios observados en las prácticas gerenciales de las unidades productivas, antes y después de la intervención del programa:
-
-        {interpretations}
+        """Al final de este mensaje se presentan las interpretaciones de los cambios observados en las prácticas gerenciales de las unidades productivas, antes y después de la intervención del programa, junto con las características de la cohorte y centro ZASCA.
 
         Tu tarea es elaborar un análisis estructurado que integre **únicamente** las interpretaciones proporcionadas. Sigue la estructura de títulos del ejemplo, pero **desarrolla una narrativa coherente y detallada** basada en los datos.
 
@@ -144,11 +127,8 @@ section_prompts = {
         - Conocimiento y seguimiento de indicadores clave del negocio.
         - Implementación de sistemas de costeo.
 
-        Características específicas de la cohorte y centro ZASCA (utiliza esta información para contexto si es relevante):
-        {cohort_details}
-
         Guía para la elaboración del análisis:
-        - **Basa tu análisis exclusivamente en los datos e interpretaciones de `{interpretations}`.** No incluyas información o variables no presentes.
+        - **Basa tu análisis exclusivamente en los datos e interpretaciones proporcionados.** No incluyas información o variables no presentes.
         - Mantén la estructura de títulos de sección del ejemplo.
         - **Construye una narrativa fluida y conectada.** Integra las diferentes interpretaciones para explicar la evolución observada.
         - **Elabora sobre las conexiones e implicaciones lógicas que se derivan *directamente* de las interpretaciones proporcionadas.**
@@ -160,7 +140,7 @@ section_prompts = {
           * Usa "se duplicó" o similar para cambios >= 100%.
         - Descarta o menciona brevemente cambios muy pequeños.
 
-        **Ejemplo de Estructura y Estilo (Ilustrativo - Basa tu contenido REAL en `{interpretations}`):**
+        **Ejemplo de Estructura y Estilo (Ilustrativo - Basa tu contenido REAL en las interpretaciones proporcionadas):**
         '''
             ## PRÁCTICAS GERENCIALES
             Se registraron cambios en las prácticas gerenciales de las unidades productivas durante el periodo de intervención, abarcando sistemas de precios, conocimiento de indicadores y métodos de costeo.
@@ -177,9 +157,7 @@ section_prompts = {
         """
     ),
     "Financiero": (
-        """A continuación, se presentan las interpretaciones de los cambios observados en el desempeño financiero de las unidades productivas, antes y después de la intervención del programa:
-
-        {interpretations}
+        """Al final de este mensaje se presentan las interpretaciones de los cambios observados en el desempeño financiero de las unidades productivas, antes y después de la intervención del programa, junto con las características de la cohorte y centro ZASCA.
 
         Tu tarea es elaborar un análisis estructurado que integre **únicamente** las interpretaciones proporcionadas. Sigue la estructura de títulos del ejemplo, pero **desarrolla una narrativa coherente y detallada** basada en los datos.
 
@@ -188,11 +166,8 @@ section_prompts = {
         - Participación en ruedas comerciales/financieras y generación de conexiones.
         - Formalización bancaria y sistemas contables.
 
-        Características específicas de la cohorte y centro ZASCA (utiliza esta información para contexto si es relevante):
-        {cohort_details}
-
         Guía para la elaboración del análisis:
-        - **Basa tu análisis exclusivamente en los datos e interpretaciones de `{interpretations}`.** No incluyas información o variables no presentes.
+        - **Basa tu análisis exclusivamente en los datos e interpretaciones proporcionados.** No incluyas información o variables no presentes.
         - Mantén la estructura de títulos de sección del ejemplo.
         - **Construye una narrativa fluida y conectada.** Integra las diferentes interpretaciones para explicar la evolución observada.
         - **Elabora sobre las conexiones e implicaciones lógicas que se derivan *directamente* de las interpretaciones proporcionadas.**
@@ -204,7 +179,7 @@ section_prompts = {
           * Usa "se duplicó" o similar para cambios >= 100%.
         - Descarta o menciona brevemente cambios muy pequeños.
 
-        **Ejemplo de Estructura y Estilo (Ilustrativo - Basa tu contenido REAL en `{interpretations}`):**
+        **Ejemplo de Estructura y Estilo (Ilustrativo - Basa tu contenido REAL en las interpretaciones proporcionadas):**
         '''
             ## DESEMPEÑO FINANCIERO Y COMERCIAL
             El desempeño financiero y las actividades comerciales de las unidades productivas mostraron cambios durante el periodo analizado.
@@ -221,9 +196,7 @@ section_prompts = {
         """
     ),
     "Asociatividad": (
-        """A continuación, se presentan las interpretaciones de los cambios observados en las prácticas asociativas de las unidades productivas, antes y después de la intervención del programa:
-
-        {interpretations}
+        """Al final de este mensaje se presentan las interpretaciones de los cambios observados en las prácticas asociativas de las unidades productivas, antes y después de la intervención del programa, junto con las características de la cohorte y centro ZASCA.
 
         Tu tarea es elaborar un análisis estructurado que integre **únicamente** las interpretaciones proporcionadas. Sigue la estructura de títulos del ejemplo, pero **desarrolla una narrativa coherente y detallada** basada en los datos.
 
@@ -231,11 +204,8 @@ section_prompts = {
         - Conocimiento sobre mecanismos de asociatividad.
         - Implementación de prácticas asociativas para diferentes propósitos.
 
-        Características específicas de la cohorte y centro ZASCA (utiliza esta información para contexto si es relevante):
-        {cohort_details}
-
         Guía para la elaboración del análisis:
-        - **Basa tu análisis exclusivamente en los datos e interpretaciones de `{interpretations}`.** No incluyas información o variables no presentes.
+        - **Basa tu análisis exclusivamente en los datos e interpretaciones proporcionados.** No incluyas información o variables no presentes.
         - Mantén la estructura de títulos de sección del ejemplo.
         - **Construye una narrativa fluida y conectada.** Integra las diferentes interpretaciones para explicar la evolución observada.
         - **Elabora sobre las conexiones e implicaciones lógicas que se derivan *directamente* de las interpretaciones proporcionadas.**
@@ -247,7 +217,7 @@ section_prompts = {
           * Usa "se duplicó" o similar para cambios >= 100%.
         - Descarta o menciona brevemente cambios muy pequeños.
 
-        **Ejemplo de Estructura y Estilo (Ilustrativo - Basa tu contenido REAL en `{interpretations}`):**
+        **Ejemplo de Estructura y Estilo (Ilustrativo - Basa tu contenido REAL en las interpretaciones proporcionadas):**
         '''
             ## ASOCIATIVIDAD Y COLABORACIÓN EMPRESARIAL
             Las prácticas y el conocimiento sobre asociatividad empresarial presentaron cambios entre las unidades productivas participantes.
@@ -262,18 +232,23 @@ section_prompts = {
     ),
 }
 
-executive_summary_prompt = """
-A continuación, se presentan los análisis detallados por sección basados en los cambios observados en las unidades productivas:
+# Dynamic data appended after the static section instructions, so the system prompt
+# and the instructions form a stable prefix that providers can cache across calls.
+section_data_prompt = """
+Características específicas de la cohorte y centro ZASCA (utiliza esta información para contexto si es relevante):
+{cohort_details}
 
-{sections_content}
+Interpretaciones de los cambios observados:
+{interpretations}
+"""
 
-Características específicas de la cohorte y centro ZASCA:
-{cohort_details}
+executive_summary_prompt = """
+Al final de este mensaje se presentan los análisis detallados por sección basados en los cambios observados en las unidades productivas, junto con las características de la cohorte y centro ZASCA.
 
-Tu tarea es elaborar un resumen ejecutivo que sintetice los hallazgos principales presentados en `{sections_content}`. **El resumen debe reflejar la información y el nivel de detalle presentes en el contenido proporcionado.**
+Tu tarea es elaborar un resumen ejecutivo que sintetice los hallazgos principales presentados en los análisis por sección. **El resumen debe reflejar la información y el nivel de detalle presentes en el contenido proporcionado.**
 
 El resumen ejecutivo debe:
-1. Presentar una visión general de los cambios observados durante el programa, **basándose exclusivamente en el contenido de `{sections_content}`.**
+1. Presentar una visión general de los cambios observados durante el programa, **basándose exclusivamente en el contenido de las secciones.**
 2. Mencionar las áreas principales donde se observaron cambios (ej. optimización operativa, calidad, talento humano, etc.), **resumiendo los puntos clave descritos en el contenido.**
 3. Utilizar un **lenguaje neutral y objetivo.** Evitar adjetivos valorativos.
 4. Al referenciar cambios numéricos mencionados en el contenido:
@@ -281,22 +256,137 @@ El resumen ejecutivo debe:
     * **Redondear** cambios porcentuales en valores absolutos al entero más cercano.
     * Usar "se duplicó" o similar para cambios cercanos o mayores al 100%.
 5. Mantener un tono profesional y directo.
-6. **No incluir información, variables, análisis o conclusiones que no estén explícitamente presentes en `{sections_content}`.**
+6. **No incluir información, variables, análisis o conclusiones que no estén explícitamente presentes en el contenido de las secciones.**
 
 Guía para la elaboración:
 - Escribe un texto fluido de 3-4 párrafos, sin subtítulos ni listados.
 - Comienza con una introducción breve contextualizando el programa y el resumen.
 - Sintetiza los cambios clave reportados en las secciones proporcionadas, **manteniendo un nivel de detalle similar al del texto original.**
 - Concluye de manera objetiva, resumiendo las áreas de cambio observadas según el contenido.
-- **La estructura y datos del ejemplo siguiente son solo ilustrativos; basa tu respuesta únicamente en `{sections_content}`.**
+- **La estructura y datos del ejemplo siguiente son solo ilustrativos; basa tu respuesta únicamente en el contenido de las secciones.**
 
-**Ejemplo de Estilo y Estructura (Ilustrativo - Basa tu contenido REAL en `{sections_content}`):**
+**Ejemplo de Estilo y Estructura (Ilustrativo - Basa tu contenido REAL en el contenido de las secciones):**
 '''
 El programa ZASCA {{ciudad}} {{sector}} - {{subsector}} acompañó a un grupo de unidades productivas durante un periodo, observándose cambios en diversas áreas de gestión, según se detalla en las secciones del informe. En optimización operativa, se registraron variaciones en indicadores como [mencionar 1-2 indicadores clave de la sección, ej. eficiencia, uso de espacio], así como en la adopción de prácticas como [mencionar 1-2 prácticas clave, ej. indicadores, gestión de inventarios].
 En relación con la calidad del producto, el informe detalla cambios en la implementación de [mencionar 1-2 aspectos clave, ej. controles de calidad, documentación de diseños] y en la adopción de [mencionar 1-2 aspectos clave, ej. empaques específicos, tecnología de diseño]. La gestión del talento humano presentó variaciones en [mencionar 1-2 aspectos clave, ej. estructura salarial de líderes, composición del personal].
 En el ámbito financiero y de prácticas gerenciales, el análisis documenta cambios en [mencionar 1-2 aspectos clave, ej. sistemas de precios, conocimiento de indicadores financieros] y en la formalización o uso de [mencionar 1-2 aspectos clave, ej. cuentas bancarias, sistemas contables]. Finalmente, las prácticas de asociatividad mostraron una evolución en [mencionar 1-2 aspectos clave, ej. conocimiento de mecanismos, participación en colaboraciones].
 En resumen, el informe documenta cambios en múltiples áreas operativas y de gestión de las unidades productivas participantes durante el periodo de acompañamiento, tal como se refleja en los indicadores y prácticas monitoreadas en cada sección.
 '''
+
+Características específicas de la cohorte y centro ZASCA:
+{cohort_details}
+
+Análisis detallados por sección:
+{sections_content}
+"""
+
+
+section_digest_prompt = """
+Al final de este mensaje se presenta el análisis de una sección de un informe de cierre ZASCA.
+
+Tu tarea es condensar este análisis en un resumen breve (máximo 3 oraciones) que sirva como insumo para el resumen ejecutivo del informe.
+
+El resumen debe:
+- Conservar los cambios numéricos más relevantes tal como aparecen en el análisis (valores, p.p. y porcentajes).
+- Mantener un lenguaje neutral y objetivo, sin adjetivos valorativos.
+- No incluir información que no esté presente en el análisis.
+- Escribirse como un único párrafo, sin títulos ni listados.
+
+Análisis de la sección "{section_title}":
+{section_content}
+"""
+
+
+digest_summary_prompt = """
+Al final de este mensaje se presentan los resúmenes de cada sección del informe, basados en los cambios observados en las unidades productivas, junto con las características de la cohorte y centro ZASCA.
+
+Tu tarea es elaborar un resumen ejecutivo que sintetice los hallazgos principales presentados en los resúmenes de sección.
+
+El resumen ejecutivo debe:
+1. Presentar una visión general de los cambios observados durante el programa, **basándose exclusivamente en los resúmenes de sección.**
+2. Mencionar las áreas principales donde se observaron cambios (ej. optimización operativa, calidad, talento humano, etc.).
+3. Utilizar un **lenguaje neutral y objetivo.** Evitar adjetivos valorativos.
+4. Al referenciar cambios numéricos:
+    * Preferir **puntos porcentuales (p.p.)** para cambios en proporciones/porcentajes.
+    * **Redondear** cambios porcentuales en valores absolutos al entero más cercano.
+    * Usar "se duplicó" o similar para cambios cercanos o mayores al 100%.
+5. Mantener un tono profesional y directo.
+6. **No incluir información, variables, análisis o conclusiones que no estén explícitamente presentes en los resúmenes de sección.**
+
+Guía para la elaboración:
+- Escribe un texto fluido de 3-4 párrafos, sin subtítulos ni listados.
+- Comienza con una introducción breve contextualizando el programa y el resumen.
+- Concluye de manera objetiva, resumiendo las áreas de cambio observadas.
+
+Características específicas de la cohorte y centro ZASCA:
+{cohort_details}
+
+Resúmenes de las secciones del informe:
+{section_digests}
+"""
+
+
+speculative_summary_prompt = """
+Al final de este mensaje se presentan las interpretaciones de los cambios observados en las unidades productivas, agrupadas por sección del informe, junto con las características de la cohorte y centro ZASCA.
+
+Tu tarea es elaborar un resumen ejecutivo del informe a partir de estas interpretaciones.
+
+El resumen ejecutivo debe:
+1. Presentar una visión general de los cambios observados durante el programa, **basándose exclusivamente en las interpretaciones proporcionadas.**
+2. Mencionar las áreas principales donde se observaron cambios, destacando los indicadores más relevantes de cada sección.
+3. Utilizar un **lenguaje neutral y objetivo.** Evitar adjetivos valorativos.
+4. Al referenciar cambios numéricos:
+    * Preferir **puntos porcentuales (p.p.)** para cambios en proporciones/porcentajes.
+    * **Redondear** cambios porcentuales en valores absolutos al entero más cercano.
+    * Usar "se duplicó" o similar para cambios cercanos o mayores al 100%.
+5. Mantener un tono profesional y directo.
+6. **No incluir información, variables, análisis o conclusiones que no estén explícitamente presentes en las interpretaciones.**
+
+Guía para la elaboración:
+- Escribe un texto fluido de 3-4 párrafos, sin subtítulos ni listados.
+- Comienza con una introducción breve contextualizando el programa y el resumen.
+- Concluye de manera objetiva, resumiendo las áreas de cambio observadas.
+
+Características específicas de la cohorte y centro ZASCA:
+{cohort_details}
+
+Interpretaciones por sección:
+{interpretations}
+"""
+
+
+summary_reconciliation_prompt = """
+Al final de este mensaje se presenta un borrador de resumen ejecutivo elaborado a partir de los datos del programa, seguido de los resúmenes de las secciones finales del informe.
+
+Tu tarea es revisar el borrador para que sea consistente con las secciones del informe:
+- Corrige cualquier cifra, dirección de cambio o afirmación que contradiga los resúmenes de sección.
+- Elimina menciones a áreas que no aparecen en los resúmenes de sección.
+- Si el borrador ya es consistente, devuélvelo sin cambios.
+- Mantén la extensión, el estilo y la estructura del borrador (3-4 párrafos, sin subtítulos ni listados).
+
+Devuelve únicamente el resumen ejecutivo final.
+
+Borrador del resumen ejecutivo:
+{draft_summary}
+
+Resúmenes de las secciones del informe:
+{section_digests}
+"""
+
+
+batch_sections_prompt = """
+Al final de este mensaje se presentan varias tareas de redacción, una por cada sección del informe. Cada tarea incluye sus propias instrucciones, datos y ejemplo de estructura.
+
+Tu tarea es completar **cada una** de las tareas de forma independiente, siguiendo estrictamente las instrucciones de cada sección y usando únicamente los datos proporcionados para esa sección.
+
+Devuelve **únicamente** un objeto JSON válido, sin texto adicional, donde:
+- Cada clave es exactamente el título de la sección indicado en la tarea.
+- Cada valor es el contenido completo de esa sección, como texto en formato markdown.
+
+Títulos de sección esperados: {section_titles}
+
+Tareas de redacción:
+{section_tasks}
 """
 
 
@@ -322,12 +412,15 @@ Actúa como un editor técnico. Tu tarea es revisar y refinar el contenido de la
 4.  **Claridad y Concisión**:
     *   Realiza ajustes para mejorar la claridad y precisión sin añadir información nueva ni eliminar detalles esenciales.
 
-Edita el texto proporcionado para que cumpla estrictamente con estas directrices, prestando especial atención a mantener un nivel de detalle adecuado y una narrativa conectada.
+Edita el texto proporcionado para que cumpla estrictamente con estas directrices, prestando especial atención a mantener un nivel de detalle adecuado y una narrativa conectada. Devuelve el contenido editado de las secciones.
 
 Contenido de las secciones:
 {sections_content}
+"""
+
 
-Devuelve el contenido editado de las secciones.
+continuation_prompt = """
+Tu respuesta anterior se interrumpió por el límite de longitud. Continúa exactamente donde quedó el texto, sin repetir lo ya escrito y sin añadir introducciones ni comentarios.
 """
 
 
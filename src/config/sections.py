@@ -2,6 +2,7 @@
 import re
 from typing import List
 import pandas as pd
+from src.utils.telemetry import traced
 
 # Variable type constants
 NUMERIC = "numeric"
@@ -85,6 +86,7 @@ def find_matching_vars(
     return sorted(matching)
 
 
+@traced("get_sections_config")
 def get_sections_config(df: pd.DataFrame) -> dict:
     """Generate sections configuration based on available variables in DataFrame.
 
@@ -0,0 +1,103 @@
+"""Availability of the configured report variables in a dataset."""
+
+from typing import Any, Dict, Tuple
+import pandas as pd
+from src.config.sections import get_sections_config
+
+
+def check_variable_availability(
+    df: pd.DataFrame, var_config: dict
+) -> Tuple[bool, Dict[str, Any]]:
+    """
+    Check if variables are available in the dataframe.
+
+    Args:
+        df: DataFrame containing the data
+        var_config: Dictionary containing variable configuration
+
+    Returns:
+        Tuple containing:
+        - Boolean indicating if variable is available
+        - Dictionary with variable metadata
+    """
+    var_type = var_config["type"]
+    metadata = var_config["metadata"]
+    var_pairs = var_config["var_pairs"]
+
+    # Try each variable pair until we find one that works
+    for var_pair in var_pairs:
+        is_available = True
+
+        if not isinstance(var_type, list):
+            var_type = [var_type]
+
+        for var_type in var_type:
+            if var_type == "indicator":
+                (initial_nums, initial_denoms), (final_nums, final_denoms) = var_pair
+                if isinstance(initial_nums, list):
+                    if not any(col in df.columns for col in initial_nums):
+                        is_available = False
+                    if not any(col in df.columns for col in initial_denoms):
+                        is_available = False
+                elif initial_nums not in df.columns or initial_denoms not in df.columns:
+                    is_available = False
+
+                if isinstance(final_nums, list):
+                    if not any(col in df.columns for col in final_nums):
+                        is_available = False
+                    if not any(col in df.columns for col in final_denoms):
+                        is_available = False
+                elif final_nums not in df.columns or final_denoms not in df.columns:
+                    is_available = False
+            else:
+                initial, final = var_pair
+                if initial:
+                    if isinstance(initial, list):
+                        if not any(col in df.columns for col in initial):
+                            is_available = False
+                    elif initial not in df.columns:
+                        is_available = False
+                if final not in df.columns:
+                    is_available = False
+
+            if is_available:
+                return True, metadata
+
+    return False, metadata
+
+
+def process_sections_config(df: pd.DataFrame) -> Tuple[dict, dict, dict]:
+    """
+    Process sections configuration once to identify available and missing variables.
+
+    Args:
+        df: DataFrame containing the data
+
+    Returns:
+        Tuple containing:
+        - Dictionary of sections configuration
+        - Dictionary of available variables by section
+        - Dictionary of missing variables by section
+    """
+    sections_config = get_sections_config(df)
+    available_vars = {}
+    missing_vars = {}
+
+    for section_title, variables in sections_config.items():
+        section_available = {}
+        section_missing = []
+
+        for var_name, var_config in variables.items():
+            is_available, metadata = check_variable_availability(df, var_config)
+            if is_available:
+                section_available[var_name] = var_config
+            else:
+                var_desc = f"{metadata['description']} ({metadata['name']})"
+                section_missing.append(var_desc)
+
+        if section_available:
+            available_vars[section_title] = section_available
+        if section_missing:
+            missing_vars[section_title] = section_missing
+
+    return sections_config, available_vars, missing_vars
@@ -6,6 +6,7 @@ It includes caching functionality through Streamlit to improve performance on re
 import logging
 import pandas as pd
 import streamlit as st
+from src.utils.telemetry import span
 
 # Configure logging
 logging.basicConfig(
@@ -20,15 +21,18 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-@st.cache_data
-def load_data(uploaded_file) -> pd.DataFrame:
-    """Load and return the dataset from the uploaded CSV file."""
-    df = pd.read_excel(uploaded_file, engine="openpyxl")
-    # Filter for complete diagnostics only
-    filtered_df = df[
-        (df["Diagnostico"].str.lower() == "complete")
-        & (df["Cierre"].str.lower() == "complete")
-    ].copy()
+def read_workbook(workbook) -> pd.DataFrame:
+    """Read a workbook (path or file object) and keep the complete diagnostics."""
+    with span("load_data") as load_span:
+        df = pd.read_excel(workbook, engine="openpyxl")
+        # Filter for complete diagnostics only
+        filtered_df = df[
+            (df["Diagnostico"].str.lower() == "complete")
+            & (df["Cierre"].str.lower() == "complete")
+        ].copy()
+        load_span.set_attributes(
+            {"rows": len(df), "complete_rows": len(filtered_df), "columns": len(df.columns)}
+        )
 
     if len(filtered_df) == 0:
         raise ValueError("No complete diagnostics found in dataset")
@@ -39,3 +43,9 @@ def load_data(uploaded_file) -> pd.DataFrame:
         len(df),
     )
     return filtered_df
+
+
+@st.cache_data
+def load_data(uploaded_file) -> pd.DataFrame:
+    """Load and return the dataset from the uploaded CSV file."""
+    return read_workbook(uploaded_file)
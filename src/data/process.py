@@ -4,6 +4,7 @@ import logging
 from typing import List
 import pandas as pd
 from src.models.sections import ReportSection
+from src.utils.telemetry import span, traced
 from src.data.processors import (
     ArrayProcessor,
     BooleanProcessor,
@@ -36,6 +37,7 @@ PROCESSORS = {
 }
 
 
+@traced("aggregate_data")
 def aggregate_data(df: pd.DataFrame, sections_config: dict) -> List[ReportSection]:
     """Aggregate data into report sections based on configuration.
 
@@ -69,45 +71,54 @@ def aggregate_data(df: pd.DataFrame, sections_config: dict) -> List[ReportSectio
                     processed_successfully = False
                     for var_type in var_config["type"]:
                         processor = PROCESSORS.get(var_type)
-                        try:  # this now works BUT
-                            variable_data_obj = processor.process(
-                                df, var_pair, var_config["metadata"]
-                            )
-
-                            # Check if the core results are NaN. If so, try the next type.
-                            if pd.isna(
-                                variable_data_obj.value_initial_intervention
-                            ) and pd.isna(variable_data_obj.value_final_intervention):
+                        with span(
+                            "processor {var_type} {variable}",
+                            var_type=var_type,
+                            variable=var_name,
+                            section=section_title,
+                            rows=len(df),
+                        ) as processor_span:
+                            try:
+                                variable_data_obj = processor.process(
+                                    df, var_pair, var_config["metadata"]
+                                )
+                            except Exception as e:  # pylint: disable=broad-exception-caught
+                                # Expected while trying alternative pairs and types, so it
+                                # is recorded as an attribute rather than a span error
+                                processor_span.set_attribute("failed", str(e))
                                 logger.debug(
-                                    "Processor %s for %s produced NaN for both initial and final."
-                                    " Trying next type.",
+                                    "Processor %s for variable pair %s failed: %s",
                                     var_type,
-                                    var_name,
+                                    var_pair,
+                                    str(e),
                                 )
                                 continue
 
-                            variable_data[var_name] = variable_data_obj
-                            logger.info(
-                                "Variable %s processed successfully with type %s:"
-                                " initial=%s, final=%s, change=%s",
-                                var_name,
-                                var_type,  # Log the successful type
-                                variable_data_obj.value_initial_intervention,
-                                variable_data_obj.value_final_intervention,
-                                variable_data_obj.percentage_change,
-                            )
-                            processed_successfully = True
-                            break  # Stop trying types if one works and is not entirely nan
-
-                        except Exception as e:  # pylint: disable=broad-exception-caught
+                        # Check if the core results are NaN. If so, try the next type.
+                        if pd.isna(variable_data_obj.value_initial_intervention) and pd.isna(
+                            variable_data_obj.value_final_intervention
+                        ):
                             logger.debug(
-                                "Processor %s for variable pair %s failed: %s",
+                                "Processor %s for %s produced NaN for both initial and final."
+                                " Trying next type.",
                                 var_type,
-                                var_pair,
-                                str(e),
+                                var_name,
                             )
                             continue
 
+                        variable_data[var_name] = variable_data_obj
+                        logger.info(
+                            "Variable %s processed successfully with type %s:"
+                            " initial=%s, final=%s, change=%s",
+                            var_name,
+                            var_type,  # Log the successful type
+                            variable_data_obj.value_initial_intervention,
+                            variable_data_obj.value_final_intervention,
+                            variable_data_obj.percentage_change,
+                        )
+                        processed_successfully = True
+                        break  # Stop trying types if one works and is not entirely nan
+
                     if processed_successfully:
                         break  # Stop trying var_pairs if one worked
 
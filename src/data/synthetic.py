@@ -0,0 +1,365 @@
+"""Synthetic ZASCA cohort generator.
+
+Builds cohort workbooks with the same column layout as the diagnostic and closing exports
+(baseline columns, "c"-suffixed closing columns, monthly production series, Sí/No answers,
+categorical answers from CATEGORICAL_MAPPINGS and semicolon multi-select answers) so that
+ingestion, aggregation and charts can be tested without real, sensitive data.
+
+The columns are derived from get_sections_config and chart_config, so variables added to
+the configuration are picked up automatically.
+
+Usage:
+    python -m src.data.synthetic --firms 1000 --output cohorte.xlsx
+    python -m src.data.synthetic --firms 1000000 --output cohorte.parquet
+"""
+
+import argparse
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pydantic import BaseModel, Field
+from src.config.charts import chart_config
+from src.config.sections import (
+    BOOLEAN,
+    CATEGORICAL,
+    DUMMY,
+    INDICATOR,
+    NUMERIC,
+    ARRAY,
+    get_sections_config,
+)
+
+logger = logging.getLogger(__name__)
+
+# Number of firms generated at a time; bounds memory use for large cohorts
+CHUNK_SIZE = 100_000
+
+# Largest number of data rows that fit in an Excel worksheet
+EXCEL_MAX_ROWS = 1_048_575
+
+# Typical magnitude (median, sigma of the lognormal) of numeric variables by name prefix
+NUMERIC_SCALES = {
+    "emp_ft": (2, 0.8),
+    "emp_total": (4, 0.7),
+    "income": (1_300_000, 0.5),
+    "sales": (4_000_000, 1.0),
+}
+DEFAULT_NUMERIC_SCALE = (100, 1.0)
+
+YES_NO = np.array(["Sí", "No"], dtype=object)
+
+
+class SyntheticCohortConfig(BaseModel):
+    """Shape and distributions of a synthetic cohort."""
+
+    n_firms: int = Field(500, ge=1, description="Number of firms (rows) in the cohort.")
+    months: int = Field(
+        6, ge=1, description="Number of months in the production series."
+    )
+    missing_rate: float = Field(
+        0.05, ge=0, lt=1, description="Fraction of answers left empty."
+    )
+    incomplete_rate: float = Field(
+        0.05,
+        ge=0,
+        lt=1,
+        description="Fraction of firms without a complete diagnostic or closing.",
+    )
+    uplift: float = Field(
+        0.15, ge=0, le=1, description="Average improvement between baseline and closing."
+    )
+    seed: int = Field(0, description="Seed for all random draws.")
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-x))
+
+
+class _CohortBuilder:
+    """Generate columns for one cohort, sharing a latent capability per firm."""
+
+    def __init__(self, config: SyntheticCohortConfig, n_firms: int, chunk: int = 0):
+        self.config = config
+        self.n_firms = n_firms
+        # Per-variable parameters are shared by all chunks; per-firm draws are not
+        self.params_rng = np.random.default_rng(config.seed)
+        self.rng = np.random.default_rng([config.seed, chunk])
+        # Firms that start stronger also tend to end stronger
+        self.capability = self.rng.normal(size=self.n_firms)
+        self.columns: Dict[str, np.ndarray] = {}
+
+    def add(self, name: Optional[str], values: np.ndarray, allow_missing=True) -> None:
+        """Add a column unless it already exists, applying missingness."""
+        if not name or name in self.columns:
+            return
+        if allow_missing and self.config.missing_rate:
+            missing = self.rng.random(self.n_firms) < self.config.missing_rate
+            values = values.astype(object if values.dtype == object else float)
+            values[missing] = None if values.dtype == object else np.nan
+        self.columns[name] = values
+
+    def adoption(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Draw baseline and closing yes/no answers for one practice."""
+        difficulty = self.params_rng.normal(0, 1)
+        logits = self.capability - difficulty
+        baseline = self.rng.random(self.n_firms) < _sigmoid(logits)
+        # Firms that already had the practice keep it; others adopt it with the uplift
+        closing = baseline | (
+            self.rng.random(self.n_firms) < self.config.uplift * 2
+        )
+        return baseline, closing
+
+    def add_boolean(self, initial: Optional[str], final: str) -> None:
+        baseline, closing = self.adoption()
+        self.add(initial, YES_NO[(~baseline).astype(int)])
+        self.add(final, YES_NO[(~closing).astype(int)])
+
+    def add_dummies(self, pairs: List[Tuple[Optional[str], str]]) -> List[np.ndarray]:
+        """Add dummy columns (1 when selected, empty otherwise) and return the masks."""
+        masks = []
+        for initial, final in pairs:
+            baseline, closing = self.adoption()
+            # An empty dummy already means "not selected", so no extra missingness
+            self.add(initial, np.where(baseline, 1.0, np.nan), allow_missing=False)
+            self.add(final, np.where(closing, 1.0, np.nan), allow_missing=False)
+            masks.append((baseline, closing))
+        return masks
+
+    def add_categorical(
+        self, initial: Optional[str], final: str, categories: List[str]
+    ) -> None:
+        n_categories = len(categories)
+        # Categories are mostly ordered from least to most developed practice
+        weights = np.linspace(1.5, 0.5, n_categories)
+        baseline = self.rng.choice(
+            n_categories, size=self.n_firms, p=weights / weights.sum()
+        )
+        moves = self.rng.random(self.n_firms) < self.config.uplift * 2
+        closing = np.minimum(baseline + moves, n_categories - 1)
+        options = np.array(categories, dtype=object)
+        self.add(initial, options[baseline])
+        self.add(final, options[closing])
+
+    def add_numeric(self, initial, final: str) -> None:
+        name = final.rstrip("c")
+        median, sigma = next(
+            (
+                scale
+                for prefix, scale in NUMERIC_SCALES.items()
+                if name.startswith(prefix)
+            ),
+            DEFAULT_NUMERIC_SCALE,
+        )
+        baseline = median * np.exp(sigma * self.capability * 0.5) * self.rng.lognormal(
+            0, sigma * 0.5, self.n_firms
+        )
+        growth = self.rng.lognormal(
+            np.log1p(self.config.uplift), 0.2, self.n_firms
+        )
+        closing = baseline * growth
+        round_values = np.round if median < 100 else (lambda values: values)
+        for column in initial if isinstance(initial, list) else [initial]:
+            self.add(
+                column,
+                round_values(baseline * self.rng.lognormal(0, 0.1, self.n_firms)),
+            )
+        self.add(final, round_values(closing))
+
+    def add_multi_select(
+        self, name: str, labels: List[str], selections: List[np.ndarray]
+    ) -> None:
+        """Add a semicolon-separated multi-select answer built from dummy selections."""
+        answers = np.full(self.n_firms, "", dtype=object)
+        for label, chosen in zip(labels, selections):
+            answers[chosen] += f"{label};"
+        answers = np.array([answer[:-1] or None for answer in answers], dtype=object)
+        self.add(name, answers, allow_missing=False)
+
+    def add_monthly_series(self) -> None:
+        """Add producedunits_N/targetunits_N/defectiveunits_N and their closing columns."""
+        size = np.round(self.rng.lognormal(5, 1, self.n_firms))
+        efficiency = _sigmoid(self.capability + 1)
+        for month in range(1, self.config.months + 1):
+            for suffix, improvement in (("", 0), ("c", self.config.uplift)):
+                target = np.round(size * self.rng.lognormal(0, 0.2, self.n_firms))
+                rate = np.clip(
+                    efficiency + improvement + self.rng.normal(0, 0.1, self.n_firms), 0, 1.2
+                )
+                produced = np.round(target * rate)
+                defective = np.round(
+                    produced * np.clip(0.1 - improvement / 3, 0.01, 1) * self.rng.random(self.n_firms)
+                )
+                self.add(f"producedunits_{month}{suffix}", produced)
+                self.add(f"targetunits_{month}{suffix}", target)
+                self.add(f"defectiveunits_{month}{suffix}", defective)
+
+    def add_status(self) -> None:
+        """Add the Diagnostico/Cierre completion columns read by load_data."""
+        for name in ("Diagnostico", "Cierre"):
+            incomplete = self.rng.random(self.n_firms) < self.config.incomplete_rate
+            self.add(
+                name,
+                np.where(incomplete, "Incomplete", "Complete").astype(object),
+                allow_missing=False,
+            )
+
+
+def _multi_select_groups(sections_config: dict) -> Dict[str, Tuple[List[str], List[str]]]:
+    """Map multi-response charts whose variables are all dummies to (variables, labels)."""
+    dummy_vars = {
+        var_name
+        for variables in sections_config.values()
+        for var_name, var_config in variables.items()
+        if var_config["type"] == DUMMY
+    }
+    return {
+        chart_id: (config["required_variables"], config["params"]["labels"])
+        for chart_id, config in chart_config.items()
+        if config["type"] == "multi_response"
+        and all(var in dummy_vars for var in config["required_variables"])
+    }
+
+
+def iter_cohort_chunks(
+    config: SyntheticCohortConfig, chunk_size: int = CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """Generate a synthetic cohort in chunks of at most chunk_size firms.
+
+    Args:
+        config: Size and distributions of the cohort
+        chunk_size: Maximum number of firms per chunk
+
+    Yields:
+        DataFrames with one row per firm and the columns expected by get_sections_config
+    """
+    for chunk, start in enumerate(range(0, config.n_firms, chunk_size)):
+        n_firms = min(chunk_size, config.n_firms - start)
+        builder = _CohortBuilder(config, n_firms, chunk)
+        builder.columns["id"] = np.arange(start + 1, start + n_firms + 1)
+        builder.add_status()
+        builder.add_monthly_series()
+
+        # The indicator patterns are resolved against the monthly columns added above
+        sections_config = get_sections_config(
+            pd.DataFrame(columns=list(builder.columns))
+        )
+        variables = {
+            var_name: var_config
+            for section in sections_config.values()
+            for var_name, var_config in section.items()
+        }
+
+        for chart_id, (var_names, labels) in _multi_select_groups(
+            sections_config
+        ).items():
+            masks = builder.add_dummies(
+                [variables[var_name]["var_pairs"][0] for var_name in var_names]
+            )
+            builder.add_multi_select(
+                chart_id, labels, [baseline for baseline, _ in masks]
+            )
+            builder.add_multi_select(
+                f"{chart_id}c", labels, [closing for _, closing in masks]
+            )
+
+        for var_name, var_config in variables.items():
+            var_type = var_config["type"]
+            var_types = var_type if isinstance(var_type, list) else [var_type]
+            initial, final = var_config["var_pairs"][0]
+            mapping = var_config["metadata"].get("mapping")
+
+            if INDICATOR in var_types:
+                continue  # covered by the monthly series
+            if CATEGORICAL in var_types and mapping:
+                builder.add_categorical(initial, final, mapping)
+            elif ARRAY in var_types:
+                labels = mapping or [f"Opción {i}" for i in range(1, 5)]
+                masks = [builder.adoption() for _ in labels]
+                builder.add_multi_select(
+                    initial, labels, [baseline for baseline, _ in masks]
+                )
+                builder.add_multi_select(
+                    final, labels, [closing for _, closing in masks]
+                )
+            elif DUMMY in var_types:
+                builder.add_dummies([(initial, final)])
+            elif BOOLEAN in var_types:
+                builder.add_boolean(initial, final)
+            elif NUMERIC in var_types:
+                builder.add_numeric(initial, final)
+            elif chunk == 0:
+                logger.warning(
+                    "No generator for variable %s of type %s", var_name, var_type
+                )
+
+        yield pd.DataFrame(builder.columns)
+
+
+def generate_cohort(config: SyntheticCohortConfig) -> pd.DataFrame:
+    """Generate a whole synthetic cohort in memory."""
+    return pd.concat(iter_cohort_chunks(config), ignore_index=True)
+
+
+def write_cohort(config: SyntheticCohortConfig, path: Path) -> Path:
+    """Generate a cohort and write it to .xlsx or .parquet depending on the extension.
+
+    Parquet files are written chunk by chunk, so cohorts of a million firms do not
+    need to fit in memory at once.
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        writer = None
+        try:
+            for df in iter_cohort_chunks(config):
+                table = pa.Table.from_pandas(
+                    df, schema=writer.schema if writer else None, preserve_index=False
+                )
+                writer = writer or pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer:
+                writer.close()
+    elif path.suffix == ".xlsx":
+        if config.n_firms > EXCEL_MAX_ROWS:
+            raise ValueError(
+                f"{config.n_firms} firms do not fit in an Excel worksheet; use .parquet"
+            )
+        generate_cohort(config).to_excel(path, index=False, engine="openpyxl")
+    else:
+        raise ValueError(f"Unsupported output format: {path.suffix}")
+    return path
+
+
+def main() -> None:
+    """Generate a synthetic cohort from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--firms", type=int, default=500, help="Number of firms")
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--missing-rate", type=float, default=0.05)
+    parser.add_argument("--incomplete-rate", type=float, default=0.05)
+    parser.add_argument("--uplift", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", required=True, type=Path, help="Output file (.xlsx or .parquet)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    config = SyntheticCohortConfig(
+            n_firms=args.firms,
+            months=args.months,
+            missing_rate=args.missing_rate,
+            incomplete_rate=args.incomplete_rate,
+            uplift=args.uplift,
+        seed=args.seed,
+    )
+    write_cohort(config, args.output)
+    logger.info("Wrote %d firms to %s", config.n_firms, args.output)
+
+
+if __name__ == "__main__":
+    main()
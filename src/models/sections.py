@@ -29,6 +29,14 @@ class ReportSection(BaseModel):
     cohort_details: Optional[str] = Field(
         None, description="Details about the ZASCA cohort."
     )
+    digest: Optional[str] = Field(
+        None,
+        description="Short digest of the generated content, used for the executive summary.",
+    )
+    usage: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Token usage (prompt, cached, uncached, completion) and latency of the call that generated the content.",
+    )
 
     class Config:
         """Pydantic model configuration."""
@@ -0,0 +1,116 @@
+"""Generate a report from the command line, without the Streamlit UI.
+
+Runs the report pipeline on a workbook and writes the JSON output, the edited and
+unedited Word documents and the chart images to an output directory. The report is
+also saved in the report store (services/report_store). The API keys
+(and OPENAI_BASE_URL / GEMINI_BASE_URL, e.g. for services/fake_llm) are read from the
+environment as in the app.
+
+Usage:
+    python -m src.pipeline.cli cohorte.xlsx --cohort-info "centro: Ciudad Bolívar" \
+        --model gemini-2.0-flash --summary-mode speculative --output-dir reporte/
+"""
+
+import argparse
+import logging
+import os
+from ..config.generation import ROUTING_POLICIES
+from ..services.runtime import run
+from ..utils.constants import (
+    CHARTS_DIRNAME,
+    DOCX_FILENAMES,
+    GEMINI_MODEL_OPTIONS,
+    JSON_FILENAME,
+    OAI_MODEL_OPTIONS,
+)
+from .engine import StageEvent
+from .report import ReportOptions, run_report
+
+logger = logging.getLogger(__name__)
+
+
+def log_event(event: StageEvent) -> None:
+    """Log the start and progress of the pipeline stages (the engine logs the end)."""
+    if event.status == "started":
+        logger.info("Stage %s started", event.stage)
+    elif event.status == "progress" and event.message:
+        logger.info("Stage %s: %s", event.stage, event.message)
+
+
+async def generate(args: argparse.Namespace) -> None:
+    """Generate the report and write its outputs."""
+    os.makedirs(args.output_dir, exist_ok=True)
+    targets = ["report_json", "docx", "stored_docx"]
+    if not args.no_charts:
+        targets += ["charts", "stored_charts"]
+
+    results = await run_report(
+        args.cohort_info,
+        ReportOptions(
+            model_name=args.model,
+            skip_editing=not args.edit,
+            summary_mode=args.summary_mode,
+            batch_sections=args.batch_sections,
+            routing_policy=args.routing_policy,
+        ),
+        workbook=args.workbook,
+        targets=targets,
+        on_event=log_event,
+        include_charts=not args.no_charts,
+    )
+
+    with open(os.path.join(args.output_dir, JSON_FILENAME), "w", encoding="utf-8") as f:
+        f.write(results["report_json"])
+
+    for version, content in results["docx"].items():
+        with open(os.path.join(args.output_dir, DOCX_FILENAMES[version]), "wb") as f:
+            f.write(content)
+
+    if results.get("charts"):
+        charts_dir = os.path.join(args.output_dir, CHARTS_DIRNAME)
+        os.makedirs(charts_dir, exist_ok=True)
+        for chart_id, png in results["charts"].items():
+            with open(os.path.join(charts_dir, f"{chart_id}.png"), "wb") as f:
+                f.write(png)
+
+    logger.info(
+        "Report written to %s and stored as %s", args.output_dir, results["report_id"]
+    )
+
+
+def main() -> None:
+    """Parse arguments and generate the report."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("workbook", help="Excel workbook with cohort data")
+    parser.add_argument(
+        "--cohort-info", default="", help='e.g. "centro: Ciudad Bolívar, cohorte: 1"'
+    )
+    parser.add_argument(
+        "--model",
+        default="gpt-3.5-turbo",
+        choices=list(OAI_MODEL_OPTIONS) + list(GEMINI_MODEL_OPTIONS),
+    )
+    parser.add_argument(
+        "--summary-mode",
+        default="standard",
+        choices=["standard", "hierarchical", "speculative"],
+    )
+    parser.add_argument("--batch-sections", action="store_true")
+    parser.add_argument(
+        "--routing-policy", default="selected", choices=list(ROUTING_POLICIES)
+    )
+    parser.add_argument("--edit", action="store_true", help="Run the editing step")
+    parser.add_argument(
+        "--no-charts",
+        action="store_true",
+        help="Skip the charts, also in the Word documents",
+    )
+    parser.add_argument("--output-dir", default="reporte")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    run(generate(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""A small dependency-driven pipeline engine.
+
+A pipeline is a set of stages, each declaring the named values it needs (inputs) and
+the ones it produces (outputs). Running a pipeline starts every stage as soon as its
+inputs are available, so independent stages run concurrently: coroutine stages on
+the event loop, and blocking stages in a thread pool shared by all pipelines of the
+process. Only the stages needed for the requested outputs are run.
+
+Progress is reported through an optional callback receiving a StageEvent when a stage
+starts, reports progress, finishes or fails. If a stage fails or the run is
+cancelled, the stages still running are cancelled before the error is raised.
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from pydantic import BaseModel, Field
+from ..config.generation import PIPELINE_THREAD_WORKERS
+from ..services.cancellation import cancel_tasks
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=PIPELINE_THREAD_WORKERS, thread_name_prefix="pipeline"
+)
+
+
+class PipelineError(Exception):
+    """Raised when a pipeline is inconsistent or one of its stages fails."""
+
+
+class Stage(BaseModel):
+    """A step of a pipeline."""
+
+    name: str
+    func: Callable[..., Any] = Field(
+        ...,
+        description="Called with the inputs as keyword arguments. Returns the value of "
+        "the only output, or a dict with a value for each output.",
+    )
+    inputs: List[str] = Field(default_factory=list)
+    outputs: List[str] = Field(default_factory=list)
+    blocking: bool = Field(
+        False, description="Whether func is a blocking function run in the thread pool."
+    )
+    reports_progress: bool = Field(
+        False,
+        description="Whether func takes a progress(fraction, message) keyword argument.",
+    )
+    label: Optional[str] = Field(
+        None, description="Key of MESSAGES['info'] describing the stage in the UI."
+    )
+
+
+class StageEvent(BaseModel):
+    """Progress of a stage, as reported to the on_event callback."""
+
+    stage: str
+    status: str = Field(..., description="started, progress, finished or failed.")
+    label: Optional[str] = None
+    fraction: Optional[float] = None
+    message: Optional[str] = None
+    duration_s: Optional[float] = None
+
+
+class Pipeline:
+    """A set of stages connected by their inputs and outputs."""
+
+    def __init__(self, stages: Iterable[Stage]):
+        self.stages: Dict[str, Stage] = {}
+        self.producers: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise PipelineError(f"Duplicate stage: {stage.name}")
+            self.stages[stage.name] = stage
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise PipelineError(
+                        f"Output {output} is produced by both "
+                        f"{self.producers[output].name} and {stage.name}"
+                    )
+                self.producers[output] = stage
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        visiting: Set[str] = set()
+        done: Set[str] = set()
+
+        def visit(stage: Stage) -> None:
+            if stage.name in done:
+                return
+            if stage.name in visiting:
+                raise PipelineError(f"Cycle through stage {stage.name}")
+            visiting.add(stage.name)
+            for value in stage.inputs:
+                if value in self.producers:
+                    visit(self.producers[value])
+            visiting.discard(stage.name)
+            done.add(stage.name)
+
+        for stage in self.stages.values():
+            visit(stage)
+
+    def plan(self, targets: Iterable[str], available: Iterable[str]) -> List[Stage]:
+        """Stages needed to compute the targets from the available values.
+
+        Raises:
+            PipelineError: If a needed value is neither available nor produced
+        """
+        available = set(available)
+        needed: Dict[str, Stage] = {}
+
+        def require(value: str) -> None:
+            if value in available:
+                return
+            stage = self.producers.get(value)
+            if stage is None:
+                raise PipelineError(f"No stage produces {value}")
+            if stage.name not in needed:
+                needed[stage.name] = stage
+                for dependency in stage.inputs:
+                    require(dependency)
+
+        for target in targets:
+            require(target)
+        return [stage for name, stage in self.stages.items() if name in needed]
+
+    async def _run_stage(
+        self,
+        stage: Stage,
+        values: Dict[str, Any],
+        notify: Callable[[StageEvent], None],
+    ) -> Dict[str, Any]:
+        kwargs = {name: values[name] for name in stage.inputs}
+        if stage.reports_progress:
+            kwargs["progress"] = lambda fraction, message=None: notify(
+                StageEvent(
+                    stage=stage.name,
+                    status="progress",
+                    label=stage.label,
+                    fraction=fraction,
+                    message=message,
+                )
+            )
+
+        if stage.blocking:
+            context = contextvars.copy_context()
+            result = await asyncio.get_running_loop().run_in_executor(
+                _executor, functools.partial(context.run, stage.func, **kwargs)
+            )
+        else:
+            result = stage.func(**kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+
+        if len(stage.outputs) == 1:
+            return {stage.outputs[0]: result}
+        result = result or {}
+        missing = [output for output in stage.outputs if output not in result]
+        if missing:
+            raise PipelineError(f"Stage {stage.name} did not produce {missing}")
+        return {output: result[output] for output in stage.outputs}
+
+    async def run(
+        self,
+        inputs: Dict[str, Any],
+        targets: Optional[Iterable[str]] = None,
+        on_event: Optional[Callable[[StageEvent], None]] = None,
+    ) -> Dict[str, Any]:
+        """Run the stages needed for the targets.
+
+        Args:
+            inputs: Initial values
+            targets: Values to compute, by default every output of the pipeline
+            on_event: Optional callback called with the progress of each stage
+
+        Returns:
+            The inputs and every value computed
+
+        Raises:
+            PipelineError: If the pipeline cannot compute the targets, or wrapping the
+                exception raised by a failed stage
+        """
+        targets = list(targets) if targets is not None else list(self.producers)
+        remaining = self.plan(targets, inputs)
+        values = dict(inputs)
+
+        def notify(event: StageEvent) -> None:
+            if on_event:
+                on_event(event)
+
+        running: Dict[asyncio.Task, Stage] = {}
+        started_at: Dict[str, float] = {}
+        try:
+            while remaining or running:
+                for stage in [
+                    s for s in remaining if all(i in values for i in s.inputs)
+                ]:
+                    remaining.remove(stage)
+                    started_at[stage.name] = time.perf_counter()
+                    notify(
+                        StageEvent(
+                            stage=stage.name, status="started", label=stage.label
+                        )
+                    )
+                    task = asyncio.create_task(self._run_stage(stage, values, notify))
+                    running[task] = stage
+
+                if not running:
+                    raise PipelineError(
+                        f"Stages {[stage.name for stage in remaining]} cannot start"
+                    )
+
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    stage = running.pop(task)
+                    duration = time.perf_counter() - started_at[stage.name]
+                    try:
+                        values.update(task.result())
+                    except Exception as err:
+                        notify(
+                            StageEvent(
+                                stage=stage.name,
+                                status="failed",
+                                label=stage.label,
+                                message=str(err),
+                                duration_s=duration,
+                            )
+                        )
+                        logger.error("Pipeline stage %s failed: %s", stage.name, err)
+                        if isinstance(err, PipelineError):
+                            raise
+                        raise PipelineError(
+                            f"Stage {stage.name} failed: {err}"
+                        ) from err
+                    logger.info(
+                        "Pipeline stage %s finished in %.2fs", stage.name, duration
+                    )
+                    notify(
+                        StageEvent(
+                            stage=stage.name,
+                            status="finished",
+                            label=stage.label,
+                            duration_s=duration,
+                        )
+                    )
+        finally:
+            # Reached on failure and cancellation too, so no stage outlives the run
+            await cancel_tasks(running)
+
+        return values
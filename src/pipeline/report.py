@@ -0,0 +1,389 @@
+"""The report generation pipeline, shared by the Streamlit UI, the CLI and the API.
+
+Stages and the values they exchange:
+
+    ingest       workbook                                   -> df
+    plan         df, selected_config                        -> sections_config
+    aggregate    df, sections_config                        -> report_sections
+    sections     report_sections, cohort_info, options      -> generated_sections
+    draft        report_sections, cohort_info, options      -> draft_summary
+    summary      generated_sections, draft_summary, ...     -> executive_summary
+    edit         generated_sections, options                -> edited_output
+    json         generated_sections, executive_summary      -> report_json
+    docx         generated_sections, ..., include_charts    -> docx
+    charts       report_sections                            -> charts
+    inputs       df, sections_config, cohort_info, options  -> inputs_hash
+    store        generated_sections, ..., owner             -> report_id
+    store_docx   report_id, docx, include_charts            -> stored_docx
+    store_charts report_id, charts                          -> stored_charts
+
+The speculative draft runs alongside the section calls, the summary alongside the
+editing call, and the charts alongside everything after aggregation. Values that are
+passed to run_report (e.g. an already loaded df) are not recomputed. The store stages
+save the report and its artifacts in the report store (services/report_store), so it
+can be downloaded again later without regenerating it.
+"""
+
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import pandas as pd
+from pydantic import BaseModel, Field
+from ..config.charts import get_available_charts
+from ..config.generation import DOCX_EMBED_CHARTS
+from ..data.availability import process_sections_config
+from ..data.loaders import read_workbook
+from ..data.process import aggregate_data
+from ..models.sections import ReportSection
+from ..services.api_helpers import (
+    edit_report,
+    generate_section_contents,
+    generate_speculative_summary,
+    summarise_report,
+)
+from ..services.cancellation import RunToken, run_scope
+from ..services.report_store import get_report_store, hash_inputs
+from ..services.routing import use_routing_policy
+from ..utils.constants import CHARTS_DIRNAME, JSON_FILENAME
+from ..utils.document import get_word_doc, stored_docx_name
+from ..utils.output import generate_json_output
+from ..utils.plot_downloads import render_chart_images
+from ..utils.telemetry import span
+from .engine import Pipeline, Stage, StageEvent
+
+logger = logging.getLogger(__name__)
+
+# Values computed by default: everything the Streamlit "Generar Reporte" button needs
+DEFAULT_TARGETS = ("report_json", "executive_summary", "edited_output", "report_id")
+
+
+class ReportOptions(BaseModel):
+    """Generation settings of a report."""
+
+    model_name: str = "gpt-3.5-turbo"
+    skip_editing: bool = Field(True, description="Whether to skip the editing call.")
+    summary_mode: str = Field(
+        "standard", description="standard, hierarchical or speculative."
+    )
+    batch_sections: bool = Field(
+        False, description="Whether to batch small sections into shared requests."
+    )
+    routing_policy: str = Field("selected", description="Key of ROUTING_POLICIES.")
+
+
+def plan_sections(df: pd.DataFrame, selected_config: Optional[dict]) -> dict:
+    """Sections configuration to aggregate: the selection, or every available variable."""
+    if selected_config is not None:
+        return selected_config
+    _, available_config, _ = process_sections_config(df)
+    return available_config
+
+
+async def generate_sections(
+    report_sections: List[ReportSection],
+    cohort_info: str,
+    options: ReportOptions,
+    progress: Callable[[float, Optional[str]], None],
+) -> List[ReportSection]:
+    """Generate the content of the sections, returning them once generated."""
+    with span("generating_sections"):
+        await generate_section_contents(
+            report_sections,
+            cohort_info,
+            options.model_name,
+            on_progress=progress,
+            generate_digests=options.summary_mode == "hierarchical",
+            batch_small_sections=options.batch_sections,
+        )
+    return report_sections
+
+
+async def draft_summary(
+    report_sections: List[ReportSection], cohort_info: str, options: ReportOptions
+) -> Optional[str]:
+    """Draft the executive summary from the interpretations, in speculative mode."""
+    if options.summary_mode != "speculative":
+        return None
+    return await generate_speculative_summary(
+        report_sections, cohort_info, options.model_name
+    )
+
+
+async def summarise(
+    generated_sections: List[ReportSection],
+    draft_summary: Optional[str],  # pylint: disable=redefined-outer-name
+    cohort_info: str,
+    options: ReportOptions,
+) -> str:
+    """Generate the executive summary."""
+    return await summarise_report(
+        generated_sections,
+        cohort_info,
+        options.model_name,
+        options.summary_mode,
+        draft_summary,
+    )
+
+
+async def edit(generated_sections: List[ReportSection], options: ReportOptions) -> str:
+    """Edit the report, or join the sections if editing is skipped."""
+    return await edit_report(
+        generated_sections, options.model_name, options.skip_editing
+    )
+
+
+def write_json(generated_sections: List[ReportSection], executive_summary: str) -> str:
+    """Serialise the report as JSON."""
+    return generate_json_output(generated_sections, executive_summary)
+
+
+def build_documents(
+    generated_sections: List[ReportSection],
+    executive_summary: str,
+    edited_output: str,
+    include_charts: bool,
+) -> Dict[str, bytes]:
+    """Build the edited and unedited Word documents, with charts if included."""
+    return {
+        version: get_word_doc(
+            executive_summary,
+            edited_output,
+            generated_sections,
+            edited,
+            charts=include_charts and DOCX_EMBED_CHARTS,
+        )
+        for version, edited in (("edited", True), ("unedited", False))
+    }
+
+
+def render_charts(report_sections: List[ReportSection]) -> Dict[str, bytes]:
+    """Render the PNG of every chart whose variables are available."""
+    variables = {}
+    for section in report_sections:
+        variables.update(section.variables)
+
+    return render_chart_images(get_available_charts(variables), variables)
+
+
+def fingerprint_inputs(
+    df: pd.DataFrame, sections_config: dict, cohort_info: str, options: ReportOptions
+) -> str:
+    """Hash identifying the inputs of the report."""
+    return hash_inputs(df, sections_config, cohort_info, options.model_dump())
+
+
+def store_report(
+    generated_sections: List[ReportSection],
+    executive_summary: str,
+    edited_output: str,
+    report_json: str,
+    cohort_info: str,
+    inputs_hash: str,
+    options: ReportOptions,
+    owner: Optional[str],
+) -> str:
+    """Save the report and its JSON output in the report store, returning its id."""
+    return get_report_store().save_report(
+        generated_sections,
+        executive_summary,
+        edited_output,
+        cohort_info,
+        inputs_hash,
+        options.model_dump(),
+        {JSON_FILENAME: report_json.encode("utf-8")},
+        owner,
+    )
+
+
+def store_documents(
+    report_id: str, docx: Dict[str, bytes], include_charts: bool
+) -> List[str]:
+    """Save the Word documents of a stored report, named by whether they have charts."""
+    return get_report_store().add_artifacts(
+        report_id,
+        {
+            stored_docx_name(version, include_charts): content
+            for version, content in docx.items()
+        },
+    )
+
+
+def store_charts(report_id: str, charts: Dict[str, bytes]) -> List[str]:
+    """Save the chart images of a stored report."""
+    return get_report_store().add_artifacts(
+        report_id,
+        {f"{CHARTS_DIRNAME}/{chart_id}.png": png for chart_id, png in charts.items()},
+    )
+
+
+REPORT_PIPELINE = Pipeline(
+    [
+        Stage(
+            name="ingest",
+            func=read_workbook,
+            inputs=["workbook"],
+            outputs=["df"],
+            blocking=True,
+        ),
+        Stage(
+            name="plan",
+            func=plan_sections,
+            inputs=["df", "selected_config"],
+            outputs=["sections_config"],
+        ),
+        Stage(
+            name="aggregate",
+            func=aggregate_data,
+            inputs=["df", "sections_config"],
+            outputs=["report_sections"],
+            blocking=True,
+        ),
+        Stage(
+            name="sections",
+            func=generate_sections,
+            inputs=["report_sections", "cohort_info", "options"],
+            outputs=["generated_sections"],
+            reports_progress=True,
+            label="generating_sections",
+        ),
+        Stage(
+            name="draft",
+            func=draft_summary,
+            inputs=["report_sections", "cohort_info", "options"],
+            outputs=["draft_summary"],
+        ),
+        Stage(
+            name="summary",
+            func=summarise,
+            inputs=["generated_sections", "draft_summary", "cohort_info", "options"],
+            outputs=["executive_summary"],
+            label="generating_summary",
+        ),
+        Stage(
+            name="edit",
+            func=edit,
+            inputs=["generated_sections", "options"],
+            outputs=["edited_output"],
+            label="editing_report",
+        ),
+        Stage(
+            name="json",
+            func=write_json,
+            inputs=["generated_sections", "executive_summary"],
+            outputs=["report_json"],
+            blocking=True,
+            label="preparing_json",
+        ),
+        Stage(
+            name="docx",
+            func=build_documents,
+            inputs=[
+                "generated_sections",
+                "executive_summary",
+                "edited_output",
+                "include_charts",
+            ],
+            outputs=["docx"],
+            blocking=True,
+            label="preparing_docx",
+        ),
+        Stage(
+            name="charts",
+            func=render_charts,
+            inputs=["report_sections"],
+            outputs=["charts"],
+            blocking=True,
+            label="rendering_charts",
+        ),
+        Stage(
+            name="inputs",
+            func=fingerprint_inputs,
+            inputs=["df", "sections_config", "cohort_info", "options"],
+            outputs=["inputs_hash"],
+            blocking=True,
+        ),
+        Stage(
+            name="store",
+            func=store_report,
+            inputs=[
+                "generated_sections",
+                "executive_summary",
+                "edited_output",
+                "report_json",
+                "cohort_info",
+                "inputs_hash",
+                "options",
+                "owner",
+            ],
+            outputs=["report_id"],
+            blocking=True,
+        ),
+        Stage(
+            name="store_docx",
+            func=store_documents,
+            inputs=["report_id", "docx", "include_charts"],
+            outputs=["stored_docx"],
+            blocking=True,
+        ),
+        Stage(
+            name="store_charts",
+            func=store_charts,
+            inputs=["report_id", "charts"],
+            outputs=["stored_charts"],
+            blocking=True,
+        ),
+    ]
+)
+
+
+async def run_report(
+    cohort_info: str,
+    options: ReportOptions,
+    workbook: Any = None,
+    df: Optional[pd.DataFrame] = None,
+    selected_config: Optional[dict] = None,
+    targets: Iterable[str] = DEFAULT_TARGETS,
+    on_event: Optional[Callable[[StageEvent], None]] = None,
+    run_token: Optional[RunToken] = None,
+    owner: Optional[str] = None,
+    include_charts: bool = True,
+) -> Dict[str, Any]:
+    """Generate a report with the report pipeline.
+
+    Args:
+        cohort_info: String containing cohort information
+        options: Generation settings
+        workbook: Excel workbook (path or file object), unless df is given
+        df: Already loaded cohort data
+        selected_config: Sections configuration to use instead of every available
+            variable
+        targets: Values to compute (see the module docstring)
+        on_event: Optional callback called with the progress of each stage
+        run_token: Optional token of the run; cancelling it cancels the generation and
+            every API call in flight
+        owner: User or session the stored report belongs to, if any
+        include_charts: Whether the Word documents include the charts (see
+            DOCX_EMBED_CHARTS)
+
+    Returns:
+        Every value computed by the pipeline, by name
+    """
+    inputs = {
+        "cohort_info": cohort_info,
+        "options": options,
+        "selected_config": selected_config,
+        "owner": owner,
+        "include_charts": include_charts,
+    }
+    if df is not None:
+        inputs["df"] = df
+    elif workbook is not None:
+        inputs["workbook"] = workbook
+
+    with span(
+        "generate_report",
+        model=options.model_name,
+        summary_mode=options.summary_mode,
+        batch_sections=options.batch_sections,
+        routing_policy=options.routing_policy,
+    ), use_routing_policy(options.routing_policy), run_scope(run_token):
+        return await REPORT_PIPELINE.run(inputs, targets, on_event)
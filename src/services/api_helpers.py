@@ -1,94 +1,301 @@
 """Asynchronous functions to generate content for the report sections using AI APIs."""
 
 import asyncio
-from typing import List
+import json
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
 from src.models.sections import ReportSection
-from src.services.openai_api import call_openai_api
-from src.services.gemini_api import call_gemini_api
-from src.config.prompts import (
-    executive_summary_prompt,
-    final_edit_prompt,
-    section_prompts,
+from src.services.cancellation import cancel_tasks, stage_deadline
+from src.services.coalescing import coalesce, prompt_key
+from src.services.failover import call_with_failover
+from src.services.prompt_builder import (
+    render_batch_prompt,
+    render_digest_prompt,
+    render_edit_prompt,
+    render_reconciliation_prompt,
+    render_section_prompt,
+    render_speculative_summary_prompt,
+    render_summary_prompt,
+    truncate_text,
 )
+from src.services.routing import provider_of, route_call
+from src.services.usage import format_usage
+from src.utils.telemetry import span
+from src.config.generation import (
+    BATCH_MAX_SECTIONS,
+    BATCH_MAX_VARIABLES,
+    DIGEST_MAX_CHARS,
+)
+from src.config.prompts import section_prompts
+
+logger = logging.getLogger(__name__)
+
+
+def get_api_caller(model_name: str, purpose: str = "section"):
+    """Get an API caller that routes each call with the active routing policy.
+
+    The returned caller has the same signature as the provider callers. The model of
+    each call is chosen by route_call from the selected model, the purpose of the call
+    (see routing.choose_model) and the prompt, and the call is sent through the
+    provider circuit breakers, which move it to the fallback model during an outage.
+    Identical calls in flight at the same time share a single request.
+    """
+    provider_of(model_name)  # Fail early on unsupported models
+
+    async def routed_caller(section, prompt, model_name, **kwargs):
+        decision = route_call(
+            model_name, purpose, prompt, section.title if section else None
+        )
+        return await coalesce(
+            prompt_key(decision.model_name, prompt, **kwargs),
+            lambda: call_with_failover(section, prompt, decision.model_name, **kwargs),
+        )
+
+    return routed_caller
+
+
+async def generate_section_digest(section: ReportSection, model_name: str) -> str:
+    """Condense the generated content of a section into a short digest."""
+    prompt = render_digest_prompt(section)
 
+    api_caller = get_api_caller(model_name, "digest")
+    response = await api_caller(None, prompt, model_name)
 
-def get_api_caller(model_name: str):
-    """Get the appropriate API caller based on the model name."""
-    if model_name.startswith("gpt"):
-        return call_openai_api
-    elif model_name.startswith("gemini"):
-        return call_gemini_api
+    if response and response.status == "success":
+        digest = response.data.get("content", "")
     else:
-        raise ValueError(f"Unsupported model: {model_name}")
+        # Fall back to the opening of the section so the summary still covers it
+        digest = section.content
+
+    return truncate_text(digest, DIGEST_MAX_CHARS)
+
+
+def plan_section_batches(
+    sections: List[ReportSection],
+) -> Tuple[List[ReportSection], List[List[ReportSection]]]:
+    """Split sections into those requested individually and batches of small sections.
+
+    Sections with at most BATCH_MAX_VARIABLES variables are grouped, up to
+    BATCH_MAX_SECTIONS at a time. A batch with a single section is requested individually.
+    """
+    small_sections = [
+        section
+        for section in sections
+        if len(section.variables) <= BATCH_MAX_VARIABLES
+    ]
+    individual = [
+        section for section in sections if len(section.variables) > BATCH_MAX_VARIABLES
+    ]
+
+    batches = []
+    for i in range(0, len(small_sections), BATCH_MAX_SECTIONS):
+        batch = small_sections[i : i + BATCH_MAX_SECTIONS]
+        if len(batch) > 1:
+            batches.append(batch)
+        else:
+            individual.extend(batch)
+
+    return individual, batches
+
+
+def parse_batch_response(
+    text: str, titles: List[str]
+) -> Optional[Dict[str, str]]:
+    """Parse a batched JSON response keyed by section title.
+
+    Returns None if the response is not valid JSON or misses any of the sections.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        # Strip a markdown code fence around the JSON object
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+    if not isinstance(data, dict):
+        return None
+
+    contents = {}
+    for title in titles:
+        content = data.get(title)
+        if not isinstance(content, str) or not content.strip():
+            return None
+        contents[title] = content
+
+    return contents
+
+
+async def generate_single_section(
+    section: ReportSection, cohort_info: str, model_name: str
+) -> Dict[str, Optional[str]]:
+    """Generate the content of a single section, keyed by its title."""
+    api_caller = get_api_caller(model_name)
+
+    # Static instructions first, cohort details and interpretations at the end
+    prompt = render_section_prompt(section, cohort_info)
+    with span("section {section}", section=section.title):
+        response = await api_caller(
+            section, prompt, model_name, static_prefix=section_prompts[section.title]
+        )
+
+    if response and response.status == "success":
+        section.usage = response.data.get("usage", {})
+        logger.info("Section %s: %s", section.title, format_usage(section.usage))
+        return {section.title: response.data.get("content")}
+
+    return {section.title: None}
+
+
+async def generate_section_batch(
+    batch: List[ReportSection], cohort_info: str, model_name: str
+) -> Dict[str, Optional[str]]:
+    """Generate the content of several sections in a single structured request.
+
+    Falls back to concurrent per-section calls if the batched response cannot be parsed.
+    """
+    titles = [section.title for section in batch]
+    prompt = render_batch_prompt(batch, cohort_info)
+
+    api_caller = get_api_caller(model_name, "batch")
+    with span("section batch {sections}", sections=titles):
+        response = await api_caller(None, prompt, model_name, json_output=True)
+
+    if response and response.status == "success":
+        contents = parse_batch_response(response.data.get("content", ""), titles)
+        if contents is not None:
+            # The usage of the shared request is recorded on every section of the batch
+            usage = {**response.data.get("usage", {}), "batch_size": len(batch)}
+            for section in batch:
+                section.usage = usage
+            logger.info("Batch %s: %s", titles, format_usage(usage))
+            return contents
+
+    logger.warning(
+        "Batched generation failed for sections %s. Falling back to individual calls.",
+        titles,
+    )
+    results = await asyncio.gather(
+        *(generate_single_section(section, cohort_info, model_name) for section in batch)
+    )
+    return {title: content for result in results for title, content in result.items()}
 
 
 async def generate_section_contents(
-    sections: List[ReportSection], cohort_info: str, model_name: str, progress_bar=None
+    sections: List[ReportSection],
+    cohort_info: str,
+    model_name: str,
+    on_progress: Optional[Callable[[float, str], None]] = None,
+    generate_digests: bool = False,
+    batch_small_sections: bool = False,
 ) -> None:
-    """Generate content for each section asynchronously using the selected AI API."""
-    # Track sections that need processing
-    sections_to_process = []
-    tasks = []
+    """Generate content for each section asynchronously using the selected AI API.
 
-    # Get the appropriate API caller
-    api_caller = get_api_caller(model_name)
+    on_progress, if given, is called with the fraction of sections completed and a
+    message as sections complete. If generate_digests is True, a digest of each section
+    is requested as soon as that section's content is available, so digests are
+    produced in parallel with the remaining section calls. If batch_small_sections is
+    True, sections with few variables are packed into shared structured requests (see
+    plan_section_batches).
+    """
+    sections = [section for section in sections if section.title in section_prompts]
+
+    # Map each task to the sections it updates
+    section_tasks = {}
+    digest_tasks = {}
+
+    if batch_small_sections:
+        individual, batches = plan_section_batches(sections)
+    else:
+        individual, batches = sections, []
 
     # Create tasks and track corresponding sections
-    for section in sections:
-        prompt_template = section_prompts.get(section.title)
-        if prompt_template:
-            sections_to_process.append(section)
-            # Include cohort details in the prompt
-            prompt_template = prompt_template.replace("{cohort_details}", cohort_info)
-            task = asyncio.create_task(api_caller(section, prompt_template, model_name))
-            tasks.append(task)
-
-    total_sections = len(tasks)
+    for section in individual:
+        task = asyncio.create_task(
+            generate_single_section(section, cohort_info, model_name)
+        )
+        section_tasks[task] = [section]
+    for batch in batches:
+        task = asyncio.create_task(
+            generate_section_batch(batch, cohort_info, model_name)
+        )
+        section_tasks[task] = batch
+
+    total_sections = len(sections)
     if total_sections == 0:
         return
 
-    if progress_bar:
-        progress_bar.progress(
-            0, f"Iniciando generación de {total_sections} secciones..."
-        )
+    if on_progress:
+        on_progress(0, f"Iniciando generación de {total_sections} secciones...")
 
     # Process responses as they complete
     completed = 0
-    pending = set(tasks)
-
-    while pending:
-        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
-
-        for task in done:
-            response = await task
-            # Update the corresponding section
-            section = sections_to_process[tasks.index(task)]
-            section.content = (
-                response.data.get("content", "Error generando el contenido.")
-                if response and response.status == "success"
-                else "Error generando el contenido."
-            )
+    pending = set(section_tasks)
 
-            completed += 1
-            if progress_bar:
-                progress_bar.progress(
-                    completed / total_sections,
-                    f"Completadas {completed} de {total_sections} secciones...",
+    try:
+        async with stage_deadline("generating_sections"):
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
                 )
 
+                for task in done:
+                    if task in digest_tasks:
+                        digest_tasks[task].digest = await task
+                        continue
+
+                    contents = await task
+                    # Update the corresponding sections
+                    for section in section_tasks[task]:
+                        content = contents.get(section.title)
+                        section.content = content or "Error generando el contenido."
+
+                        if generate_digests and content:
+                            digest_task = asyncio.create_task(
+                                generate_section_digest(section, model_name)
+                            )
+                            digest_tasks[digest_task] = section
+                            pending.add(digest_task)
+
+                        completed += 1
+
+                    if on_progress:
+                        on_progress(
+                            completed / total_sections,
+                            f"Completadas {completed} de {total_sections} secciones...",
+                        )
+    except TimeoutError:
+        logger.warning(
+            "Section generation exceeded its deadline with %d of %d sections done",
+            completed,
+            total_sections,
+        )
+        for task in pending:
+            for section in section_tasks.get(task, []):
+                section.content = "Error generando el contenido."
+    finally:
+        # Also reached when the run is cancelled, so no call outlives it
+        await cancel_tasks(pending)
+
 
 async def generate_executive_summary(
-    contentful_sections: List[ReportSection], cohort_info: str, model_name: str
+    contentful_sections: List[ReportSection],
+    cohort_info: str,
+    model_name: str,
+    use_digests: bool = False,
 ) -> str:
-    """Generate an executive summary using the selected AI API."""
-    content = "\n".join(
-        [f"{i+1}. {section.content}" for i, section in enumerate(contentful_sections)]
-    )
+    """Generate an executive summary using the selected AI API.
 
-    prompt_template = executive_summary_prompt.replace("{cohort_details}", cohort_info)
-    prompt_template = prompt_template.replace("{sections_content}", content)
+    If use_digests is True, the summary is built from the per-section digests instead
+    of the full section contents, which keeps the prompt size bounded.
+    """
+    prompt_template = render_summary_prompt(
+        contentful_sections, cohort_info, use_digests
+    )
 
-    api_caller = get_api_caller(model_name)
+    api_caller = get_api_caller(model_name, "summary")
     response = await api_caller(None, prompt_template, model_name)
 
     return (
@@ -98,16 +305,62 @@ async def generate_executive_summary(
     )
 
 
+async def generate_speculative_summary(
+    sections: List[ReportSection], cohort_info: str, model_name: str
+) -> Optional[str]:
+    """Draft an executive summary directly from the variable interpretations.
+
+    The interpretations are available right after aggregation, so this call can run
+    concurrently with the section calls. Returns None if the draft could not be generated.
+    """
+    prompt_template = render_speculative_summary_prompt(sections, cohort_info)
+
+    api_caller = get_api_caller(model_name, "draft")
+    response = await api_caller(None, prompt_template, model_name)
+
+    if response and response.status == "success":
+        return response.data.get("content")
+    return None
+
+
+async def reconcile_executive_summary(
+    draft_summary: Optional[str],
+    sections: List[ReportSection],
+    cohort_info: str,
+    model_name: str,
+) -> str:
+    """Reconcile a speculative executive summary with the generated sections.
+
+    The reconciliation prompt only carries the draft and the section contents truncated
+    to DIGEST_MAX_CHARS, so it is much cheaper than a full summary call and starts as
+    soon as the sections are done, without waiting for digests. Falls back to a summary
+    of the truncated sections if the draft is missing, and to the draft itself if the
+    reconciliation call fails.
+    """
+    if not draft_summary:
+        return await generate_executive_summary(
+            sections, cohort_info, model_name, use_digests=True
+        )
+
+    prompt_template = render_reconciliation_prompt(draft_summary, sections)
+
+    api_caller = get_api_caller(model_name, "summary")
+    response = await api_caller(None, prompt_template, model_name)
+
+    if response and response.status == "success":
+        return response.data.get("content", draft_summary)
+    return draft_summary
+
+
 async def edit_report_sections(
     sections: List[ReportSection], model_name: str, disable_api_call: bool = False
 ) -> str:
     """Edit the content of all sections for consistency and logical flow."""
     sections_content = "\n\n".join([section.content for section in sections])
-    prompt = final_edit_prompt.format(sections_content=sections_content)
 
     if not disable_api_call:
-        api_caller = get_api_caller(model_name)
-        response = await api_caller(None, prompt, model_name)
+        api_caller = get_api_caller(model_name, "edit")
+        response = await api_caller(None, render_edit_prompt(sections), model_name)
 
         edited_content = (
             response.data.get("content", "Error editing content.")
@@ -118,3 +371,58 @@ async def edit_report_sections(
         edited_content = sections_content
 
     return edited_content
+
+
+async def summarise_report(
+    report_sections: List[ReportSection],
+    cohort_info: str,
+    model_name: str,
+    summary_mode: str = "standard",
+    draft_summary: Optional[str] = None,
+) -> str:
+    """Generate the executive summary of a report within its stage deadline.
+
+    Args:
+        report_sections: Report sections with their generated content
+        cohort_info: String containing cohort information
+        model_name: Name of the model to use
+        summary_mode: Executive summary mode ("standard", "hierarchical" or "speculative")
+        draft_summary: Speculative draft to reconcile, in speculative mode
+
+    Returns:
+        The executive summary, or the draft or an error placeholder if the deadline
+        is exceeded
+    """
+    with span("generating_summary"):
+        try:
+            async with stage_deadline("generating_summary"):
+                if summary_mode == "speculative":
+                    return await reconcile_executive_summary(
+                        draft_summary, report_sections, cohort_info, model_name
+                    )
+                return await generate_executive_summary(
+                    report_sections,
+                    cohort_info,
+                    model_name,
+                    use_digests=summary_mode == "hierarchical",
+                )
+        except TimeoutError:
+            logger.warning("Executive summary exceeded its deadline")
+            return draft_summary or "Error generando el contenido."
+
+
+async def edit_report(
+    report_sections: List[ReportSection], model_name: str, skip_editing: bool = True
+) -> str:
+    """Edit the report within its stage deadline, keeping the sections if it runs out."""
+    with span("editing_report", skipped=skip_editing):
+        try:
+            async with stage_deadline("editing_report"):
+                return await edit_report_sections(
+                    report_sections, model_name, skip_editing
+                )
+        except TimeoutError:
+            logger.warning("Report editing exceeded its deadline, keeping sections")
+            return await edit_report_sections(
+                report_sections, model_name, disable_api_call=True
+            )
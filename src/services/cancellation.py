@@ -0,0 +1,120 @@
+"""Run tokens and per-stage deadlines for cancellable report generation.
+
+Each report generation is tied to a RunToken identifying the session and job that
+started it. Starting a new run for the same session and job (e.g. a rerun of the
+Streamlit script) cancels the previous one, and a run can also be cancelled from any
+thread with RunToken.cancel(). Cancellation cancels the task that is generating the
+report; the generation functions cancel the tasks they created in turn, and the API
+callers use async clients, so the HTTP requests in flight are closed and their rate
+limit capacity is released immediately.
+
+Each stage of a run is also bounded by STAGE_DEADLINES_S (see stage_deadline).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from ..config.generation import STAGE_DEADLINES_S
+
+logger = logging.getLogger(__name__)
+
+
+class RunToken:
+    """Identifies a generation run and allows cancelling it from any thread."""
+
+    def __init__(self, session_id: str, job: str):
+        self.run_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.job = job
+        self.started_at = time.time()
+        self.reason: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the run has been cancelled."""
+        return self.reason is not None
+
+    def bind(self) -> None:
+        """Bind the run to the current task, which is cancelled with the run."""
+        with self._lock:
+            self._task = asyncio.current_task()
+            self._loop = asyncio.get_running_loop()
+            cancelled = self.cancelled
+        if cancelled:
+            raise asyncio.CancelledError(self.reason)
+
+    def cancel(self, reason: str) -> None:
+        """Cancel the run; safe to call from any thread and more than once."""
+        with self._lock:
+            if self.cancelled:
+                return
+            self.reason = reason
+            task, loop = self._task, self._loop
+        logger.warning("Cancelling run %s (%s): %s", self.run_id, self.job, reason)
+        if task is not None and not task.done() and not loop.is_closed():
+            loop.call_soon_threadsafe(task.cancel, reason)
+
+
+_runs: Dict[Tuple[str, str], RunToken] = {}
+_runs_lock = threading.Lock()
+
+
+def start_run(session_id: str, job: str = "report") -> RunToken:
+    """Create the token of a new run, cancelling the session's previous run of the job."""
+    token = RunToken(session_id, job)
+    with _runs_lock:
+        previous = _runs.get((session_id, job))
+        _runs[(session_id, job)] = token
+    if previous is not None:
+        previous.cancel("superseded by a new run")
+    return token
+
+
+def finish_run(token: RunToken) -> None:
+    """Forget a run once it has finished."""
+    with _runs_lock:
+        if _runs.get((token.session_id, token.job)) is token:
+            del _runs[(token.session_id, token.job)]
+
+
+def active_runs() -> List[RunToken]:
+    """Runs that have started and not finished."""
+    with _runs_lock:
+        return list(_runs.values())
+
+
+@contextmanager
+def run_scope(token: Optional[RunToken]) -> Iterator[None]:
+    """Bind a run to the current task for the duration of the block."""
+    if token is None:
+        yield
+        return
+    token.bind()
+    try:
+        yield
+    finally:
+        finish_run(token)
+
+
+def stage_deadline(stage: str):
+    """Async context manager raising TimeoutError when a stage exceeds its deadline.
+
+    Stages without an entry in STAGE_DEADLINES_S are not bounded.
+    """
+    return asyncio.timeout(STAGE_DEADLINES_S.get(stage))
+
+
+async def cancel_tasks(tasks) -> None:
+    """Cancel tasks and wait until they have finished."""
+    tasks = [task for task in tasks if not task.done()]
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
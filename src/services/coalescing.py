@@ -0,0 +1,211 @@
+"""Single-flight coalescing of identical concurrent LLM calls.
+
+Calls are keyed by model, prompt and options (prompt_key). While a call is in flight,
+identical calls wait for it and share its response instead of sending their own
+request. Streamlit runs each session's script in its own thread and event loop, so
+in-flight calls are tracked with thread-safe futures shared by the whole process.
+
+When a shared lock directory is configured (ZASCA_COALESCING_DIR, e.g. on a volume
+mounted by every app instance), identical calls are also coalesced across processes:
+the first process to take the key's file lock sends the request and writes the
+response next to the lock, and the others, once they get the lock, use that response
+if it was written while they were waiting. Only concurrent calls are coalesced;
+responses are never reused once no one is waiting for them, and lock files are removed
+when their call is done.
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from ..config.generation import (
+    COALESCE_LLM_CALLS,
+    COALESCING_LOCK_POLL_S,
+    COALESCING_MAX_WAIT_S,
+)
+from ..models.sections import APIResponse
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Set as the result of an in-flight call whose leader was cancelled
+_ABANDONED = object()
+
+_inflight: Dict[str, concurrent.futures.Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def lock_dir() -> Optional[str]:
+    """Directory shared by the processes that coalesce calls, if configured."""
+    return os.getenv("ZASCA_COALESCING_DIR") or None
+
+
+def prompt_key(model_name: str, prompt: str, **options) -> str:
+    """Key identifying identical calls."""
+    payload = json.dumps(
+        {"model": model_name, "prompt": prompt, **options},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _shared_copy(response: Optional[APIResponse]) -> Optional[APIResponse]:
+    """Copy of a response for a call that did not send the request."""
+    if response is None:
+        return None
+    shared = response.model_copy(deep=True)
+    if shared.data is not None:
+        shared.data["coalesced"] = True
+    return shared
+
+
+async def _acquire_file_lock(fd: int, deadline: float) -> bool:
+    """Take an exclusive lock on a file, polling so that waiting can be cancelled."""
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if time.monotonic() > deadline:
+                return False
+            await asyncio.sleep(COALESCING_LOCK_POLL_S)
+
+
+async def _lock_path(path: str) -> Optional[int]:
+    """Open and lock a lock file, returning its descriptor, or None on timeout.
+
+    Holders remove the lock file before releasing it, so a file locked after waiting
+    may no longer be the one at path: it is then dropped and the new file locked.
+    """
+    deadline = time.monotonic() + COALESCING_MAX_WAIT_S
+    while True:
+        fd = os.open(path, os.O_CREAT | os.O_RDWR)
+        try:
+            if not await _acquire_file_lock(fd, deadline):
+                os.close(fd)
+                return None
+            try:
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+        except BaseException:
+            os.close(fd)
+            raise
+        os.close(fd)
+
+
+def _prune_results(directory: str) -> None:
+    """Remove responses no process can still be waiting for."""
+    stale_before = time.time() - COALESCING_MAX_WAIT_S
+    for entry in os.scandir(directory):
+        try:
+            if entry.name.endswith(".json") and entry.stat().st_mtime < stale_before:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+async def _call_across_processes(
+    directory: str, key: str, call: Callable[[], Awaitable[Optional[APIResponse]]]
+) -> Optional[APIResponse]:
+    """Make a call unless another process made it while this one was waiting."""
+    if fcntl is None:
+        return await call()
+
+    os.makedirs(directory, exist_ok=True)
+    result_path = os.path.join(directory, f"{key}.json")
+    lock_path = os.path.join(directory, f"{key}.lock")
+    waiting_since = time.time()
+    fd = await _lock_path(lock_path)
+    if fd is None:
+        logger.warning("Timed out waiting for the lock of call %s", key[:12])
+        return await call()
+
+    try:
+        try:
+            if os.path.getmtime(result_path) >= waiting_since:
+                with open(result_path, "r", encoding="utf-8") as f:
+                    response = APIResponse.model_validate_json(f.read())
+                logger.info("Call %s coalesced with another process", key[:12])
+                return _shared_copy(response)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as err:
+            logger.warning("Ignoring unreadable result of call %s: %s", key[:12], err)
+
+        response = await call()
+        if response is not None and response.status == "success":
+            temp_path = f"{result_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(response.model_dump_json())
+            os.replace(temp_path, result_path)
+            _prune_results(directory)
+        return response
+    finally:
+        # Removed while still locked, so no lock file outlives its call
+        try:
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+        os.close(fd)  # Also releases the lock
+
+
+async def coalesce(
+    key: str, call: Callable[[], Awaitable[Optional[APIResponse]]]
+) -> Optional[APIResponse]:
+    """Make a call, or share the response of an identical call already in flight.
+
+    Args:
+        key: Key of the call (see prompt_key)
+        call: Makes the call when no identical call is in flight
+
+    Returns:
+        The API response
+    """
+    if not COALESCE_LLM_CALLS:
+        return await call()
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = concurrent.futures.Future()
+            _inflight[key] = future
+
+    if not leader:
+        logger.info("Call %s coalesced with an in-flight request", key[:12])
+        # Shielded so that cancelling a waiting call does not cancel the shared one
+        response = await asyncio.shield(asyncio.wrap_future(future))
+        if response is _ABANDONED:
+            return await coalesce(key, call)
+        return _shared_copy(response)
+
+    try:
+        directory = lock_dir()
+        if directory:
+            response = await _call_across_processes(directory, key, call)
+        else:
+            response = await call()
+        future.set_result(response)
+        return response
+    except asyncio.CancelledError:
+        future.set_result(_ABANDONED)
+        raise
+    except Exception as err:
+        future.set_exception(err)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
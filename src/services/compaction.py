@@ -0,0 +1,179 @@
+"""Compaction of the variable interpretations sent in the section prompts.
+
+The interpretations of categorical and multiple-choice variables list every option
+with its full label, some of them longer than 150 characters. Before they are rendered
+into a prompt, the interpretations of a section are rebuilt from the variable values,
+so every percentage that is kept is written exactly as computed, with:
+
+- categories at or below COMPACTION_MIN_SHARE percent at both points dropped,
+- long labels repeated within the section replaced by a code defined once in a legend,
+- variables sharing a description written under a single heading, and repeated
+  interpretations written once,
+- a token budget: if the section is over SECTION_INTERPRETATION_TOKEN_BUDGET tokens,
+  long labels are abbreviated instead. Categories above COMPACTION_MIN_SHARE are never
+  dropped to meet the budget, so a section may stay over it.
+"""
+
+import logging
+from collections import Counter
+from typing import Dict, List, Optional
+from ..config.generation import (
+    COMPACTION_MAX_LABEL_CHARS,
+    COMPACTION_MIN_SHARE,
+    SECTION_INTERPRETATION_TOKEN_BUDGET,
+)
+from ..models.sections import ReportSection
+from ..models.variables import VariableData
+from .tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def abbreviate_label(label: str, max_chars: int = COMPACTION_MAX_LABEL_CHARS) -> str:
+    """Shorten a label to at most max_chars, preferring its opening clause."""
+    label = label.strip().rstrip(".")
+    if len(label) <= max_chars:
+        return label
+
+    # e.g. "Contador externo: Delegamos la gestión..." -> "Contador externo…"
+    for separator in (":", " - ", ",", "."):
+        head = label.split(separator, 1)[0].strip()
+        if 10 <= len(head) < max_chars:
+            return head + "…"
+    return label[:max_chars].rsplit(" ", 1)[0] + "…"
+
+
+def _format_share(value: float) -> str:
+    """Format a percentage as the processors do (they are stored as floats)."""
+    return f"{value:g}"
+
+
+def _has_categories(data: VariableData) -> bool:
+    return isinstance(data.value_final_intervention, dict)
+
+
+def _category_lines(
+    data: VariableData, labels: Dict[str, str], min_share: int
+) -> List[str]:
+    """One line per category above min_share, with its values as computed."""
+    initial = (
+        data.value_initial_intervention
+        if isinstance(data.value_initial_intervention, dict)
+        else {}
+    )
+    changes = data.percentage_change if isinstance(data.percentage_change, dict) else {}
+
+    lines = []
+    dropped = 0
+    for category, final_value in data.value_final_intervention.items():
+        initial_value = initial.get(category, 0)
+        if max(initial_value, final_value) <= min_share:
+            dropped += 1
+            continue
+        lines.append(
+            f"- {labels.get(category, category)}: "
+            f"{_format_share(initial_value)}% → {_format_share(final_value)}% "
+            f"({changes.get(category, 'N/A')})"
+        )
+    # Zero categories are already left out of the original interpretations
+    if dropped and min_share > 0:
+        others = "Otra categoría" if dropped == 1 else f"Otras {dropped} categorías"
+        lines.append(f"- {others}: {min_share}% o menos en ambos momentos")
+    return lines
+
+
+def _category_labels(variables: List[VariableData], abbreviate: bool) -> Dict[str, str]:
+    """Map the long category labels of a section to codes or abbreviations."""
+    occurrences = Counter(
+        category
+        for data in variables
+        if _has_categories(data)
+        for category in data.value_final_intervention
+    )
+    labels = {}
+    for category, count in occurrences.items():
+        if len(category) <= COMPACTION_MAX_LABEL_CHARS:
+            continue
+        if abbreviate:
+            labels[category] = abbreviate_label(category)
+        elif count > 1:
+            labels[category] = f"L{len(labels) + 1}"
+    return labels
+
+
+def render_compact_interpretations(
+    section: ReportSection,
+    min_share: int = COMPACTION_MIN_SHARE,
+    abbreviate: bool = False,
+) -> str:
+    """Render the interpretations of a section in compact form."""
+    variables = list(section.variables.values())
+    labels = _category_labels(variables, abbreviate)
+
+    # Variables with categories are grouped by description, in order of appearance
+    groups: Dict[str, List[VariableData]] = {}
+    texts = set()
+    blocks = []
+    for data in variables:
+        if _has_categories(data):
+            if data.description not in groups:
+                groups[data.description] = []
+                blocks.append((data.description, groups[data.description]))
+            groups[data.description].append(data)
+        elif data.interpretation not in texts:
+            texts.add(data.interpretation)
+            blocks.append((data.interpretation, None))
+
+    parts = []
+    for text, group in blocks:
+        if group is None:
+            parts.append(text)
+            continue
+        lines = [f"{text.strip().rstrip('.')}:"]
+        for data in group:
+            if len(group) > 1:
+                lines.append(f"[{data.variable}]")
+            lines.extend(_category_lines(data, labels, min_share))
+        parts.append("\n".join(lines))
+
+    if labels and not abbreviate:
+        parts.append(
+            "Leyenda de categorías:\n"
+            + "\n".join(f"{code} = {category}" for category, code in labels.items())
+        )
+
+    return "\n\n".join(parts)
+
+
+def compact_interpretations(
+    section: ReportSection,
+    token_budget: Optional[int] = SECTION_INTERPRETATION_TOKEN_BUDGET,
+) -> str:
+    """Render the interpretations of a section compacted to fit the token budget.
+
+    If the budget cannot be met, the most compact rendering is returned: every
+    category above COMPACTION_MIN_SHARE is kept whatever the budget.
+    """
+
+    def render(abbreviate: bool):
+        text = render_compact_interpretations(section, COMPACTION_MIN_SHARE, abbreviate)
+        return count_tokens(text), abbreviate, text
+
+    tokens, abbreviate, text = render(False)
+    if token_budget is not None and tokens > token_budget:
+        tokens, abbreviate, text = min((tokens, abbreviate, text), render(True))
+        if tokens > token_budget:
+            logger.warning(
+                "Interpretations of section %s use %d tokens, over the budget of %d",
+                section.title,
+                tokens,
+                token_budget,
+            )
+
+    logger.debug(
+        "Compacted interpretations of section %s to %d tokens%s",
+        section.title,
+        tokens,
+        " (abbreviated labels)" if abbreviate else "",
+    )
+    return text
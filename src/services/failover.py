@@ -0,0 +1,251 @@
+"""Cross-provider failover with a circuit breaker per provider.
+
+Every call to a provider goes through call_with_failover. The breaker of a provider
+opens when, over the last FAILOVER_WINDOW_S seconds and at least FAILOVER_MIN_CALLS
+calls, the share of failed or timed out calls exceeds FAILOVER_FAILURE_RATE. While it
+is open, new calls go straight to the alternate model (FALLBACK_MODELS), and calls in
+flight on that provider are abandoned and reissued there. After FAILOVER_OPEN_S
+seconds the breaker half-opens and lets a single probe call through: if it succeeds
+the breaker closes, otherwise it opens again.
+
+A call that returns an error, or that is still running after its timeout, is also
+retried once on the alternate model, so a report can finish during a partial outage.
+The timeout (call_timeout) is derived from the longest output the call may return and
+the throughput of its model, so long calls that are still writing are not abandoned.
+Breakers are process-wide, so they are shared by all Streamlit sessions.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple, Union
+from ..config.generation import (
+    FAILOVER_ENABLED,
+    FAILOVER_FAILURE_RATE,
+    FAILOVER_MIN_CALL_TIMEOUT_S,
+    FAILOVER_MIN_CALLS,
+    FAILOVER_OPEN_S,
+    FAILOVER_TIMEOUT_FACTOR,
+    FAILOVER_WINDOW_S,
+    FALLBACK_MODELS,
+    GEMINI_MAX_OUTPUT_TOKENS,
+    OPENAI_CONTINUATION_MAX_TOKENS,
+    OPENAI_MAX_CONTINUATION_ROUNDS,
+    OPENAI_MAX_TOKENS,
+)
+from ..models.sections import APIResponse, ReportSection
+from .gemini_api import call_gemini_api
+from .openai_api import call_openai_api
+from .routing import provider_of
+from .throughput import cached_history, model_throughput
+
+logger = logging.getLogger(__name__)
+
+# How often a call in flight checks whether its provider's breaker has opened
+BREAKER_POLL_S = 0.25
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def get_provider_caller(model_name: str):
+    """Get the API caller of the provider serving a model."""
+    if provider_of(model_name) == "openai":
+        return call_openai_api
+    return call_gemini_api
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over the recent calls to a provider."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._lock = threading.Lock()
+
+    def _open(self, reason: str) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        logger.warning("Circuit breaker for %s opened: %s", self.provider, reason)
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls to the provider should currently go elsewhere."""
+        with self._lock:
+            return self.state == OPEN and (
+                time.monotonic() - self.opened_at < FAILOVER_OPEN_S
+            )
+
+    def allow_request(self) -> bool:
+        """Whether a new call may be sent to the provider.
+
+        Once the open period is over, the first caller is let through as the probe.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < FAILOVER_OPEN_S:
+                    return False
+                self.state = HALF_OPEN
+                logger.info("Circuit breaker for %s half-open", self.provider)
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+            return True
+
+    def release_probe(self) -> None:
+        """Let another probe through after one was abandoned without an outcome."""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record(self, success: bool) -> None:
+        """Record the outcome of a call; calls that timed out count as failures."""
+        failed = not success
+        now = time.monotonic()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if failed:
+                    self._open("probe call failed")
+                else:
+                    self.state = CLOSED
+                    self.probe_in_flight = False
+                    self._outcomes.clear()
+                    logger.info("Circuit breaker for %s closed", self.provider)
+                return
+            if self.state == OPEN:
+                return
+
+            self._outcomes.append((now, failed))
+            while self._outcomes and self._outcomes[0][0] < now - FAILOVER_WINDOW_S:
+                self._outcomes.popleft()
+            failures = sum(failed for _, failed in self._outcomes)
+            if (
+                len(self._outcomes) >= FAILOVER_MIN_CALLS
+                and failures / len(self._outcomes) > FAILOVER_FAILURE_RATE
+            ):
+                self._open(f"{failures} of the last {len(self._outcomes)} calls failed")
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Get the process-wide circuit breaker of a provider."""
+    with _breakers_lock:
+        return _breakers.setdefault(provider, CircuitBreaker(provider))
+
+
+def call_timeout(model_name: str) -> float:
+    """Seconds after which a call to a model is abandoned and retried elsewhere.
+
+    Covers the longest output the call may return (for OpenAI, the first response and
+    every continuation round) at the recorded throughput of the model.
+    """
+    if provider_of(model_name) == "openai":
+        requests = 1 + OPENAI_MAX_CONTINUATION_ROUNDS
+        max_tokens = (
+            OPENAI_MAX_TOKENS
+            + OPENAI_MAX_CONTINUATION_ROUNDS * OPENAI_CONTINUATION_MAX_TOKENS
+        )
+    else:
+        requests, max_tokens = 1, GEMINI_MAX_OUTPUT_TOKENS
+    throughput = model_throughput(model_name, cached_history())
+    expected_s = (
+        requests * throughput["overhead_s"]
+        + max_tokens / throughput["output_tokens_per_s"]
+    )
+    return max(FAILOVER_MIN_CALL_TIMEOUT_S, FAILOVER_TIMEOUT_FACTOR * expected_s)
+
+
+def _succeeded(response: Optional[APIResponse]) -> bool:
+    return bool(response and response.status == "success")
+
+
+async def _attempt(
+    section: Optional[ReportSection], prompt: str, model_name: str, **kwargs
+) -> Tuple[Optional[APIResponse], Optional[str]]:
+    """Call a model, giving up early if its breaker opens or the call times out.
+
+    Returns:
+        Tuple containing the response (None if abandoned) and, if the call should be
+        retried elsewhere, the reason
+    """
+    breaker = get_breaker(provider_of(model_name))
+    timeout_s = call_timeout(model_name)
+    start = time.perf_counter()
+    task = asyncio.create_task(
+        get_provider_caller(model_name)(section, prompt, model_name, **kwargs)
+    )
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=BREAKER_POLL_S)
+            if task.done():
+                break
+            elapsed = time.perf_counter() - start
+            if breaker.is_open:
+                task.cancel()
+                return None, f"{breaker.provider} circuit breaker opened"
+            if elapsed > timeout_s:
+                task.cancel()
+                breaker.record(False)
+                return None, f"no response after {elapsed:.0f}s"
+    except asyncio.CancelledError:
+        task.cancel()
+        breaker.release_probe()
+        raise
+
+    response = task.result()
+    breaker.record(_succeeded(response))
+    if _succeeded(response):
+        return response, None
+    return response, response.message if response else "no response"
+
+
+async def call_with_failover(
+    section: Optional[ReportSection], prompt: str, model_name: str, **kwargs
+) -> Union[APIResponse, None]:
+    """Call a model, moving to its alternate model if its provider fails.
+
+    Takes the same arguments as the provider callers.
+    """
+    if not FAILOVER_ENABLED:
+        return await get_provider_caller(model_name)(
+            section, prompt, model_name, **kwargs
+        )
+
+    alternate = FALLBACK_MODELS.get(provider_of(model_name))
+    alternate_breaker = get_breaker(provider_of(alternate)) if alternate else None
+
+    primary = model_name
+    if not get_breaker(provider_of(model_name)).allow_request():
+        if alternate_breaker and alternate_breaker.allow_request():
+            logger.warning(
+                "%s circuit breaker open, sending call to %s",
+                provider_of(model_name),
+                alternate,
+            )
+            primary, alternate = alternate, None
+        # With both breakers open, the call is still attempted on the selected model
+
+    response, reason = await _attempt(section, prompt, primary, **kwargs)
+    if reason is None or not alternate or primary == alternate:
+        return response
+
+    if not alternate_breaker.allow_request():
+        logger.warning(
+            "Call to %s failed (%s) and %s is unavailable", primary, reason, alternate
+        )
+        return response
+
+    logger.warning("Call to %s failed (%s), retrying on %s", primary, reason, alternate)
+    alternate_response, _ = await _attempt(section, prompt, alternate, **kwargs)
+    return alternate_response if _succeeded(alternate_response) else response
@@ -0,0 +1,458 @@
+"""Offline stand-in for the OpenAI and Gemini APIs, used for local runs and benchmarks.
+
+The server implements the subset of the REST APIs used by the report pipeline:
+
+- OpenAI chat completions (POST /v1/chat/completions)
+- Gemini generate_content (POST /v1beta/models/{model}:generateContent)
+- Gemini cached contents (POST/GET /v1beta/cachedContents)
+
+Responses are synthetic text with a configurable latency distribution, token rate, 429
+injection and truncation. Every random draw is seeded from the request body and the
+number of times that body has been seen, so a run is reproducible regardless of the
+order in which concurrent requests arrive.
+
+To point the app at the stand-in, start it with
+
+    python -m src.services.fake_llm --port 8765
+
+and run the app with OPENAI_BASE_URL=http://127.0.0.1:8765/v1 and
+GEMINI_BASE_URL=http://127.0.0.1:8765 (any API key is accepted).
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "las unidades productivas registraron cambios en la eficiencia operativa durante "
+    "el periodo de intervención del programa pasando de un porcentaje inicial a uno "
+    "final lo que representa una variación en puntos porcentuales asociada a la "
+    "gestión de inventarios el seguimiento de indicadores y la calidad del producto"
+).split()
+
+# Characters per token used to estimate token counts
+CHARS_PER_TOKEN = 4
+# OpenAI caches prompt prefixes of at least 1024 tokens, in 128-token increments
+OPENAI_CACHE_MIN_TOKENS = 1024
+OPENAI_CACHE_BLOCK_TOKENS = 128
+
+
+class FakeLLMConfig(BaseModel):
+    """Behaviour of the offline LLM stand-in."""
+
+    latency_median_s: float = Field(
+        0.8, description="Median time to first token, in seconds."
+    )
+    latency_sigma: float = Field(
+        0.4, description="Sigma of the lognormal time-to-first-token distribution."
+    )
+    tokens_per_second: float = Field(
+        80.0, description="Output token rate used to compute the generation time."
+    )
+    completion_tokens: int = Field(
+        600, description="Mean number of tokens of a generated response."
+    )
+    max_tokens: int = Field(
+        4096, description="Default output token limit when the request sets none."
+    )
+    rate_limit_probability: float = Field(
+        0.0, description="Probability of answering a request with a 429 error."
+    )
+    max_concurrency: Optional[int] = Field(
+        None, description="Answer with 429 when more requests than this are in flight."
+    )
+    truncation_probability: float = Field(
+        0.0, description="Probability of truncating a response at the token limit."
+    )
+    time_scale: float = Field(
+        1.0, description="Multiplier applied to all simulated delays."
+    )
+    seed: int = Field(0, description="Seed for all random draws.")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class FakeLLMServer:
+    """Localhost HTTP server implementing the OpenAI and Gemini request shapes."""
+
+    def __init__(
+        self, config: Optional[FakeLLMConfig] = None, host: str = "127.0.0.1", port: int = 0
+    ):
+        self.config = config or FakeLLMConfig()
+        self._lock = threading.Lock()
+        self._seen: Dict[str, int] = {}
+        self._prefixes = set()
+        self._caches: Dict[str, Dict] = {}
+        self.stats = {
+            "requests": 0,
+            "rate_limited": 0,
+            "truncated": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+        }
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Root URL of the server (use as GEMINI_BASE_URL; OpenAI uses base_url + /v1)."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeLLMServer":
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info("Fake LLM server listening on %s", self.base_url)
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve requests in the current thread until interrupted."""
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_stats(self) -> None:
+        """Reset the request counters (the in-flight count is kept)."""
+        with self._lock:
+            for key in ("requests", "rate_limited", "truncated", "max_in_flight"):
+                self.stats[key] = 0
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # Simulation
+
+    def _rng(self, body: bytes) -> random.Random:
+        """Seeded generator for a request, stable across arrival orders."""
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            attempt = self._seen.get(digest, 0)
+            self._seen[digest] = attempt + 1
+        return random.Random(f"{self.config.seed}:{digest}:{attempt}")
+
+    def _enter(self) -> int:
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["max_in_flight"] = max(
+                self.stats["max_in_flight"], self.stats["in_flight"]
+            )
+            return self.stats["in_flight"]
+
+    def _exit(self) -> None:
+        with self._lock:
+            self.stats["in_flight"] -= 1
+
+    def _rate_limited(self, rng: random.Random, in_flight: int) -> bool:
+        limited = rng.random() < self.config.rate_limit_probability or (
+            self.config.max_concurrency is not None
+            and in_flight > self.config.max_concurrency
+        )
+        if limited:
+            with self._lock:
+                self.stats["rate_limited"] += 1
+        return limited
+
+    def _sleep(self, seconds: float) -> None:
+        time.sleep(max(0.0, seconds * self.config.time_scale))
+
+    def _openai_cached_tokens(self, prompt: str) -> int:
+        """Simulate OpenAI prefix caching on 128-token blocks of the prompt."""
+        block_chars = OPENAI_CACHE_BLOCK_TOKENS * CHARS_PER_TOKEN
+        boundaries = range(block_chars, len(prompt) + 1, block_chars)
+        hashes = [hashlib.sha256(prompt[:end].encode()).hexdigest() for end in boundaries]
+
+        with self._lock:
+            cached_blocks = 0
+            for i, prefix_hash in enumerate(hashes):
+                if prefix_hash not in self._prefixes:
+                    break
+                cached_blocks = i + 1
+            self._prefixes.update(hashes)
+
+        cached_tokens = cached_blocks * OPENAI_CACHE_BLOCK_TOKENS
+        return cached_tokens if cached_tokens >= OPENAI_CACHE_MIN_TOKENS else 0
+
+    def generate(
+        self, rng: random.Random, prompt: str, json_output: bool, max_tokens: Optional[int]
+    ) -> Tuple[str, int, bool]:
+        """Generate a synthetic response and sleep for the simulated latency.
+
+        Returns:
+            Tuple containing the text, its token count and whether it was truncated
+        """
+        limit = max_tokens or self.config.max_tokens
+        mean = self.config.completion_tokens
+        target = max(1, int(rng.gauss(mean, 0.2 * mean)))
+        if target > limit:
+            tokens, truncated = limit, True
+        elif rng.random() < self.config.truncation_probability:
+            tokens, truncated = max(1, target // 2), True
+        else:
+            tokens, truncated = target, False
+
+        words = [rng.choice(WORDS) for _ in range(max(1, tokens * CHARS_PER_TOKEN // 7))]
+        text = " ".join(words)
+
+        if json_output and not truncated:
+            # Batched section requests list the expected keys in the prompt
+            match = re.search(r"Títulos de sección esperados: (.+)", prompt)
+            titles = re.findall(r'"([^"]+)"', match.group(1)) if match else ["content"]
+            text = json.dumps(
+                {title: f"## {title.upper()}\n{text}" for title in titles},
+                ensure_ascii=False,
+            )
+        elif not json_output:
+            text = f"## SECCIÓN\n{text.capitalize()}."
+
+        if truncated:
+            with self._lock:
+                self.stats["truncated"] += 1
+
+        self._sleep(
+            rng.lognormvariate(0, self.config.latency_sigma) * self.config.latency_median_s
+            + tokens / self.config.tokens_per_second
+        )
+        return text, tokens, truncated
+
+    # Provider shapes
+
+    def openai_chat_completion(self, body: bytes, request: Dict) -> Tuple[int, Dict]:
+        """Answer an OpenAI chat completions request."""
+        rng = self._rng(body)
+        in_flight = self._enter()
+        try:
+            if self._rate_limited(rng, in_flight):
+                self._sleep(0.05)
+                return 429, {
+                    "error": {
+                        "message": "Rate limit reached (fake LLM server).",
+                        "type": "requests",
+                        "code": "rate_limit_exceeded",
+                    }
+                }
+
+            messages: List[Dict] = request.get("messages", [])
+            prompt = "\n".join(str(message.get("content", "")) for message in messages)
+            json_output = (request.get("response_format") or {}).get("type") == "json_object"
+            max_tokens = request.get("max_tokens") or request.get("max_completion_tokens")
+
+            text, tokens, truncated = self.generate(rng, prompt, json_output, max_tokens)
+            prompt_tokens = estimate_tokens(prompt)
+
+            return 200, {
+                "id": f"chatcmpl-fake-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "length" if truncated else "stop",
+                        "logprobs": None,
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": tokens,
+                    "total_tokens": prompt_tokens + tokens,
+                    "prompt_tokens_details": {
+                        "cached_tokens": self._openai_cached_tokens(prompt)
+                    },
+                },
+            }
+        finally:
+            self._exit()
+
+    def gemini_generate_content(
+        self, body: bytes, model: str, request: Dict
+    ) -> Tuple[int, Dict]:
+        """Answer a Gemini generateContent request."""
+        rng = self._rng(body)
+        in_flight = self._enter()
+        try:
+            if self._rate_limited(rng, in_flight):
+                self._sleep(0.05)
+                return 429, {
+                    "error": {
+                        "code": 429,
+                        "message": "Resource has been exhausted (fake LLM server).",
+                        "status": "RESOURCE_EXHAUSTED",
+                    }
+                }
+
+            prompt = _gemini_text(request.get("contents", []))
+            system = _gemini_text([request.get("systemInstruction") or {}])
+            cached_tokens = 0
+            cache_name = request.get("cachedContent")
+            if cache_name:
+                with self._lock:
+                    cache = self._caches.get(cache_name)
+                if cache is None:
+                    return 404, {
+                        "error": {
+                            "code": 404,
+                            "message": f"CachedContent not found: {cache_name}",
+                            "status": "NOT_FOUND",
+                        }
+                    }
+                cached_tokens = cache["usageMetadata"]["totalTokenCount"]
+
+            generation_config = request.get("generationConfig") or {}
+            json_output = generation_config.get("responseMimeType") == "application/json"
+            text, tokens, truncated = self.generate(
+                rng, prompt, json_output, generation_config.get("maxOutputTokens")
+            )
+            prompt_tokens = estimate_tokens(system + prompt) + cached_tokens
+
+            return 200, {
+                "candidates": [
+                    {
+                        "content": {"role": "model", "parts": [{"text": text}]},
+                        "finishReason": "MAX_TOKENS" if truncated else "STOP",
+                        "index": 0,
+                    }
+                ],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "cachedContentTokenCount": cached_tokens,
+                    "candidatesTokenCount": tokens,
+                    "totalTokenCount": prompt_tokens + tokens,
+                },
+                "modelVersion": model,
+            }
+        finally:
+            self._exit()
+
+    def gemini_create_cache(self, request: Dict) -> Tuple[int, Dict]:
+        """Create a Gemini cached content."""
+        ttl = float(str(request.get("ttl", "3600s")).rstrip("s"))
+        expire_time = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        text = _gemini_text(request.get("contents", [])) + _gemini_text(
+            [request.get("systemInstruction") or {}]
+        )
+        cache = {
+            "name": f"cachedContents/fake-{uuid.uuid4().hex[:12]}",
+            "displayName": request.get("displayName", ""),
+            "model": request.get("model", ""),
+            "createTime": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "expireTime": expire_time.isoformat().replace("+00:00", "Z"),
+            "usageMetadata": {"totalTokenCount": estimate_tokens(text)},
+        }
+        with self._lock:
+            self._caches[cache["name"]] = cache
+        return 200, cache
+
+    def gemini_list_caches(self) -> Tuple[int, Dict]:
+        """List the Gemini cached contents."""
+        with self._lock:
+            return 200, {"cachedContents": list(self._caches.values())}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Route requests to the provider shapes."""
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                logger.debug("%s - %s", self.address_string(), format % args)
+
+            def _send(self, status: int, payload: Dict) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                path = self.path.split("?", 1)[0]
+                if path.endswith("/cachedContents"):
+                    self._send(*server.gemini_list_caches())
+                else:
+                    self._send(404, {"error": {"message": f"Unknown path {path}"}})
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                path = self.path.split("?", 1)[0]
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                request = json.loads(body or b"{}")
+
+                gemini_match = re.search(r"/models/([^/:]+):generateContent$", path)
+                if path.endswith("/chat/completions"):
+                    self._send(*server.openai_chat_completion(body, request))
+                elif gemini_match:
+                    self._send(
+                        *server.gemini_generate_content(body, gemini_match.group(1), request)
+                    )
+                elif path.endswith("/cachedContents"):
+                    self._send(*server.gemini_create_cache(request))
+                else:
+                    self._send(404, {"error": {"message": f"Unknown path {path}"}})
+
+        return Handler
+
+
+def _gemini_text(contents: List[Dict]) -> str:
+    """Concatenate the text parts of Gemini contents."""
+    return "\n".join(
+        part.get("text", "")
+        for content in contents
+        if isinstance(content, dict)
+        for part in content.get("parts", [])
+    )
+
+
+def main() -> None:
+    """Run the fake LLM server in the foreground."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for name, field in FakeLLMConfig.model_fields.items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            type=type(field.default) if field.default is not None else int,
+            default=field.default,
+            help=field.description,
+        )
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeLLMServer(FakeLLMConfig(**args), host=host, port=port)
+    logger.info("Fake LLM server listening on %s", server.base_url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,51 +2,144 @@
 
 import asyncio
 import os
-from typing import Union
+import time
+from typing import Dict, Optional, Union
 import logging
 from google import genai
+from google.genai import types
 from ..models.sections import ReportSection, APIResponse
 from ..config.prompts import SYSTEM_PROMPT
+from ..config.generation import GEMINI_CONTEXT_CACHE
+from ..utils.telemetry import span
+from .gemini_cache import get_cached_content, invalidate_cached_content, is_cache_miss
+from .runtime import loop_local
+from .usage import format_usage
 
 logger = logging.getLogger(__name__)
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+
+
+def create_client() -> genai.Client:
+    """Create a Gemini client from the environment."""
+    return genai.Client(
+        api_key=os.getenv("GEMINI_API_KEY"),
+        # Allows pointing the client at a local stand-in (see services/fake_llm)
+        http_options=(
+            types.HttpOptions(base_url=os.getenv("GEMINI_BASE_URL"))
+            if os.getenv("GEMINI_BASE_URL")
+            else None
+        ),
+    )
+
+
+async def close_client(loop_client: genai.Client) -> None:
+    """Close the connections of a client, both blocking and async."""
+    loop_client.close()
+    await loop_client.aio.aclose()
+
+
+# The blocking client manages cached content; generation uses the async client of the
+# running loop, so that cancelling the calling task closes the request
+client = create_client()
+get_loop_client = loop_local(create_client, close=close_client)
+
+
+def extract_usage(response) -> Dict[str, int]:
+    """Extract prompt, cached and completion token counts from a Gemini response."""
+    metadata = response.usage_metadata
+    if metadata is None:
+        return {}
+
+    prompt_tokens = metadata.prompt_token_count or 0
+    cached_tokens = metadata.cached_content_token_count or 0
+
+    return {
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "uncached_tokens": prompt_tokens - cached_tokens,
+        "completion_tokens": metadata.candidates_token_count or 0,
+    }
 
 
 async def call_gemini_api(
-    section: Union[ReportSection, None], prompt_template: str, model_name: str
+    section: Union[ReportSection, None],
+    prompt: str,
+    model_name: str,
+    json_output: bool = False,
+    static_prefix: Optional[str] = None,
 ) -> Union[APIResponse, None]:
-    """Async call the gemini api to generate content for a given report section."""
+    """Async call the gemini api to generate content for a given report section.
+
+    The prompt is expected to be fully rendered, with its static instructions first.
+    SYSTEM_PROMPT is passed as the system instruction. If static_prefix is given (the
+    static part the prompt starts with), the system prompt and the prefix are served
+    from Gemini cached content when available, and only the rest of the prompt is sent.
+    The token usage reported by the API, including cached tokens, is returned under
+    data["usage"]. If json_output is True, the model is constrained to return a JSON object.
+    """
 
     if section:
         logger.info("Calling Gemini API for section: %s", section.title)
-
-        # join all interpretations from the section's variables
-        combined_interpretation = "\n\n".join(
-            data.interpretation for data in section.variables.values()
-        )
-
-        prompt = prompt_template.format(interpretations=combined_interpretation)
-
     else:
         logger.info("Calling Gemini API for no section - likely executive summary")
-        prompt = prompt_template
 
     try:
-        # Combine system prompt and user prompt
-        full_prompt = f"{SYSTEM_PROMPT}\n\nUser: {prompt}"
+        output_config = {"response_mime_type": "application/json"} if json_output else {}
 
-        response = await asyncio.to_thread(
-            client.models.generate_content, model=model_name, contents=full_prompt
-        )
+        cached_content = None
+        if GEMINI_CONTEXT_CACHE and static_prefix and prompt.startswith(static_prefix):
+            cached_content = await asyncio.to_thread(
+                get_cached_content, client, model_name, SYSTEM_PROMPT, static_prefix
+            )
+
+        start = time.perf_counter()
+        response = None
+        retries = 0
+        if cached_content:
+            try:
+                with span("gemini {model}", model=model_name, cached=True) as llm_span:
+                    response = await get_loop_client().aio.models.generate_content(
+                        model=model_name,
+                        contents=prompt[len(static_prefix) :],
+                        config=types.GenerateContentConfig(
+                            cached_content=cached_content, **output_config
+                        ),
+                    )
+                    llm_span.set_attributes(extract_usage(response))
+            except Exception as err:  # pylint: disable=broad-except
+                # Only a cached content that expired or was deleted is retried
+                # uncached; other errors would fail the same way without it
+                if not is_cache_miss(err):
+                    raise
+                logger.warning(
+                    "Gemini call with cached content failed, retrying uncached: %s", err
+                )
+                invalidate_cached_content(cached_content)
+                retries += 1
+
+        if response is None:
+            with span(
+                "gemini {model}", model=model_name, cached=False, retries=retries
+            ) as llm_span:
+                response = await get_loop_client().aio.models.generate_content(
+                    model=model_name,
+                    contents=prompt,
+                    config=types.GenerateContentConfig(
+                        system_instruction=SYSTEM_PROMPT, **output_config
+                    ),
+                )
+                llm_span.set_attributes(extract_usage(response))
 
         generated_text = response.text
+        usage = extract_usage(response)
+        usage["retries"] = retries
+        usage["latency_s"] = round(time.perf_counter() - start, 3)
 
-        logger.info("Received response from Gemini API.")
+        logger.info("Received response from Gemini API: %s", format_usage(usage))
 
         return APIResponse(
             status="success",
             message="Content generated successfully.",
-            data={"content": generated_text},
+            data={"content": generated_text, "usage": usage},
         )
 
     except Exception as err:  # pylint: disable=broad-except
@@ -0,0 +1,159 @@
+"""Registry of Gemini cached contents for the shared system prompt and section instructions.
+
+Cached contents are keyed by a hash of the model, system prompt and static prefix, and
+are kept in a process-wide registry so that every section call and Streamlit session in
+the process reuses the same handle until it expires. Handles created by other processes
+are found through their display name, listing the account's cached contents once per
+process; handles that expire later are replaced without listing them again. If caching is not available (prefix too short,
+unsupported model, API error), callers fall back to uncached requests.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from google.genai import errors, types
+from ..config.generation import (
+    GEMINI_CACHE_MIN_TOKENS,
+    GEMINI_CACHE_RETRY_SECONDS,
+    GEMINI_CACHE_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Handles are considered expired this many seconds before their actual expiry, so that
+# a request never starts with a handle that expires while it is in flight
+EXPIRY_MARGIN_SECONDS = 60
+# Prefix of the display names of the cached contents created by the app
+KEY_PREFIX = "zasca-"
+
+_registry: Dict[str, Tuple[str, float]] = {}
+_failures: Dict[str, float] = {}
+_registry_lock = threading.Lock()
+_key_locks: Dict[str, threading.Lock] = {}
+_list_lock = threading.Lock()
+_listed = False
+
+
+def cache_key(model_name: str, system_prompt: str, static_prefix: str) -> str:
+    """Build the registry key (also used as display name) for a cached content."""
+    digest = hashlib.sha256(
+        "\0".join([model_name, system_prompt, static_prefix]).encode("utf-8")
+    ).hexdigest()
+    return f"{KEY_PREFIX}{digest[:32]}"
+
+
+def _key_lock(key: str) -> threading.Lock:
+    """Get the lock that serialises cache creation for a key."""
+    with _registry_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def _lookup(key: str) -> Optional[str]:
+    """Return the registered handle for a key if it has not expired."""
+    with _registry_lock:
+        entry = _registry.get(key)
+    if entry and entry[1] - EXPIRY_MARGIN_SECONDS > time.time():
+        return entry[0]
+    return None
+
+
+def _register_existing(client) -> None:
+    """Register the cached contents created by other processes, on the first call only."""
+    global _listed  # pylint: disable=global-statement
+    with _list_lock:
+        if _listed:
+            return
+        found: Dict[str, Tuple[str, float]] = {}
+        for cached in client.caches.list():
+            key = cached.display_name or ""
+            if not key.startswith(KEY_PREFIX) or not cached.expire_time:
+                continue
+            expire_ts = cached.expire_time.timestamp()
+            if expire_ts > found.get(key, ("", 0.0))[1]:
+                found[key] = (cached.name, expire_ts)
+        with _registry_lock:
+            for key, entry in found.items():
+                if entry[1] > _registry.get(key, ("", 0.0))[1]:
+                    _registry[key] = entry
+        _listed = True
+
+
+def get_cached_content(
+    client, model_name: str, system_prompt: str, static_prefix: str
+) -> Optional[str]:
+    """Get (creating it if needed) the cached content handle for a static prefix.
+
+    This function performs blocking API calls and should be run in a worker thread.
+
+    Returns:
+        The cached content name, or None if caching is not available for this prefix
+    """
+    if (len(system_prompt) + len(static_prefix)) / 4 < GEMINI_CACHE_MIN_TOKENS:
+        return None
+
+    key = cache_key(model_name, system_prompt, static_prefix)
+    name = _lookup(key)
+    if name:
+        return name
+
+    with _key_lock(key):
+        # Another thread may have created the handle while we were waiting
+        name = _lookup(key)
+        if name:
+            return name
+
+        with _registry_lock:
+            failed_at = _failures.get(key)
+        if failed_at and time.time() - failed_at < GEMINI_CACHE_RETRY_SECONDS:
+            return None
+
+        try:
+            _register_existing(client)
+            name = _lookup(key)
+            if not name:
+                cached = client.caches.create(
+                    model=model_name,
+                    config=types.CreateCachedContentConfig(
+                        display_name=key,
+                        system_instruction=system_prompt,
+                        contents=[static_prefix],
+                        ttl=f"{GEMINI_CACHE_TTL_SECONDS}s",
+                    ),
+                )
+                name = cached.name
+                expire_ts = (
+                    cached.expire_time.timestamp()
+                    if cached.expire_time
+                    else time.time() + GEMINI_CACHE_TTL_SECONDS
+                )
+                logger.info("Created Gemini cached content %s (%s)", name, key)
+                with _registry_lock:
+                    _registry[key] = (name, expire_ts)
+        except Exception as err:  # pylint: disable=broad-except
+            logger.warning("Gemini context caching not available: %s", err)
+            with _registry_lock:
+                _failures[key] = time.time()
+            return None
+
+        with _registry_lock:
+            _failures.pop(key, None)
+        return name
+
+
+def is_cache_miss(err: Exception) -> bool:
+    """Whether an API error reports that a cached content is missing or has expired."""
+    return (
+        isinstance(err, errors.APIError)
+        and err.code in (400, 403, 404)
+        and "cache" in (err.message or "").lower()
+    )
+
+
+def invalidate_cached_content(name: str) -> None:
+    """Drop a handle from the registry, e.g. after the API reported it as missing."""
+    with _registry_lock:
+        for key, (cached_name, _) in list(_registry.items()):
+            if cached_name == name:
+                del _registry[key]
@@ -1,77 +1,193 @@
 """Module to interact with the OpenAI API to generate content for a given report section."""
 
-import asyncio
-from typing import Union
+import time
+from typing import Dict, List, Optional, Tuple, Union
 import logging
-from openai import OpenAI
+from openai import AsyncOpenAI
 from ..models.sections import ReportSection, APIResponse
-from ..config.prompts import SYSTEM_PROMPT
+from ..config.prompts import SYSTEM_PROMPT, continuation_prompt
+from ..config.generation import (
+    CONTINUATION_MAX_OVERLAP_CHARS,
+    CONTINUATION_MIN_OVERLAP_CHARS,
+    OPENAI_CONTINUATION_MAX_TOKENS,
+    OPENAI_MAX_CONTINUATION_ROUNDS,
+    OPENAI_MAX_TOKENS,
+)
+from ..utils.telemetry import span
+from .runtime import loop_local
+from .usage import format_usage, merge_usage
 
 logger = logging.getLogger(__name__)
-client = OpenAI()
+get_client = loop_local(AsyncOpenAI, close=AsyncOpenAI.close)
+
+
+def extract_usage(response) -> Dict[str, int]:
+    """Extract prompt, cached and completion token counts from an OpenAI response."""
+    usage = response.usage
+    if usage is None:
+        return {}
+
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details else 0
+
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "uncached_tokens": usage.prompt_tokens - cached_tokens,
+        "completion_tokens": usage.completion_tokens,
+    }
+
+
+def stitch_continuation(text: str, continuation: str) -> str:
+    """Append a continuation to a partial text, dropping any text it repeats.
+
+    Models often restart a continuation with the last words of the partial output. The
+    longest suffix of text (between CONTINUATION_MIN_OVERLAP_CHARS and
+    CONTINUATION_MAX_OVERLAP_CHARS characters) that the continuation starts with is
+    treated as repeated and removed. Continuations that restart the whole text, or
+    repeat its opening heading, are cut after the text or the heading.
+    """
+    stripped = continuation.lstrip()
+    start = text.strip()
+    if len(start) >= CONTINUATION_MIN_OVERLAP_CHARS and stripped.startswith(start):
+        return text + stripped[len(start) :]
+
+    heading = start.split("\n", 1)[0]
+    if heading.startswith("#") and stripped.startswith(heading):
+        stripped = stripped[len(heading) :].lstrip()
+        continuation = stripped if text[-1:].isspace() else "\n" + stripped
+
+    max_overlap = min(len(text), len(stripped), CONTINUATION_MAX_OVERLAP_CHARS)
+    for size in range(max_overlap, CONTINUATION_MIN_OVERLAP_CHARS - 1, -1):
+        if text.endswith(stripped[:size]):
+            return text + stripped[size:]
+
+    return text + continuation
+
+
+async def create_completion(
+    messages: List[Dict[str, str]],
+    model_name: str,
+    max_tokens: int,
+    json_output: bool = False,
+) -> Tuple[str, str, Dict[str, int]]:
+    """Run a chat completion, traced as an "openai" span.
+
+    Besides the token counts, the usage includes the retries made by the SDK. The
+    request is made with the async client, so cancelling the calling task closes it.
+
+    Returns:
+        Tuple containing the generated text, the finish reason and the token usage
+    """
+    with span(
+        "openai {model}", model=model_name, max_tokens=max_tokens, json_output=json_output
+    ) as llm_span:
+        raw_response = await get_client().chat.completions.with_raw_response.create(
+            model=model_name,
+            messages=messages,
+            temperature=0.5,
+            max_tokens=max_tokens,
+            **({"response_format": {"type": "json_object"}} if json_output else {}),
+        )
+        response = raw_response.parse()
+        choice = response.choices[0]
+        usage = {
+            **extract_usage(response),
+            "retries": raw_response.retries_taken,
+        }
+        llm_span.set_attributes({**usage, "finish_reason": choice.finish_reason})
+    return choice.message.content or "", choice.finish_reason, usage
 
 
 async def call_openai_api(
-    section: Union[ReportSection, None], prompt_template: str, model_name: str
+    section: Union[ReportSection, None],
+    prompt: str,
+    model_name: str,
+    json_output: bool = False,
+    static_prefix: Optional[str] = None,  # pylint: disable=unused-argument
 ) -> Union[APIResponse, None]:
-    """Asynchronously call the OpenAI API to generate content for a given report section."""
+    """Asynchronously call the OpenAI API to generate content for a given report section.
+
+    The prompt is expected to be fully rendered, with its static instructions first so
+    that OpenAI's automatic prompt caching can reuse the prefix across calls. The token
+    usage reported by the API, including cached tokens, is returned under data["usage"].
+    If json_output is True, the model is constrained to return a JSON object.
+    static_prefix is accepted for interface parity with the Gemini caller; OpenAI caches
+    prompt prefixes automatically.
+
+    If the response is truncated by the token limit, up to OPENAI_MAX_CONTINUATION_ROUNDS
+    continuation calls are made, each sending the output so far as the assistant turn.
+    Continuations are requested as plain text, also for JSON output, so they carry on the
+    truncated object.
+    The rounds, time and tokens spent on continuations are reported in the usage.
+    """
     if section:
         logger.info("Calling OpenAI API for section: %s", section.title)
-        
-        # Join all interpretations from the section's variables
-        combined_interpretation = "\n\n".join(
-            data.interpretation 
-            for data in section.variables.values()
-        )
-        
-        prompt = prompt_template.format(interpretations=combined_interpretation)
     else:
         logger.info("Calling OpenAI API for no section")
-        prompt = prompt_template
 
     try:
-        response = await asyncio.to_thread(
-            client.chat.completions.create,
-            model=model_name,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.5,
-        )
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
 
-        generated_text = response.dict()["choices"][0]["message"]["content"]
+        start = time.perf_counter()
+        generated_text, finish_reason, usage = await create_completion(
+            messages, model_name, OPENAI_MAX_TOKENS, json_output
+        )
+        first_call_seconds = time.perf_counter() - start
 
-        if response.dict()["choices"][0]["finish_reason"] == "length":
+        rounds = 0
+        continuation_usage = {}
+        while finish_reason == "length" and rounds < OPENAI_MAX_CONTINUATION_ROUNDS:
+            rounds += 1
             logger.warning(
                 "The response was truncated due to reaching the maximum token limit."
+                " Continuation round %d of %d.",
+                rounds,
+                OPENAI_MAX_CONTINUATION_ROUNDS,
             )
 
-            # continue generating content
-            continuation_response = await asyncio.to_thread(
-                client.chat.completions.create,
-                model=model_name,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": prompt},
-                    {"role": "system", "content": generated_text},
-                    {"role": "user", "content": "Continua generando el contenido."},
+            continuation_text, finish_reason, round_usage = await create_completion(
+                messages
+                + [
+                    {"role": "assistant", "content": generated_text},
+                    {"role": "user", "content": continuation_prompt.strip()},
                 ],
-                temperature=0.5,
+                model_name,
+                OPENAI_CONTINUATION_MAX_TOKENS,
+                # JSON mode would make the continuation a new object rather than the
+                # rest of the truncated one
+                json_output=False,
             )
+            continuation_usage = merge_usage(continuation_usage, round_usage)
+            generated_text = stitch_continuation(generated_text, continuation_text)
 
-            continuation_text = continuation_response.dict()["choices"][0]["message"][
-                "content"
-            ]
+        if finish_reason == "length":
+            logger.warning(
+                "The response is still truncated after %d continuation rounds.", rounds
+            )
 
-            generated_text += continuation_text
+        usage = merge_usage(usage, continuation_usage)
+        usage["latency_s"] = round(time.perf_counter() - start, 3)
+        if rounds:
+            usage["continuation_rounds"] = rounds
+            usage["continuation_s"] = round(usage["latency_s"] - first_call_seconds, 3)
+            usage["continuation_prompt_tokens"] = continuation_usage.get(
+                "prompt_tokens", 0
+            )
+            usage["continuation_completion_tokens"] = continuation_usage.get(
+                "completion_tokens", 0
+            )
+            usage["truncated"] = int(finish_reason == "length")
 
-        logger.info("Received response from OpenAI API.")
+        logger.info("Received response from OpenAI API: %s", format_usage(usage))
 
         return APIResponse(
             status="success",
             message="Content generated successfully.",
-            data={"content": generated_text},
+            data={"content": generated_text, "usage": usage},
         )
 
     except Exception as err:  # pylint: disable=broad-except
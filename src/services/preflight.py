@@ -0,0 +1,404 @@
+"""Pre-flight estimate of the prompts, tokens, latency and cost of a report.
+
+Every prompt the generation would send is rendered from the aggregated sections,
+without calling any API. Prompts that depend on generated text (digests, summaries,
+edit) are rendered with placeholders, which are counted at the expected completion
+size of the call that produces them (PREFLIGHT_COMPLETION_TOKENS).
+
+Tokens are counted locally (see services/tokens). Latencies use the throughput
+recorded in previous runs (see services/throughput), and the wall time follows the
+concurrency of the pipeline: section calls run in parallel, followed by the summary
+and the edit.
+"""
+
+import math
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from ..config.generation import (
+    GEMINI_CACHE_MIN_TOKENS,
+    GEMINI_CONTEXT_CACHE,
+    MODEL_CONTEXT_TOKENS,
+    MODEL_MAX_OUTPUT_TOKENS,
+    OPENAI_CONTINUATION_MAX_TOKENS,
+    OPENAI_MAX_CONTINUATION_ROUNDS,
+    OPENAI_MAX_TOKENS,
+    PREFLIGHT_COMPLETION_TOKENS,
+)
+from ..config.prompts import SYSTEM_PROMPT, continuation_prompt, section_prompts
+from ..models.sections import ReportSection
+from ..utils.metrics import estimate_cost
+from .api_helpers import plan_section_batches
+from .prompt_builder import (
+    render_batch_prompt,
+    render_digest_prompt,
+    render_edit_prompt,
+    render_reconciliation_prompt,
+    render_section_prompt,
+    render_speculative_summary_prompt,
+    render_summary_prompt,
+)
+from .routing import choose_model, get_policy
+from .throughput import load_history, model_throughput
+from .tokens import count_tokens, has_tokenizer
+
+# Stand-ins for text that only exists once the previous calls have completed
+CONTENT_PLACEHOLDER = "⟦contenido de la sección⟧"
+DIGEST_PLACEHOLDER = "⟦resumen de la sección⟧"
+DRAFT_PLACEHOLDER = "⟦borrador del resumen⟧"
+
+
+class PlannedCall(BaseModel):
+    """Estimate of one model call."""
+
+    stage: str = Field(..., description="Stage key, as in MESSAGES['info'].")
+    label: str = Field(..., description="What the call generates.")
+    model_name: str = Field(..., description="Model the call is routed to.")
+    prompt_tokens: int = Field(..., description="Prompt tokens of the first request.")
+    cached_tokens: int = Field(0, description="Prompt tokens expected to be cached.")
+    completion_tokens: int = Field(..., description="Expected completion tokens.")
+    continuation_rounds: int = Field(0, description="Expected continuation calls.")
+    continuation_prompt_tokens: int = Field(
+        0, description="Prompt tokens resent by the continuation calls."
+    )
+    latency_s: float = Field(..., description="Expected duration in seconds.")
+    cost: Optional[float] = Field(None, description="Estimated cost in USD.")
+    warnings: List[str] = Field(default_factory=list)
+
+
+class PreflightEstimate(BaseModel):
+    """Estimate of a whole report generation."""
+
+    model_name: str
+    calls: List[PlannedCall] = Field(default_factory=list)
+    wall_s: float = Field(0.0, description="Expected duration of the generation.")
+    tokenizer: bool = Field(
+        ..., description="Whether tokens were counted with a tokenizer."
+    )
+
+    @property
+    def prompt_tokens(self) -> int:
+        """Prompt tokens of all the calls, continuations included."""
+        return sum(
+            call.prompt_tokens + call.continuation_prompt_tokens for call in self.calls
+        )
+
+    @property
+    def completion_tokens(self) -> int:
+        """Expected completion tokens of all the calls."""
+        return sum(call.completion_tokens for call in self.calls)
+
+    @property
+    def cost(self) -> Optional[float]:
+        """Estimated cost in USD, if the model is priced."""
+        costs = [call.cost for call in self.calls]
+        return sum(costs) if costs and None not in costs else None
+
+    @property
+    def warnings(self) -> List[str]:
+        """Warnings of all the calls."""
+        return [
+            f"{call.label}: {warning}" for call in self.calls for warning in call.warnings
+        ]
+
+
+def _prompt_tokens(
+    prompt: str, model_name: str, placeholder_tokens: Dict[str, int]
+) -> int:
+    """Count the tokens of a rendered prompt, expanding its placeholders."""
+    tokens = count_tokens(SYSTEM_PROMPT, model_name)
+    for placeholder, size in placeholder_tokens.items():
+        tokens += prompt.count(placeholder) * size
+        prompt = prompt.replace(placeholder, "")
+    return tokens + count_tokens(prompt, model_name)
+
+
+def _cached_prefix_tokens(section: ReportSection, model_name: str) -> int:
+    """Tokens of a section prompt served from Gemini cached content."""
+    static_prefix = section_prompts[section.title]
+    if (
+        not model_name.startswith("gemini")
+        or not GEMINI_CONTEXT_CACHE
+        # Same threshold as services/gemini_cache
+        or (len(SYSTEM_PROMPT) + len(static_prefix)) / 4 < GEMINI_CACHE_MIN_TOKENS
+    ):
+        return 0
+    return count_tokens(SYSTEM_PROMPT + static_prefix, model_name)
+
+
+def plan_call(
+    stage: str,
+    label: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    model_name: str,
+    throughput: Dict[str, float],
+    cached_tokens: int = 0,
+) -> PlannedCall:
+    """Estimate the latency, cost, continuations and limits of a call."""
+    warnings = []
+    context = MODEL_CONTEXT_TOKENS.get(model_name)
+    rounds = 0
+    continuation_prompt_tokens = 0
+
+    if model_name.startswith("gpt"):
+        if context and prompt_tokens + OPENAI_MAX_TOKENS > context:
+            warnings.append(
+                f"el prompt ({prompt_tokens:,} tokens) más la respuesta máxima "
+                f"({OPENAI_MAX_TOKENS:,}) excede el contexto del modelo ({context:,})"
+            )
+        if completion_tokens > OPENAI_MAX_TOKENS:
+            needed = math.ceil(
+                (completion_tokens - OPENAI_MAX_TOKENS) / OPENAI_CONTINUATION_MAX_TOKENS
+            )
+            rounds = min(needed, OPENAI_MAX_CONTINUATION_ROUNDS)
+            # Each round resends the prompt and the output so far
+            continuation_tokens = count_tokens(continuation_prompt, model_name)
+            for i in range(rounds):
+                continuation_prompt_tokens += (
+                    prompt_tokens
+                    + OPENAI_MAX_TOKENS
+                    + i * OPENAI_CONTINUATION_MAX_TOKENS
+                    + continuation_tokens
+                )
+            warnings.append(
+                f"la respuesta esperada ({completion_tokens:,} tokens) supera el "
+                f"límite por llamada ({OPENAI_MAX_TOKENS:,}) y activará {rounds} "
+                "ronda(s) de continuación"
+            )
+            if needed > OPENAI_MAX_CONTINUATION_ROUNDS:
+                warnings.append(
+                    "la respuesta quedará truncada tras "
+                    f"{OPENAI_MAX_CONTINUATION_ROUNDS} rondas de continuación"
+                )
+                completion_tokens = (
+                    OPENAI_MAX_TOKENS + rounds * OPENAI_CONTINUATION_MAX_TOKENS
+                )
+            # The last round sends everything generated before it
+            last_request = (
+                prompt_tokens
+                + OPENAI_MAX_TOKENS
+                + rounds * OPENAI_CONTINUATION_MAX_TOKENS
+            )
+            if context and last_request > context:
+                warnings.append(
+                    "las rondas de continuación exceden el contexto del modelo "
+                    f"({context:,} tokens)"
+                )
+    else:
+        if context and prompt_tokens > context:
+            warnings.append(
+                f"el prompt ({prompt_tokens:,} tokens) excede el contexto del modelo "
+                f"({context:,})"
+            )
+        max_output = MODEL_MAX_OUTPUT_TOKENS.get(model_name)
+        if max_output and completion_tokens > max_output:
+            warnings.append(
+                f"la respuesta esperada ({completion_tokens:,} tokens) supera la "
+                f"salida máxima del modelo ({max_output:,}) y quedará truncada"
+            )
+            completion_tokens = max_output
+
+    latency = (1 + rounds) * throughput["overhead_s"] + (
+        completion_tokens / throughput["output_tokens_per_s"]
+    )
+    cost = estimate_cost(
+        model_name,
+        {
+            "prompt_tokens": prompt_tokens + continuation_prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+        },
+    )
+    return PlannedCall(
+        stage=stage,
+        label=label,
+        model_name=model_name,
+        prompt_tokens=prompt_tokens,
+        cached_tokens=cached_tokens,
+        completion_tokens=completion_tokens,
+        continuation_rounds=rounds,
+        continuation_prompt_tokens=continuation_prompt_tokens,
+        latency_s=round(latency, 2),
+        cost=cost,
+        warnings=warnings,
+    )
+
+
+def estimate_report(
+    report_sections: List[ReportSection],
+    cohort_info: str,
+    model_name: str,
+    skip_editing: bool = True,
+    summary_mode: str = "standard",
+    batch_sections: bool = False,
+    routing_policy: str = "selected",
+) -> PreflightEstimate:
+    """Estimate the calls of generate_report_content without calling any API.
+
+    Args:
+        report_sections: Aggregated report sections (their content is not used)
+        cohort_info: String containing cohort information
+        model_name: Name of the model to use
+        skip_editing: Whether the report editing step is skipped
+        summary_mode: Executive summary mode ("standard", "hierarchical" or "speculative")
+        batch_sections: Whether small sections are batched into shared requests
+        routing_policy: Key of ROUTING_POLICIES used to choose the model of each call
+
+    Returns:
+        The estimate of every call and of the whole generation
+    """
+    history = load_history()
+    policy = get_policy(routing_policy)
+    section_tokens = PREFLIGHT_COMPLETION_TOKENS["section"]
+    digest_tokens = PREFLIGHT_COMPLETION_TOKENS["digest"]
+    summary_tokens = PREFLIGHT_COMPLETION_TOKENS["summary"]
+    placeholder_tokens = {
+        CONTENT_PLACEHOLDER: section_tokens,
+        DIGEST_PLACEHOLDER: digest_tokens,
+        DRAFT_PLACEHOLDER: summary_tokens,
+    }
+    use_digests = summary_mode == "hierarchical"
+
+    def call(
+        stage: str,
+        purpose: str,
+        label: str,
+        prompt: str,
+        completion: int,
+        section: Optional[ReportSection] = None,
+    ) -> PlannedCall:
+        prompt_tokens = _prompt_tokens(prompt, model_name, placeholder_tokens)
+        routed = choose_model(
+            model_name,
+            purpose,
+            prompt_tokens,
+            section.title if section else None,
+            policy,
+        ).model_name
+        return plan_call(
+            stage,
+            label,
+            prompt_tokens,
+            completion,
+            routed,
+            model_throughput(routed, history),
+            _cached_prefix_tokens(section, routed) if section else 0,
+        )
+
+    sections = [
+        section for section in report_sections if section.title in section_prompts
+    ]
+    if batch_sections:
+        individual, batches = plan_section_batches(sections)
+    else:
+        individual, batches = sections, []
+
+    section_calls = [
+        call(
+            "generating_sections",
+            "section",
+            section.title,
+            render_section_prompt(section, cohort_info),
+            section_tokens,
+            section,
+        )
+        for section in individual
+    ] + [
+        call(
+            "generating_sections",
+            "batch",
+            " + ".join(section.title for section in batch),
+            render_batch_prompt(batch, cohort_info),
+            section_tokens * len(batch),
+        )
+        for batch in batches
+    ]
+
+    # Sections as they will be once generated
+    generated = [
+        section.model_copy(
+            update={
+                "content": CONTENT_PLACEHOLDER,
+                # Reconciliation reads sections truncated to about a digest's size
+                "digest": (
+                    DIGEST_PLACEHOLDER
+                    if summary_mode in ("hierarchical", "speculative")
+                    else None
+                ),
+            }
+        )
+        for section in sections
+    ]
+
+    digest_calls = (
+        [
+            call(
+                "generating_sections",
+                "digest",
+                f"Resumen de {section.title}",
+                render_digest_prompt(section),
+                digest_tokens,
+            )
+            for section in generated
+        ]
+        if use_digests
+        else []
+    )
+
+    def longest(calls: List[PlannedCall]) -> float:
+        return max((planned.latency_s for planned in calls), default=0.0)
+
+    # Digests start as their section completes
+    sections_wall = longest(section_calls) + longest(digest_calls)
+
+    if summary_mode == "speculative":
+        draft_call = call(
+            "generating_sections",
+            "draft",
+            "Borrador del resumen ejecutivo",
+            render_speculative_summary_prompt(sections, cohort_info),
+            summary_tokens,
+        )
+        summary_calls = [
+            draft_call,
+            call(
+                "generating_summary",
+                "summary",
+                "Conciliación del resumen ejecutivo",
+                render_reconciliation_prompt(DRAFT_PLACEHOLDER, generated),
+                summary_tokens,
+            ),
+        ]
+        # The draft runs concurrently with the section calls
+        wall = max(sections_wall, draft_call.latency_s) + summary_calls[1].latency_s
+    else:
+        summary_calls = [
+            call(
+                "generating_summary",
+                "summary",
+                "Resumen ejecutivo",
+                render_summary_prompt(generated, cohort_info, use_digests),
+                summary_tokens,
+            )
+        ]
+        wall = sections_wall + summary_calls[0].latency_s
+
+    edit_calls = []
+    if not skip_editing:
+        edit_calls.append(
+            call(
+                "editing_report",
+                "edit",
+                "Edición final",
+                render_edit_prompt(generated),
+                section_tokens * len(generated),
+            )
+        )
+        wall += edit_calls[0].latency_s
+
+    return PreflightEstimate(
+        model_name=model_name,
+        calls=section_calls + digest_calls + summary_calls + edit_calls,
+        wall_s=round(wall, 2),
+        tokenizer=has_tokenizer(model_name),
+    )
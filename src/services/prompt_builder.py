@@ -0,0 +1,141 @@
+"""Functions to render the prompts sent to the AI APIs.
+
+Prompts are laid out with the static instructions first and the cohort and
+interpretation data appended at the end, so that the system prompt and the section
+instructions form a stable prefix that providers can cache across calls.
+"""
+
+from typing import List, Optional
+from src.models.sections import ReportSection
+from src.config.generation import COMPACT_INTERPRETATIONS, DIGEST_MAX_CHARS
+from src.services.compaction import compact_interpretations
+from src.config.prompts import (
+    batch_sections_prompt,
+    digest_summary_prompt,
+    executive_summary_prompt,
+    final_edit_prompt,
+    section_data_prompt,
+    section_digest_prompt,
+    section_prompts,
+    speculative_summary_prompt,
+    summary_reconciliation_prompt,
+)
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Truncate text to at most max_chars, preferring to cut at a sentence boundary."""
+    text = text.strip()
+    if len(text) <= max_chars:
+        return text
+
+    truncated = text[:max_chars]
+    last_stop = truncated.rfind(". ")
+    if last_stop > max_chars // 2:
+        return truncated[: last_stop + 1]
+    return truncated.rstrip() + "…"
+
+
+def combine_interpretations(section: ReportSection) -> str:
+    """Join the interpretations of all the variables in a section."""
+    return "\n\n".join(data.interpretation for data in section.variables.values())
+
+
+def section_interpretations(section: ReportSection) -> str:
+    """Interpretations of a section as sent in the prompts, compacted if enabled."""
+    if COMPACT_INTERPRETATIONS:
+        return compact_interpretations(section)
+    return combine_interpretations(section)
+
+
+def render_section_data(section: ReportSection, cohort_info: str) -> str:
+    """Render the dynamic data block (cohort details and interpretations) of a section."""
+    return section_data_prompt.format(
+        cohort_details=cohort_info,
+        interpretations=section_interpretations(section),
+    )
+
+
+def render_section_prompt(section: ReportSection, cohort_info: str) -> Optional[str]:
+    """Render the full prompt for a section, or None if the section has no template."""
+    static_prompt = section_prompts.get(section.title)
+    if not static_prompt:
+        return None
+
+    return static_prompt + render_section_data(section, cohort_info)
+
+
+def render_batch_prompt(batch: List[ReportSection], cohort_info: str) -> str:
+    """Render the structured prompt requesting several sections at once."""
+    section_tasks = "\n\n".join(
+        f'=== Sección: "{section.title}" ===\n'
+        f"{render_section_prompt(section, cohort_info)}"
+        for section in batch
+    )
+    prompt = batch_sections_prompt.replace("{section_tasks}", section_tasks)
+    return prompt.replace(
+        "{section_titles}", ", ".join(f'"{section.title}"' for section in batch)
+    )
+
+
+def render_digest_prompt(section: ReportSection) -> str:
+    """Render the prompt condensing the generated content of a section."""
+    prompt = section_digest_prompt.replace("{section_title}", section.title)
+    return prompt.replace("{section_content}", section.content)
+
+
+def format_section_digests(sections: List[ReportSection]) -> str:
+    """Format the digests of the sections as a numbered list for summary prompts."""
+    return "\n".join(
+        [
+            f"{i+1}. {section.title}: "
+            f"{section.digest or truncate_text(section.content, DIGEST_MAX_CHARS)}"
+            for i, section in enumerate(
+                [section for section in sections if section.content]
+            )
+        ]
+    )
+
+
+def render_summary_prompt(
+    sections: List[ReportSection], cohort_info: str, use_digests: bool = False
+) -> str:
+    """Render the executive summary prompt from the section contents or digests."""
+    if use_digests:
+        prompt = digest_summary_prompt.replace("{cohort_details}", cohort_info)
+        return prompt.replace("{section_digests}", format_section_digests(sections))
+
+    content = "\n".join(
+        [f"{i+1}. {section.content}" for i, section in enumerate(sections)]
+    )
+    prompt = executive_summary_prompt.replace("{cohort_details}", cohort_info)
+    return prompt.replace("{sections_content}", content)
+
+
+def render_speculative_summary_prompt(
+    sections: List[ReportSection], cohort_info: str
+) -> str:
+    """Render the prompt drafting the executive summary from the interpretations."""
+    interpretations = "\n\n".join(
+        f"### {section.title}\n{section_interpretations(section)}"
+        for section in sections
+        if section.variables
+    )
+    prompt = speculative_summary_prompt.replace("{cohort_details}", cohort_info)
+    return prompt.replace("{interpretations}", interpretations)
+
+
+def render_reconciliation_prompt(
+    draft_summary: str, sections: List[ReportSection]
+) -> str:
+    """Render the prompt reconciling a drafted summary with the generated sections.
+
+    Sections without a digest are included truncated to DIGEST_MAX_CHARS.
+    """
+    prompt = summary_reconciliation_prompt.replace("{draft_summary}", draft_summary)
+    return prompt.replace("{section_digests}", format_section_digests(sections))
+
+
+def render_edit_prompt(sections: List[ReportSection]) -> str:
+    """Render the final edit prompt over the content of all sections."""
+    sections_content = "\n\n".join([section.content for section in sections])
+    return final_edit_prompt.format(sections_content=sections_content)
@@ -0,0 +1,342 @@
+"""Persistent store of generated reports and their artifacts.
+
+Each report is recorded in a SQLite database with the hash of its inputs (data,
+selected variables, cohort information and options), its options, executive summary,
+edited output and sections (content generated by the model, variables and usage). A
+report can belong to an owner (e.g. a user or Streamlit session): lookups scoped to an
+owner treat the reports of other owners as unknown.
+Artifacts (JSON output, Word documents, charts) are kept in a content-addressed blob
+directory: each blob is stored once, under the SHA-256 of its content, so identical
+artifacts of different reports share storage.
+
+Blobs are written to a temporary file and renamed into place, and a report's rows are
+committed in a single transaction once its blobs are written, so a crash never leaves
+a report referring to a partial file. The store lives in ZASCA_REPORT_STORE
+(report_store in the working directory by default) and is shared by every session
+and process using that directory.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+import pandas as pd
+from pydantic import BaseModel, Field
+from ..models.sections import ReportSection
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    report_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    cohort_info TEXT NOT NULL,
+    inputs_hash TEXT NOT NULL,
+    options TEXT NOT NULL,
+    executive_summary TEXT NOT NULL,
+    edited_output TEXT NOT NULL,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS reports_inputs_hash ON reports (inputs_hash);
+CREATE TABLE IF NOT EXISTS sections (
+    report_id TEXT NOT NULL REFERENCES reports (report_id),
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (report_id, position)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    report_id TEXT NOT NULL REFERENCES reports (report_id),
+    name TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (report_id, name)
+);
+"""
+# Stores created before reports had owners lack the column
+OWNER_COLUMN = "ALTER TABLE reports ADD COLUMN owner TEXT"
+OWNER_INDEX = "CREATE INDEX IF NOT EXISTS reports_owner ON reports (owner)"
+REPORT_COLUMNS = (
+    "report_id, created_at, cohort_info, inputs_hash, options, executive_summary, "
+    "edited_output, owner"
+)
+
+
+class StoredReport(BaseModel):
+    """Metadata of a stored report."""
+
+    report_id: str
+    created_at: datetime
+    cohort_info: str
+    inputs_hash: str = Field(..., description="SHA-256 of the report inputs.")
+    options: Dict[str, Any] = Field(default_factory=dict)
+    executive_summary: str
+    edited_output: str
+    artifacts: Dict[str, str] = Field(
+        default_factory=dict, description="Digest of each artifact, by name."
+    )
+    owner: Optional[str] = Field(
+        None, description="User or session the report belongs to, if any."
+    )
+
+
+def store_dir() -> str:
+    """Directory of the report store."""
+    return os.getenv("ZASCA_REPORT_STORE", "report_store")
+
+
+def hash_inputs(
+    df: pd.DataFrame, sections_config: dict, cohort_info: str, options: Dict[str, Any]
+) -> str:
+    """SHA-256 identifying the inputs of a report.
+
+    Only the names of the selected variables of each section are hashed from
+    sections_config, as aggregate_data normalises the configuration in place.
+    """
+    selection = {
+        title: sorted(variables) for title, variables in sections_config.items()
+    }
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(map(str, df.columns))).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    for value in (selection, cohort_info, options):
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ReportStore:
+    """SQLite metadata and content-addressed blobs under a directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.blobs_dir = os.path.join(root, "blobs")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(reports)")]
+            if "owner" not in columns:
+                conn.execute(OWNER_COLUMN)
+            conn.execute(OWNER_INDEX)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, committing on success and rolling back on error."""
+        conn = sqlite3.connect(os.path.join(self.root, "reports.db"), timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def put_blob(self, content: bytes) -> str:
+        """Store a blob, unless already stored, and return its digest."""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            return digest
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return digest
+
+    def get_blob(self, digest: str) -> bytes:
+        """Content of a blob."""
+        with open(self._blob_path(digest), "rb") as f:
+            return f.read()
+
+    def save_report(
+        self,
+        report_sections: List[ReportSection],
+        executive_summary: str,
+        edited_output: str,
+        cohort_info: str,
+        inputs_hash: str,
+        options: Dict[str, Any],
+        artifacts: Optional[Dict[str, bytes]] = None,
+        owner: Optional[str] = None,
+    ) -> str:
+        """Store a report and its artifacts, returning the new report's id."""
+        report_id = uuid.uuid4().hex
+        digests = {
+            name: self.put_blob(content) for name, content in (artifacts or {}).items()
+        }
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO reports ({REPORT_COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    report_id,
+                    time.time(),
+                    cohort_info,
+                    inputs_hash,
+                    json.dumps(options, default=str),
+                    executive_summary,
+                    edited_output,
+                    owner,
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO sections VALUES (?, ?, ?)",
+                [
+                    (report_id, position, section.model_dump_json())
+                    for position, section in enumerate(report_sections)
+                ],
+            )
+            self._insert_artifacts(conn, report_id, digests, artifacts or {})
+        logger.info("Stored report %s with %d artifacts", report_id, len(digests))
+        return report_id
+
+    def add_artifacts(self, report_id: str, artifacts: Dict[str, bytes]) -> List[str]:
+        """Store artifacts of an existing report, replacing those with the same name.
+
+        Raises:
+            KeyError: If the report is unknown
+        """
+        digests = {name: self.put_blob(content) for name, content in artifacts.items()}
+        with self._connect() as conn:
+            if not conn.execute(
+                "SELECT 1 FROM reports WHERE report_id = ?", (report_id,)
+            ).fetchone():
+                raise KeyError(report_id)
+            self._insert_artifacts(conn, report_id, digests, artifacts)
+        return list(digests)
+
+    @staticmethod
+    def _insert_artifacts(
+        conn: sqlite3.Connection,
+        report_id: str,
+        digests: Dict[str, str],
+        artifacts: Dict[str, bytes],
+    ) -> None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?)",
+            [
+                (report_id, name, digest, len(artifacts[name]))
+                for name, digest in digests.items()
+            ],
+        )
+
+    def _to_report(self, conn: sqlite3.Connection, row: tuple) -> StoredReport:
+        (
+            report_id,
+            created_at,
+            cohort_info,
+            inputs_hash,
+            options,
+            summary,
+            edited,
+            owner,
+        ) = row
+        artifacts = conn.execute(
+            "SELECT name, digest FROM artifacts WHERE report_id = ? ORDER BY name",
+            (report_id,),
+        ).fetchall()
+        return StoredReport(
+            report_id=report_id,
+            created_at=datetime.fromtimestamp(created_at),
+            cohort_info=cohort_info,
+            inputs_hash=inputs_hash,
+            options=json.loads(options),
+            executive_summary=summary,
+            edited_output=edited,
+            artifacts=dict(artifacts),
+            owner=owner,
+        )
+
+    def get_report(self, report_id: str, owner: Optional[str] = None) -> StoredReport:
+        """Metadata of a report, if owner is given only if the report belongs to it.
+
+        Raises:
+            KeyError: If the report is unknown, or belongs to another owner
+        """
+        query = f"SELECT {REPORT_COLUMNS} FROM reports WHERE report_id = ?"
+        params: tuple = (report_id,)
+        if owner is not None:
+            query += " AND owner = ?"
+            params += (owner,)
+        with self._connect() as conn:
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                raise KeyError(report_id)
+            return self._to_report(conn, row)
+
+    def list_reports(
+        self,
+        limit: int = 20,
+        inputs_hash: Optional[str] = None,
+        owner: Optional[str] = None,
+    ) -> List[StoredReport]:
+        """Most recent reports, optionally only those generated from given inputs.
+
+        If owner is given, only the reports belonging to it are listed.
+        """
+        conditions = []
+        params: tuple = ()
+        if inputs_hash:
+            conditions.append("inputs_hash = ?")
+            params += (inputs_hash,)
+        if owner is not None:
+            conditions.append("owner = ?")
+            params += (owner,)
+        query = f"SELECT {REPORT_COLUMNS} FROM reports"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._connect() as conn:
+            rows = conn.execute(
+                query + " ORDER BY created_at DESC LIMIT ?", params + (limit,)
+            ).fetchall()
+            return [self._to_report(conn, row) for row in rows]
+
+    def get_sections(self, report_id: str) -> List[ReportSection]:
+        """Sections of a report, in their original order."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM sections WHERE report_id = ? ORDER BY position",
+                (report_id,),
+            ).fetchall()
+        return [ReportSection.model_validate_json(data) for (data,) in rows]
+
+    def get_artifact(self, report_id: str, name: str) -> bytes:
+        """Content of an artifact of a report.
+
+        Raises:
+            KeyError: If the report or the artifact is unknown
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT digest FROM artifacts WHERE report_id = ? AND name = ?",
+                (report_id, name),
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"{report_id}/{name}")
+        return self.get_blob(row[0])
+
+
+@functools.lru_cache(maxsize=None)
+def _open_store(root: str) -> ReportStore:
+    return ReportStore(root)
+
+
+def get_report_store() -> ReportStore:
+    """The report store of the process, in store_dir()."""
+    return _open_store(os.path.abspath(store_dir()))
@@ -0,0 +1,127 @@
+"""Per-call model routing by prompt size and section importance.
+
+The routing policy of a report (ROUTING_POLICIES) is activated for the duration of its
+generation with use_routing_policy(), and every API caller returned by get_api_caller
+asks route_call() which model to use. Routing only expresses a preference: moving calls
+away from a provider that is failing or slow is done by services/failover.
+"""
+
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+from pydantic import BaseModel, Field
+from ..config.generation import FAST_MODELS, HIGH_IMPORTANCE_SECTIONS, ROUTING_POLICIES
+from .tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class RoutingPolicy(BaseModel):
+    """How the calls of a report are assigned to models."""
+
+    enabled: bool = Field(False, description="Whether calls are routed at all.")
+    fast_purposes: List[str] = Field(
+        default_factory=list, description="Call purposes that use the fast model."
+    )
+    small_prompt_tokens: Optional[int] = Field(
+        0, description="Section prompts up to this size use the fast model (None: any)."
+    )
+
+
+class RoutingDecision(BaseModel):
+    """Model chosen for a call and why."""
+
+    model_name: str
+    reason: str
+
+
+_active_policy: ContextVar[str] = ContextVar("routing_policy", default="selected")
+
+
+@contextmanager
+def use_routing_policy(policy_name: str) -> Iterator[None]:
+    """Route the calls made inside the block (and its tasks) with a policy."""
+    if policy_name not in ROUTING_POLICIES:
+        raise ValueError(f"Unknown routing policy: {policy_name}")
+    token = _active_policy.set(policy_name)
+    try:
+        yield
+    finally:
+        _active_policy.reset(token)
+
+
+def get_policy(policy_name: Optional[str] = None) -> RoutingPolicy:
+    """Get a routing policy, by default the active one."""
+    return RoutingPolicy(**ROUTING_POLICIES[policy_name or _active_policy.get()])
+
+
+def provider_of(model_name: str) -> str:
+    """Name of the provider serving a model."""
+    if model_name.startswith("gpt"):
+        return "openai"
+    if model_name.startswith("gemini"):
+        return "gemini"
+    raise ValueError(f"Unsupported model: {model_name}")
+
+
+def choose_model(
+    model_name: str,
+    purpose: str,
+    prompt_tokens: int,
+    section_title: Optional[str] = None,
+    policy: Optional[RoutingPolicy] = None,
+) -> RoutingDecision:
+    """Choose the model of a call.
+
+    Args:
+        model_name: Model selected for the report
+        purpose: What the call generates ("section", "batch", "digest", "draft",
+            "summary" or "edit")
+        prompt_tokens: Size of the prompt
+        section_title: Title of the section, for section calls
+        policy: Routing policy, by default the active one
+
+    Returns:
+        The model to use and the reason for the choice
+    """
+    policy = policy or get_policy()
+    if not policy.enabled:
+        return RoutingDecision(model_name=model_name, reason="routing disabled")
+
+    chosen, reason = model_name, "selected model"
+    fast_model = FAST_MODELS.get(provider_of(model_name), model_name)
+    if purpose in policy.fast_purposes:
+        chosen, reason = fast_model, f"{purpose} calls use the fast model"
+    elif (
+        purpose == "section"
+        and section_title not in HIGH_IMPORTANCE_SECTIONS
+        and (
+            policy.small_prompt_tokens is None
+            or prompt_tokens <= policy.small_prompt_tokens
+        )
+    ):
+        chosen, reason = fast_model, f"section with a {prompt_tokens}-token prompt"
+
+    return RoutingDecision(model_name=chosen, reason=reason)
+
+
+def route_call(
+    model_name: str, purpose: str, prompt: str, section_title: Optional[str] = None
+) -> RoutingDecision:
+    """Choose the model of a call with the active policy, and log the decision."""
+    policy = get_policy()
+    if not policy.enabled:
+        return RoutingDecision(model_name=model_name, reason="routing disabled")
+
+    prompt_tokens = count_tokens(prompt, model_name)
+    decision = choose_model(model_name, purpose, prompt_tokens, section_title, policy)
+    logger.info(
+        "Routing %s call%s (%d prompt tokens) to %s: %s",
+        purpose,
+        f" for {section_title}" if section_title else "",
+        prompt_tokens,
+        decision.model_name,
+        decision.reason,
+    )
+    return decision
@@ -0,0 +1,71 @@
+"""Helpers for running SDK calls from async code."""
+
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# Instances, lock and close function of every loop_local factory
+_loop_locals: List[Tuple[weakref.WeakKeyDictionary, threading.Lock, Callable]] = []
+
+
+def loop_local(
+    factory: Callable[[], T], close: Optional[Callable[[T], Awaitable]] = None
+) -> Callable[[], T]:
+    """Wrap a factory so that it returns one instance per running event loop.
+
+    Async SDK clients keep connection pools bound to the event loop that first used
+    them, and every Streamlit session runs its script in its own loop, so each loop
+    gets its own client. If close is given, close_loop_locals closes the instance of a
+    loop with it (see run); otherwise instances are dropped with their loop.
+    """
+    instances: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]" = (
+        weakref.WeakKeyDictionary()
+    )
+    lock = threading.Lock()
+    if close is not None:
+        _loop_locals.append((instances, lock, close))
+
+    def get() -> T:
+        loop = asyncio.get_running_loop()
+        with lock:
+            if loop not in instances:
+                instances[loop] = factory()
+            return instances[loop]
+
+    return get
+
+
+async def close_loop_locals() -> None:
+    """Close the loop_local instances of the running loop, before the loop is closed."""
+    loop = asyncio.get_running_loop()
+    for instances, lock, close in _loop_locals:
+        with lock:
+            instance = instances.pop(loop, None)
+        if instance is None:
+            continue
+        try:
+            await close(instance)
+        except Exception as err:  # pylint: disable=broad-except
+            logger.warning("Could not close %s: %s", type(instance).__name__, err)
+
+
+def run(main: Awaitable[T]) -> T:
+    """Run a coroutine in a new event loop, as asyncio.run does.
+
+    The clients created for the loop are closed before it is, so running a script once
+    per Streamlit rerun does not leave their connections open.
+    """
+
+    async def run_and_close() -> T:
+        try:
+            return await main
+        finally:
+            await close_loop_locals()
+
+    return asyncio.run(run_and_close())
@@ -0,0 +1,134 @@
+"""Per-model throughput of previous runs, used to estimate the latency of new ones.
+
+The duration and token counts of every model call of a run are appended to a small
+JSON file (ZASCA_THROUGHPUT_HISTORY, throughput_history.json in the working directory by
+default), keeping the last THROUGHPUT_HISTORY_SIZE calls of each model. Until a model
+has been recorded, DEFAULT_MODEL_THROUGHPUT is used. Code running on the event loop
+reads it with cached_history, which only parses the file again when it changes.
+"""
+
+import json
+import logging
+import os
+import statistics
+import threading
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+from ..config.generation import DEFAULT_MODEL_THROUGHPUT, THROUGHPUT_HISTORY_SIZE
+from ..utils.metrics import RunMetrics
+
+logger = logging.getLogger(__name__)
+
+# Fewer recorded calls than this are not enough to replace the default throughput
+MIN_OBSERVATIONS = 3
+# Used for models missing from DEFAULT_MODEL_THROUGHPUT
+FALLBACK_THROUGHPUT = {"output_tokens_per_s": 50.0, "overhead_s": 1.0}
+
+_history_lock = threading.Lock()
+# Last history loaded from each path, with the modification time and size of the file
+_history_cache: Dict[str, Tuple[Optional[Tuple[int, int]], dict]] = {}
+
+
+class CallObservation(BaseModel):
+    """Duration and token counts of one model call."""
+
+    prompt_tokens: int = Field(0, description="Prompt tokens, including cached ones.")
+    completion_tokens: int = Field(..., description="Completion tokens.")
+    duration_s: float = Field(..., description="Wall time of the call in seconds.")
+
+
+def history_path() -> str:
+    """Path of the throughput history file."""
+    return os.getenv("ZASCA_THROUGHPUT_HISTORY", "throughput_history.json")
+
+
+def load_history() -> Dict[str, List[CallObservation]]:
+    """Load the recorded calls of each model, or an empty history if there is none."""
+    try:
+        with open(history_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {
+            model: [CallObservation(**observation) for observation in observations]
+            for model, observations in data.items()
+        }
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, TypeError) as err:
+        logger.warning("Ignoring unreadable throughput history: %s", err)
+        return {}
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """Modification time and size of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def cached_history() -> Dict[str, List[CallObservation]]:
+    """The recorded calls of each model, loaded again only if the file changed."""
+    path = history_path()
+    stamp = _file_stamp(path)
+    with _history_lock:
+        cached = _history_cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    history = load_history()
+    with _history_lock:
+        _history_cache[path] = (stamp, history)
+    return history
+
+
+def record_run(metrics: RunMetrics) -> None:
+    """Append the model calls recorded in a run to the throughput history."""
+    observations: Dict[str, List[CallObservation]] = {}
+    for record in metrics.llm_calls:
+        attributes = record.attributes
+        # Failed calls carry no usage
+        if not attributes.get("completion_tokens"):
+            continue
+        observations.setdefault(attributes.get("model", ""), []).append(
+            CallObservation(
+                prompt_tokens=attributes.get("prompt_tokens", 0),
+                completion_tokens=attributes["completion_tokens"],
+                duration_s=record.duration_s,
+            )
+        )
+    if not observations:
+        return
+
+    with _history_lock:
+        history = load_history()
+        for model, calls in observations.items():
+            history[model] = (history.get(model, []) + calls)[-THROUGHPUT_HISTORY_SIZE:]
+        try:
+            with open(history_path(), "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        model: [call.model_dump() for call in calls]
+                        for model, calls in history.items()
+                    },
+                    f,
+                )
+        except OSError as err:
+            logger.warning("Could not save the throughput history: %s", err)
+
+
+def model_throughput(
+    model_name: str, history: Dict[str, List[CallObservation]]
+) -> Dict[str, float]:
+    """Output tokens per second and per-call overhead of a model.
+
+    The throughput is the median, over the recorded calls, of the completion tokens
+    divided by the call duration minus the default overhead.
+    """
+    throughput = dict(DEFAULT_MODEL_THROUGHPUT.get(model_name, FALLBACK_THROUGHPUT))
+    calls = history.get(model_name, [])
+    if len(calls) >= MIN_OBSERVATIONS:
+        throughput["output_tokens_per_s"] = statistics.median(
+            call.completion_tokens / max(call.duration_s - throughput["overhead_s"], 0.1)
+            for call in calls
+        )
+    return throughput
@@ -0,0 +1,46 @@
+"""Local token counting, used to size prompts without calling any API.
+
+Tokens are counted with tiktoken when its encoding is available, and estimated from
+the text length otherwise. Gemini has no local tokenizer, so its counts use the OpenAI
+encoding and are approximate.
+"""
+
+import logging
+import math
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Used when no tokenizer encoding is available
+CHARS_PER_TOKEN = 4
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def _encoding(model_name: Optional[str]):
+    """Get the tiktoken encoding for a model, or None if it is not available."""
+    try:
+        import tiktoken  # pylint: disable=import-outside-toplevel
+
+        try:
+            return tiktoken.encoding_for_model(model_name or "")
+        except KeyError:
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as err:  # pylint: disable=broad-except
+        # Not installed, or the encoding file is not cached and cannot be downloaded
+        logger.info("No tokenizer available, estimating tokens from length: %s", err)
+        return None
+
+
+def has_tokenizer(model_name: Optional[str] = None) -> bool:
+    """Whether the tokens of a model are counted rather than estimated from length."""
+    return _encoding(model_name) is not None
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """Count the tokens of a text for a model (the default encoding if not given)."""
+    encoding = _encoding(model_name)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
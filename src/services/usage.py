@@ -0,0 +1,34 @@
+"""Helpers to aggregate the token usage reported by the AI APIs."""
+
+from typing import Dict, Union
+
+Usage = Dict[str, Union[int, float]]
+
+
+def merge_usage(first: Usage, second: Usage) -> Usage:
+    """Sum two usage dictionaries key by key."""
+    merged = dict(first)
+    for key, value in second.items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def format_usage(usage: Usage) -> str:
+    """Format a usage dictionary for logging."""
+    if not usage:
+        return "no usage reported"
+    return (
+        f"{usage.get('prompt_tokens', 0)} prompt tokens "
+        f"({usage.get('cached_tokens', 0)} cached, "
+        f"{usage.get('uncached_tokens', 0)} uncached), "
+        f"{usage.get('completion_tokens', 0)} completion tokens"
+        + (f" in {usage['latency_s']:.2f}s" if "latency_s" in usage else "")
+        + (
+            f"; {usage['continuation_rounds']} continuation rounds took "
+            f"{usage.get('continuation_s', 0):.2f}s and "
+            f"{usage.get('continuation_prompt_tokens', 0)}+"
+            f"{usage.get('continuation_completion_tokens', 0)} tokens"
+            if usage.get("continuation_rounds")
+            else ""
+        )
+    )
@@ -1,9 +1,9 @@
 """UI components for the data input and processing tabs."""
 
-from typing import Dict, Tuple, Any
+from typing import Tuple
 import streamlit as st
 import pandas as pd
-from src.config.sections import get_sections_config
+from src.data import availability
 
 
 def render_cohort_info() -> str:
@@ -33,114 +33,30 @@ def render_cohort_info() -> str:
     )
 
 
-def render_data_preview(df: pd.DataFrame) -> None:
-    """
-    Render the data preview table.
-
-    Args:
-        df: DataFrame to display
-    """
-    st.markdown("### Vista previa de los datos cargados")
-    st.dataframe(df, use_container_width=True)
-
-
 @st.cache_data
-def check_variable_availability(
-    df: pd.DataFrame, var_config: dict
-) -> Tuple[bool, Dict[str, Any]]:
+def process_sections_config(df: pd.DataFrame) -> Tuple[dict, dict, dict]:
     """
-    Check if variables are available in the dataframe.
+    Available and missing variables of each section, cached across reruns.
 
     Args:
         df: DataFrame containing the data
-        var_config: Dictionary containing variable configuration
 
     Returns:
-        Tuple containing:
-        - Boolean indicating if variable is available
-        - Dictionary with variable metadata
+        Sections configuration, available variables and missing variables, as
+        returned by data.availability.process_sections_config
     """
-    var_type = var_config["type"]
-    metadata = var_config["metadata"]
-    var_pairs = var_config["var_pairs"]
-
-    # Try each variable pair until we find one that works
-    for var_pair in var_pairs:
-        is_available = True
-
-        if not isinstance(var_type, list):
-            var_type = [var_type]
-
-        for var_type in var_type:
-            if var_type == "indicator":
-                (initial_nums, initial_denoms), (final_nums, final_denoms) = var_pair
-                if isinstance(initial_nums, list):
-                    if not any(col in df.columns for col in initial_nums):
-                        is_available = False
-                    if not any(col in df.columns for col in initial_denoms):
-                        is_available = False
-                elif initial_nums not in df.columns or initial_denoms not in df.columns:
-                    is_available = False
-
-                if isinstance(final_nums, list):
-                    if not any(col in df.columns for col in final_nums):
-                        is_available = False
-                    if not any(col in df.columns for col in final_denoms):
-                        is_available = False
-                elif final_nums not in df.columns or final_denoms not in df.columns:
-                    is_available = False
-            else:
-                initial, final = var_pair
-                if initial:
-                    if isinstance(initial, list):
-                        if not any(col in df.columns for col in initial):
-                            is_available = False
-                    elif initial not in df.columns:
-                        is_available = False
-                if final not in df.columns:
-                    is_available = False
-
-            if is_available:
-                return True, metadata
-
-    return False, metadata
+    return availability.process_sections_config(df)
 
 
-def process_sections_config(df: pd.DataFrame) -> Tuple[dict, dict, dict]:
+def render_data_preview(df: pd.DataFrame) -> None:
     """
-    Process sections configuration once to identify available and missing variables.
+    Render the data preview table.
 
     Args:
-        df: DataFrame containing the data
-
-    Returns:
-        Tuple containing:
-        - Dictionary of sections configuration
-        - Dictionary of available variables by section
-        - Dictionary of missing variables by section
+        df: DataFrame to display
     """
-    sections_config = get_sections_config(df)
-    available_vars = {}
-    missing_vars = {}
-
-    for section_title, variables in sections_config.items():
-        section_available = {}
-        section_missing = []
-
-        for var_name, var_config in variables.items():
-            is_available, metadata = check_variable_availability(df, var_config)
-            if is_available:
-                section_available[var_name] = var_config
-            else:
-                var_desc = f"{metadata['description']} ({metadata['name']})"
-                section_missing.append(var_desc)
-
-        if section_available:
-            available_vars[section_title] = section_available
-        if section_missing:
-            missing_vars[section_title] = section_missing
-
-    return sections_config, available_vars, missing_vars
+    st.markdown("### Vista previa de los datos cargados")
+    st.dataframe(df, use_container_width=True)
 
 
 def render_variable_selector(df: pd.DataFrame) -> None:
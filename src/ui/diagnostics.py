@@ -0,0 +1,148 @@
+"""UI components for the performance diagnostics panel."""
+
+from typing import Any, Dict, List, Optional
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+from src.charts.utils import COLORS
+from src.utils.metrics import RunMetrics, SpanRecord, estimate_cost
+
+# Phases of a run, in display order, with their labels
+DIAGNOSTICS_PHASES = {
+    "ingest": "Ingesta",
+    "generation": "Generación",
+    "output": "Descargas",
+}
+
+# Spans too fine-grained for the waterfall; they are covered by their parent span
+HIDDEN_SPAN_PREFIXES = ("processor", "get_sections_config")
+
+
+def _waterfall_rows(phases: Dict[str, RunMetrics]) -> List[Dict[str, Any]]:
+    """Lay the spans of every phase out one after the other."""
+    rows = []
+    offset = 0.0
+    for phase, metrics in phases.items():
+        records = [
+            record
+            for record in metrics.records
+            if not record.name.startswith(HIDDEN_SPAN_PREFIXES)
+        ]
+        if not records:
+            continue
+        phase_start = min(record.start_s for record in records)
+        for record in sorted(records, key=lambda record: record.start_s):
+            rows.append(
+                {
+                    "label": f"{DIAGNOSTICS_PHASES[phase]} · {record.label}",
+                    "start": offset + record.start_s - phase_start,
+                    "duration": record.duration_s,
+                    "is_llm_call": record.is_llm_call,
+                }
+            )
+        offset += max(record.start_s + record.duration_s for record in records) - phase_start
+    return rows
+
+
+def create_waterfall_chart(phases: Dict[str, RunMetrics]) -> Optional[go.Figure]:
+    """Create a waterfall (Gantt) chart of the recorded spans."""
+    rows = _waterfall_rows(phases)
+    if not rows:
+        return None
+
+    fig = go.Figure(
+        go.Bar(
+            y=[row["label"] for row in rows],
+            x=[row["duration"] for row in rows],
+            base=[row["start"] for row in rows],
+            orientation="h",
+            marker_color=[
+                COLORS["coral"] if row["is_llm_call"] else COLORS["blue"] for row in rows
+            ],
+            text=[f"{row['duration']:.2f}s" for row in rows],
+            textposition="outside",
+            hovertemplate="%{y}<br>inicio %{base:.2f}s, duración %{x:.2f}s<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        height=max(250, 22 * len(rows)),
+        margin={"l": 10, "r": 10, "t": 10, "b": 10},
+        xaxis={"title": "Segundos"},
+        yaxis={"autorange": "reversed", "tickfont": {"size": 10}},
+        showlegend=False,
+    )
+    return fig
+
+
+def _llm_call_row(metrics: RunMetrics, record: SpanRecord) -> Dict[str, Any]:
+    attributes = record.attributes
+    cost = estimate_cost(attributes.get("model", ""), attributes)
+    return {
+        "Llamada": metrics.parent_label(record) or record.label,
+        "Modelo": attributes.get("model"),
+        "Duración (s)": round(record.duration_s, 2),
+        "Tokens entrada": attributes.get("prompt_tokens", 0),
+        "Tokens en caché": attributes.get("cached_tokens", 0),
+        "Tokens salida": attributes.get("completion_tokens", 0),
+        "Reintentos": attributes.get("retries", 0),
+        "Costo estimado (USD)": round(cost, 5) if cost is not None else None,
+    }
+
+
+def render_diagnostics(container: Any, phases: Dict[str, Optional[RunMetrics]]) -> None:
+    """
+    Render the diagnostics expander with the metrics of the last run.
+
+    Args:
+        container: Sidebar container where the expander is rendered
+        phases: Metrics of each phase of DIAGNOSTICS_PHASES, None if not recorded
+    """
+    phases = {
+        phase: phases[phase]
+        for phase in DIAGNOSTICS_PHASES
+        if phases.get(phase) and phases[phase].records
+    }
+
+    with container.expander("⏱️ Diagnóstico de rendimiento"):
+        if not phases:
+            st.info("Genera un reporte para ver los tiempos de cada etapa.")
+            return
+
+        calls = pd.DataFrame(
+            [
+                _llm_call_row(metrics, record)
+                for metrics in phases.values()
+                for record in metrics.llm_calls
+            ]
+        )
+
+        if not calls.empty:
+            prompt_tokens = int(calls["Tokens entrada"].sum())
+            cached_tokens = int(calls["Tokens en caché"].sum())
+            col1, col2 = st.columns(2)
+            col1.metric("Llamadas a la API", len(calls))
+            col2.metric("Reintentos", int(calls["Reintentos"].sum()))
+            col1.metric(
+                "Tokens (entrada / salida)",
+                f"{prompt_tokens:,} / {int(calls['Tokens salida'].sum()):,}",
+            )
+            col2.metric(
+                "Aciertos de caché",
+                f"{int((calls['Tokens en caché'] > 0).sum())} llamadas",
+                f"{cached_tokens / prompt_tokens:.0%} de la entrada"
+                if prompt_tokens
+                else None,
+                delta_color="off",
+            )
+            if calls["Costo estimado (USD)"].notna().any():
+                st.metric(
+                    "Costo estimado",
+                    f"US$ {calls['Costo estimado (USD)'].sum():.4f}",
+                )
+
+        fig = create_waterfall_chart(phases)
+        if fig:
+            st.plotly_chart(fig, use_container_width=True)
+
+        if not calls.empty:
+            st.dataframe(calls, hide_index=True, use_container_width=True)
@@ -1,16 +1,128 @@
 """UI components for report generation and display."""
 
-from typing import Any, Dict
+import functools
+import json
+import tempfile
+from typing import Any, BinaryIO, Callable, Dict, Optional
 import streamlit as st
-from src.utils.document import create_word_doc
-from src.utils.constants import MIME_TYPES, HELP_TEXTS
+from src.services.report_store import get_report_store
+from src.config.charts import chart_config
+from src.utils.bundle import report_bundle_entries, write_zip
+from src.utils.document import get_word_doc, prefetch_word_docs, stored_docx_name
+from src.utils.constants import (
+    BUNDLE_FILENAME,
+    DOCX_FILENAMES,
+    JSON_FILENAME,
+    MIME_TYPES,
+    HELP_TEXTS,
+    MESSAGES,
+    STORED_REPORTS_LIMIT,
+)
 from src.utils.errors import safe_operation
+from src.utils.plot_downloads import chart_spec
+from src.utils.state import get_report_owner, update_report_state
+
+
+def load_stored_document(report_id: Optional[str], version: str) -> Optional[bytes]:
+    """Word document saved with a stored report, if any."""
+    if not report_id:
+        return None
+    try:
+        return get_report_store().get_artifact(report_id, stored_docx_name(version))
+    except KeyError:
+        return None
+
+
+def save_stored_document(
+    report_id: Optional[str], version: str, content: bytes
+) -> None:
+    """Save a Word document with its stored report."""
+    if report_id:
+        get_report_store().add_artifacts(
+            report_id, {stored_docx_name(version): content}
+        )
+
+
+def report_document(session_state: Dict[str, Any], version: str) -> Callable[[], bytes]:
+    """
+    Get a callable returning a Word document of the report.
+
+    The document is built at most once per content, and taken from the report store if
+    it was saved there; newly built documents are saved with the report.
+
+    Args:
+        session_state: Streamlit session state containing report data
+        version: "edited" or "unedited"
+
+    Returns:
+        Callable without arguments, as expected by st.download_button
+    """
+    return functools.partial(
+        get_word_doc,
+        session_state.resumen_ejecutivo,
+        session_state.edited_output,
+        session_state.report_sections,
+        version == "edited",
+        load=functools.partial(load_stored_document, session_state.report_id, version),
+        save=functools.partial(save_stored_document, session_state.report_id, version),
+    )
+
+
+def prefetch_report_documents(session_state: Dict[str, Any]) -> None:
+    """
+    Build the Word documents of the report in the background.
+
+    Args:
+        session_state: Streamlit session state containing report data
+    """
+    prefetch_word_docs(
+        {version: report_document(session_state, version) for version in DOCX_FILENAMES}
+    )
+
+
+def report_bundle(session_state: Dict[str, Any]) -> Callable[[], BinaryIO]:
+    """
+    Get a callable returning a ZIP archive with every artifact of the report.
+
+    The archive is written to a temporary file one entry at a time, from the cached
+    Word documents and chart images (see utils/bundle).
+
+    Args:
+        session_state: Streamlit session state containing report data
+
+    Returns:
+        Callable without arguments, as expected by st.download_button
+    """
+    json_str = session_state.json_str
+    report_sections = session_state.report_sections
+    report_id = session_state.report_id
+    documents = {
+        version: report_document(session_state, version) for version in DOCX_FILENAMES
+    }
+
+    def build() -> BinaryIO:
+        entries = report_bundle_entries(
+            report_sections,
+            lambda: json_str.encode("utf-8") if json_str else None,
+            documents,
+            report_id,
+        )
+        # pylint: disable-next=consider-using-with
+        fileobj = tempfile.TemporaryFile()
+        write_zip(entries, fileobj)
+        fileobj.seek(0)
+        return fileobj
+
+    return build
 
 
 def render_download_buttons(session_state: Dict[str, Any]) -> None:
     """
     Render the download buttons for the report.
 
+    The Word documents and the ZIP bundle are only produced when their button is
+    clicked (or by the prefetch after generation), not on every rerun.
+
     Args:
         session_state: Streamlit session state containing report data
     """
@@ -18,37 +130,120 @@ def render_download_buttons(session_state: Dict[str, Any]) -> None:
 
     col1, col2 = st.sidebar.columns(2)
     with col1:
-        unedited_docx = safe_operation(
-            create_word_doc, "file_error", session_state, edited=False
+        st.download_button(
+            label="📊 Sin Editar - Word",
+            data=report_document(session_state, "unedited"),
+            file_name=DOCX_FILENAMES["unedited"],
+            mime=MIME_TYPES["docx"],
+            help=HELP_TEXTS["unedited_download"],
         )
-        if unedited_docx:
-            st.download_button(
-                label="📊 Sin Editar - Word",
-                data=unedited_docx,
-                file_name="reporte_zasca_sin_editar.docx",
-                mime=MIME_TYPES["docx"],
-                help=HELP_TEXTS["unedited_download"],
-            )
 
     with col2:
-        edited_docx = safe_operation(
-            create_word_doc, "file_error", session_state, edited=True
+        st.download_button(
+            label="📝 Editado - Word",
+            data=report_document(session_state, "edited"),
+            file_name=DOCX_FILENAMES["edited"],
+            mime=MIME_TYPES["docx"],
+            help=HELP_TEXTS["edited_download"],
+        )
+
+    if session_state.json_str:
+        st.sidebar.download_button(
+            label="🗂️ Datos - JSON",
+            data=session_state.json_str,
+            file_name=JSON_FILENAME,
+            mime=MIME_TYPES["json"],
+            help=HELP_TEXTS["json_download"],
+            use_container_width=True,
         )
-        if edited_docx:
-            st.download_button(
-                label="📝 Editado - Word",
-                data=edited_docx,
-                file_name="reporte_zasca_editado.docx",
-                mime=MIME_TYPES["docx"],
-                help=HELP_TEXTS["edited_download"],
-            )
 
-def render_report_section(section: Any) -> None:
+    st.sidebar.download_button(
+        label="📦 Todo - ZIP",
+        data=report_bundle(session_state),
+        file_name=BUNDLE_FILENAME,
+        mime=MIME_TYPES["zip"],
+        help=HELP_TEXTS["bundle_download"],
+        use_container_width=True,
+    )
+
+
+def load_stored_report(report_id: str) -> None:
+    """
+    Load a report of the session's owner from the report store into the session state.
+
+    Args:
+        report_id: Identifier of the report in the report store
+    """
+    store = get_report_store()
+    stored = store.get_report(report_id, get_report_owner())
+    update_report_state(
+        json_str=store.get_artifact(report_id, JSON_FILENAME).decode("utf-8"),
+        resumen_ejecutivo=stored.executive_summary,
+        edited_output=stored.edited_output,
+        report_sections=store.get_sections(report_id),
+        report_id=report_id,
+        success_message=MESSAGES["success"]["report_loaded"],
+    )
+
+
+def render_stored_reports() -> None:
+    """Render the recent reports of the session's owner, which can be loaded again."""
+    reports = safe_operation(
+        get_report_store().list_reports,
+        "file_error",
+        STORED_REPORTS_LIMIT,
+        owner=get_report_owner(),
+    )
+    if not reports:
+        return
+
+    labels = {
+        stored.report_id: f"{stored.created_at:%Y-%m-%d %H:%M} · "
+        f"{stored.cohort_info or 'Sin información de cohorte'} · "
+        f"{stored.options.get('model_name', '')}"
+        for stored in reports
+    }
+    with st.sidebar.expander("🗄️ Reportes anteriores"):
+        report_id = st.selectbox(
+            "Reporte",
+            list(labels),
+            format_func=labels.get,
+            help=HELP_TEXTS["stored_reports"],
+        )
+        if st.button("📂 Cargar reporte", use_container_width=True):
+            safe_operation(load_stored_report, "file_error", report_id)
+
+
+def render_section_charts(section: Any, variables: Dict[str, Any]) -> None:
+    """
+    Render the charts of a section from their Plotly specs, drawn by the browser.
+
+    Args:
+        section: Report section object
+        variables: Variables of all the sections, as some charts combine them
+    """
+    specs = [
+        spec
+        for chart_id, config in chart_config.items()
+        if config["section"] == section.title
+        and (spec := chart_spec(chart_id, variables)) is not None
+    ]
+    if specs:
+        st.markdown("#### Gráficos")
+        for spec in specs:
+            st.plotly_chart(json.loads(spec), use_container_width=True)
+
+
+def render_report_section(
+    section: Any, variables: Optional[Dict[str, Any]] = None
+) -> None:
     """
     Render a single report section.
 
     Args:
         section: Report section object containing content and variables
+        variables: Variables of all the sections, to render the section's charts
+            (None to leave them out)
     """
     with st.expander(f"📑 {section.title}"):
         st.markdown("#### Contenido generado")
@@ -57,6 +252,8 @@ def render_report_section(section: Any) -> None:
         for _, var_data in section.variables.items():
             st.markdown(f"**{var_data.description}**: {var_data.interpretation}")
             st.markdown("---")
+        if variables is not None:
+            render_section_charts(section, variables)
 
 
 def render_report_results(session_state: Dict[str, Any]) -> None:
@@ -78,5 +275,10 @@ def render_report_results(session_state: Dict[str, Any]) -> None:
 
     with result_tab2:
         st.markdown("### Contenido Sin Editar por Sección")
+        variables = None
+        if session_state.get("show_interactive_charts"):
+            variables = {}
+            for section in session_state.report_sections:
+                variables.update(section.variables)
         for section in session_state.report_sections:
-            render_report_section(section)
+            render_report_section(section, variables)
@@ -1,26 +1,31 @@
 """UI components for the sidebar."""
 
-import base64
-from typing import Tuple, Optional, IO, Any
+import asyncio
+import functools
+from typing import Dict, Tuple, Optional, IO, Any
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
+from src.config.generation import DOCX_PREFETCH, RUN_WATCH_INTERVAL_S
 from src.data.process import aggregate_data
-from src.services.api_helpers import (
-    generate_section_contents,
-    generate_executive_summary,
-    edit_report_sections,
-)
-from src.utils.output import generate_json_output
+from src.pipeline.engine import StageEvent
+from src.pipeline.report import ReportOptions, run_report
+from src.services.cancellation import RunToken, start_run
+from src.services.preflight import estimate_report
+from src.ui.report import prefetch_report_documents
 from src.utils.constants import (
     OAI_MODEL_OPTIONS,
     GEMINI_MODEL_OPTIONS,
+    SUMMARY_MODE_OPTIONS,
+    ROUTING_POLICY_OPTIONS,
     HELP_TEXTS,
     MESSAGES,
     ALLOWED_EXTENSIONS,
+    CHART_DOWNLOAD_FORMATS,
+    MIME_TYPES,
 )
-from src.utils.errors import safe_operation, ReportGenerationError
-from src.utils.state import update_report_state
-from src.utils.plot_downloads import create_downloadable_chart
+from src.utils.state import get_report_owner, update_report_state
+from src.utils.plot_downloads import chart_data, render_chart_image
 from src.config.charts import get_available_charts
 
 
@@ -43,7 +48,7 @@ def render_file_uploader() -> Optional[IO]:
     return uploaded_file
 
 
-def render_sidebar_controls() -> Tuple[str, bool, bool]:
+def render_sidebar_controls() -> Tuple[str, bool, bool, bool, str, bool, str, Any]:
     """
     Render the sidebar controls.
 
@@ -51,7 +56,12 @@ def render_sidebar_controls() -> Tuple[str, bool, bool]:
         Tuple containing:
         - selected model name
         - whether to generate report
+        - whether to estimate the report before generating it
         - whether to skip report editing
+        - executive summary mode
+        - whether to batch small sections into shared requests
+        - model routing policy
+        - container for the diagnostics panel, below the advanced settings
     """
     st.sidebar.markdown("---")
 
@@ -86,6 +96,40 @@ def render_sidebar_controls() -> Tuple[str, bool, bool]:
             value=True,
             help="Activa esta opción para reducir el consumo de tokens de la API",
         )
+        summary_mode = st.selectbox(
+            "Modo del resumen ejecutivo",
+            list(SUMMARY_MODE_OPTIONS.keys()),
+            format_func=lambda x: SUMMARY_MODE_OPTIONS[x],
+            index=0,
+            help=HELP_TEXTS["summary_mode"],
+        )
+        batch_sections = st.toggle(
+            "Agrupar secciones pequeñas",
+            value=False,
+            help=HELP_TEXTS["batch_sections"],
+        )
+        routing_policy = st.selectbox(
+            "Enrutamiento de modelos",
+            list(ROUTING_POLICY_OPTIONS.keys()),
+            format_func=lambda x: ROUTING_POLICY_OPTIONS[x],
+            index=0,
+            help=HELP_TEXTS["routing_policy"],
+        )
+        st.toggle(
+            "Mostrar diagnóstico de rendimiento",
+            value=False,
+            key="show_diagnostics",
+            help=HELP_TEXTS["show_diagnostics"],
+        )
+        st.toggle(
+            "Mostrar gráficos interactivos",
+            value=False,
+            key="show_interactive_charts",
+            help=HELP_TEXTS["interactive_charts"],
+        )
+
+    # Filled at the end of the run, once all stages have been recorded
+    diagnostics_container = st.sidebar.container()
 
     st.sidebar.markdown("<br>", unsafe_allow_html=True)
 
@@ -98,8 +142,23 @@ def render_sidebar_controls() -> Tuple[str, bool, bool]:
         use_container_width=True,
         disabled=not file_uploaded,  # Disable if no file has been uploaded
     )
+    estimate_report_button = st.sidebar.button(
+        "🔎 Estimar tokens y tiempo",
+        help=HELP_TEXTS["estimate_button"],
+        use_container_width=True,
+        disabled=not file_uploaded,
+    )
 
-    return model_name, generate_report, skip_editing
+    return (
+        model_name,
+        generate_report,
+        estimate_report_button,
+        skip_editing,
+        summary_mode,
+        batch_sections,
+        routing_policy,
+        diagnostics_container,
+    )
 
 
 def render_progress_indicators() -> Tuple[Any, Any]:
@@ -114,8 +173,45 @@ def render_progress_indicators() -> Tuple[Any, Any]:
     return progress_bar, status_text
 
 
+def get_session_id() -> str:
+    """Id of the current Streamlit session ("local" outside of Streamlit)."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
+
+
+async def watch_script_run(
+    token: RunToken, status_text: Any, stage: Dict[str, str], interrupt: Dict[str, Any]
+) -> None:
+    """Cancel a run when its Streamlit script is asked to stop or rerun.
+
+    Streamlit only delivers stop and rerun requests when the script updates an element,
+    which a run awaiting API calls may not do for a long time. The status text is
+    refreshed periodically so that the request is delivered here; it is then kept in
+    interrupt, to be re-raised once the run has been cancelled.
+    """
+    while True:
+        await asyncio.sleep(RUN_WATCH_INTERVAL_S)
+        try:
+            status_text.info(MESSAGES["info"][stage["current"]])
+        except Exception:  # pylint: disable=broad-except
+            continue
+        except BaseException as err:  # pylint: disable=broad-except
+            if isinstance(err, asyncio.CancelledError):
+                raise
+            # Streamlit's stop and rerun requests are not Exceptions
+            interrupt["error"] = err
+            token.cancel("the session stopped or reran the script")
+            return
+
+
 async def handle_report_generation(
-    df: pd.DataFrame, cohort_info: str, model_name: str, skip_editing: bool = True
+    df: pd.DataFrame,
+    cohort_info: str,
+    model_name: str,
+    skip_editing: bool = True,
+    summary_mode: str = "standard",
+    batch_sections: bool = False,
+    routing_policy: str = "selected",
 ) -> Optional[str]:
     """
     Handle the report generation process.
@@ -125,6 +221,9 @@ async def handle_report_generation(
         cohort_info: String containing cohort information
         model_name: Name of the OpenAI model to use
         skip_editing: Whether to skip the report editing step
+        summary_mode: Executive summary mode (see SUMMARY_MODE_OPTIONS)
+        batch_sections: Whether to batch small sections into shared requests
+        routing_policy: Model routing policy (see ROUTING_POLICY_OPTIONS)
 
     Returns:
         Optional error message if something goes wrong
@@ -134,48 +233,70 @@ async def handle_report_generation(
         with st.sidebar:
             progress_bar, status_text = render_progress_indicators()
 
-        # Generate sections using filtered config
-        try:
-            report_sections = safe_operation(
-                aggregate_data,
-                "data_error",
-                df,
-                st.session_state.filtered_sections_config,
-            )
-            if report_sections is None:
-                raise ReportGenerationError("Failed to aggregate data")
-        except Exception as e:  # pylint: disable=W0718
-            return MESSAGES["errors"]["data_error"].format(str(e))
-
-        try:
-            # Generate section contents
-            with st.sidebar:
-                status_text.info(MESSAGES["info"]["generating_sections"])
-            await generate_section_contents(
-                report_sections, cohort_info, model_name, progress_bar
-            )
+        stage = {"current": "generating_sections", "failed": None}
 
-            # Generate executive summary
+        def show_stage(name: str) -> None:
+            """Show the current generation stage in the sidebar."""
+            stage["current"] = name
             with st.sidebar:
-                status_text.info(MESSAGES["info"]["generating_summary"])
-            resumen_ejecutivo = await generate_executive_summary(
-                report_sections, cohort_info, model_name
-            )
-
-            # Edit report sections
-            with st.sidebar:
-                status_text.info(MESSAGES["info"]["editing_report"])
-            edited_output = await edit_report_sections(
-                report_sections, model_name, skip_editing
+                status_text.info(MESSAGES["info"][name])
+
+        def on_event(event: StageEvent) -> None:
+            """Report the progress of the pipeline stages in the sidebar."""
+            if event.status == "started" and event.label:
+                show_stage(event.label)
+            elif event.status == "progress" and event.fraction is not None:
+                progress_bar.progress(event.fraction, event.message)
+            elif event.status == "failed":
+                stage["failed"] = event.stage
+
+        # Starting a new run cancels the previous run of the session, if still going
+        token = start_run(get_session_id(), "report")
+        interrupt = {}
+        watcher = asyncio.create_task(
+            watch_script_run(token, status_text, stage, interrupt)
+        )
+        generation = asyncio.create_task(
+            run_report(
+                cohort_info,
+                ReportOptions(
+                    model_name=model_name,
+                    skip_editing=skip_editing,
+                    summary_mode=summary_mode,
+                    batch_sections=batch_sections,
+                    routing_policy=routing_policy,
+                ),
+                df=df,
+                selected_config=st.session_state.filtered_sections_config,
+                on_event=on_event,
+                run_token=token,
+                owner=get_report_owner(),
             )
-
-            # Prepare JSON output
-            with st.sidebar:
-                status_text.info(MESSAGES["info"]["preparing_json"])
-            json_str = generate_json_output(report_sections, resumen_ejecutivo)
-
+        )
+        try:
+            results = await generation
+            report_sections = results["generated_sections"]
+            resumen_ejecutivo = results["executive_summary"]
+            edited_output = results["edited_output"]
+            json_str = results["report_json"]
+            report_id = results["report_id"]
+
+        except asyncio.CancelledError:
+            if "error" in interrupt:
+                raise interrupt["error"]  # pylint: disable=raise-missing-from
+            # Only the generation was cancelled, not the script itself
+            if token.cancelled and not asyncio.current_task().cancelling():
+                return MESSAGES["errors"]["run_cancelled"].format(token.reason)
+            raise
         except Exception as e:  # pylint: disable=W0718
+            if stage["failed"] in ("plan", "aggregate"):
+                return MESSAGES["errors"]["data_error"].format(str(e))
             return MESSAGES["errors"]["report_error"].format(str(e))
+        finally:
+            watcher.cancel()
+            # A stop or rerun request raised here must not leave the run going
+            if not generation.done():
+                token.cancel("the script was interrupted")
 
         # Clear progress indicators and update state
         with st.sidebar:
@@ -186,7 +307,10 @@ async def handle_report_generation(
                 resumen_ejecutivo=resumen_ejecutivo,
                 edited_output=edited_output,
                 report_sections=report_sections,
+                report_id=report_id,
             )
+            if DOCX_PREFETCH:
+                prefetch_report_documents(st.session_state)
 
         return None
 
@@ -194,6 +318,80 @@ async def handle_report_generation(
         return MESSAGES["errors"]["unexpected_error"].format(str(e))
 
 
+def handle_preflight_estimate(
+    df: pd.DataFrame,
+    cohort_info: str,
+    model_name: str,
+    skip_editing: bool = True,
+    summary_mode: str = "standard",
+    batch_sections: bool = False,
+    routing_policy: str = "selected",
+) -> Optional[str]:
+    """
+    Render a dry-run estimate of the prompts, tokens, latency and cost of the report.
+
+    Args:
+        df: DataFrame containing the data
+        cohort_info: String containing cohort information
+        model_name: Name of the model to use
+        skip_editing: Whether to skip the report editing step
+        summary_mode: Executive summary mode (see SUMMARY_MODE_OPTIONS)
+        batch_sections: Whether to batch small sections into shared requests
+        routing_policy: Model routing policy (see ROUTING_POLICY_OPTIONS)
+
+    Returns:
+        Optional error message if something goes wrong
+    """
+    try:
+        report_sections = aggregate_data(df, st.session_state.filtered_sections_config)
+        estimate = estimate_report(
+            report_sections,
+            cohort_info,
+            model_name,
+            skip_editing=skip_editing,
+            summary_mode=summary_mode,
+            batch_sections=batch_sections,
+            routing_policy=routing_policy,
+        )
+    except Exception as e:  # pylint: disable=W0718
+        return MESSAGES["errors"]["data_error"].format(str(e))
+
+    with st.sidebar.expander("🔎 Estimación previa", expanded=True):
+        col1, col2 = st.columns(2)
+        col1.metric("Llamadas a la API", len(estimate.calls))
+        col2.metric("Duración estimada", f"{estimate.wall_s:.0f} s")
+        col1.metric("Tokens de entrada", f"{estimate.prompt_tokens:,}")
+        col2.metric("Tokens de salida", f"{estimate.completion_tokens:,}")
+        if estimate.cost is not None:
+            st.metric("Costo estimado", f"US$ {estimate.cost:.4f}")
+
+        for warning in estimate.warnings:
+            st.warning(warning)
+        if not estimate.tokenizer:
+            st.caption(MESSAGES["info"]["approximate_tokens"])
+
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        "Llamada": call.label,
+                        "Modelo": call.model_name,
+                        "Tokens entrada": call.prompt_tokens,
+                        "Tokens en caché": call.cached_tokens,
+                        "Tokens salida": call.completion_tokens,
+                        "Continuaciones": call.continuation_rounds,
+                        "Duración (s)": call.latency_s,
+                    }
+                    for call in estimate.calls
+                ]
+            ),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+    return None
+
+
 def render_download_visualisations(session_state):
     """Render visualisation download options in the sidebar."""
     if not session_state.report_finalised or not session_state.report_sections:
@@ -210,6 +408,15 @@ def render_download_visualisations(session_state):
     # Get available charts based on variables
     available_charts = get_available_charts(all_variables)
 
+    chart_format = st.sidebar.radio(
+        "Formato",
+        list(CHART_DOWNLOAD_FORMATS.keys()),
+        format_func=lambda x: CHART_DOWNLOAD_FORMATS[x],
+        horizontal=True,
+        key="chart_format",
+        help=HELP_TEXTS["chart_format"],
+    )
+
     # Group charts by section
     charts_by_section = {}
     for chart_id, config in available_charts.items():
@@ -223,12 +430,17 @@ def render_download_visualisations(session_state):
         if section_charts:
             with st.sidebar.expander(f"📈 {section_name}"):
                 for chart_id, config in section_charts.items():
-                    chart, b64_str = create_downloadable_chart(chart_id, all_variables)
-                    if chart and b64_str:
+                    if chart_data(chart_id, all_variables) is not None:
+                        # Rendered only when clicked, then cached
                         st.download_button(
                             label=f"📊 {config['params']['title']}",
-                            data=base64.b64decode(b64_str),
-                            file_name=f"{chart_id}.png",
-                            mime="image/png",
+                            data=functools.partial(
+                                render_chart_image,
+                                chart_id,
+                                all_variables,
+                                chart_format,
+                            ),
+                            file_name=f"{chart_id}.{chart_format}",
+                            mime=MIME_TYPES[chart_format],
                             key=f"download_viz_{chart_id}",
                         )
@@ -0,0 +1,243 @@
+"""ZIP bundle with every artifact of a report.
+
+The bundle holds the edited and unedited Word documents, the JSON output, the PNG and
+SVG image of every available chart and a CSV table of the variables. It is written as
+a stream: each artifact is only loaded (from the document and chart caches or the
+report store) when its entry is written, and the compressed output is handed over in
+chunks, so memory is bounded by the largest artifact rather than the whole bundle.
+"""
+
+import csv
+import functools
+import io
+import json
+import logging
+import time
+import zipfile
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from src.config.charts import get_available_charts
+from src.models.sections import ReportSection
+from src.services.report_store import get_report_store
+from src.utils.constants import (
+    CHART_FORMATS,
+    CHARTS_DIRNAME,
+    DOCX_FILENAMES,
+    JSON_FILENAME,
+    VARIABLES_CSV_FILENAME,
+)
+from src.utils.document import get_word_doc, stored_docx_name
+from src.utils.plot_downloads import render_chart_image
+
+logger = logging.getLogger(__name__)
+
+# Name of an entry, and a callable loading its content (None to leave it out)
+BundleEntry = Tuple[str, Callable[[], Optional[bytes]]]
+
+CHUNK_SIZE = 1 << 20
+# Already compressed formats are stored as they are
+STORED_EXTENSIONS = ("docx", "png")
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable file keeping what zipfile writes until it is drained."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> Iterator[bytes]:
+        """Hand over what was written since the last call, if anything."""
+        if self.chunks:
+            data = b"".join(self.chunks)
+            self.chunks.clear()
+            yield data
+
+
+def iter_zip(entries: Iterable[BundleEntry]) -> Iterator[bytes]:
+    """
+    Write a ZIP archive as a stream of chunks.
+
+    Entries whose content cannot be loaded are logged and left out, so a missing chart
+    does not cut the download short.
+
+    Args:
+        entries: Name and loader of each entry, loaded one at a time
+
+    Yields:
+        Consecutive chunks of the archive
+    """
+    writer = _ChunkWriter()
+    date_time = time.localtime()[:6]
+    with zipfile.ZipFile(writer, "w") as archive:
+        for name, load in entries:
+            try:
+                content = load()
+            except Exception as err:  # pylint: disable=broad-except
+                logger.warning("Leaving %s out of the bundle: %r", name, err)
+                continue
+            if content is None:
+                continue
+
+            info = zipfile.ZipInfo(name, date_time)
+            info.compress_type = (
+                zipfile.ZIP_STORED
+                if name.rsplit(".", 1)[-1] in STORED_EXTENSIONS
+                else zipfile.ZIP_DEFLATED
+            )
+            with archive.open(info, "w") as dest:
+                for start in range(0, len(content), CHUNK_SIZE):
+                    dest.write(content[start : start + CHUNK_SIZE])
+                    yield from writer.drain()
+            del content
+            yield from writer.drain()
+    yield from writer.drain()
+
+
+def write_zip(entries: Iterable[BundleEntry], fileobj: BinaryIO) -> None:
+    """Write a ZIP archive to a file, one chunk at a time."""
+    for chunk in iter_zip(entries):
+        fileobj.write(chunk)
+
+
+def variables_csv(report_sections: List[ReportSection]) -> bytes:
+    """
+    CSV table of the variables of every section.
+
+    Category percentages are written as JSON objects. The table is encoded as UTF-8
+    with a byte order mark, so Excel reads the accents correctly.
+    """
+
+    def cell(value) -> str:
+        if isinstance(value, dict):
+            return json.dumps(value, ensure_ascii=False)
+        return "" if value is None else str(value)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(
+        [
+            "seccion",
+            "variable",
+            "descripcion",
+            "valor_linea_base",
+            "valor_cierre",
+            "cambio_porcentual",
+            "interpretacion",
+        ]
+    )
+    for section in report_sections:
+        for name, data in section.variables.items():
+            writer.writerow(
+                [
+                    section.title,
+                    name,
+                    data.description,
+                    cell(data.value_initial_intervention),
+                    cell(data.value_final_intervention),
+                    cell(data.percentage_change),
+                    data.interpretation,
+                ]
+            )
+    return buffer.getvalue().encode("utf-8-sig")
+
+
+def stored_artifact(report_id: Optional[str], name: str) -> Optional[bytes]:
+    """Artifact of a stored report, or None if it was not stored."""
+    if not report_id:
+        return None
+    try:
+        return get_report_store().get_artifact(report_id, name)
+    except KeyError:
+        return None
+
+
+def report_bundle_entries(
+    report_sections: List[ReportSection],
+    report_json: Callable[[], Optional[bytes]],
+    documents: Dict[str, Callable[[], Optional[bytes]]],
+    report_id: Optional[str] = None,
+) -> List[BundleEntry]:
+    """
+    Entries of the bundle of a report.
+
+    Chart images saved with the report are read from the report store; the others
+    are taken from the chart cache, or rendered when their entry is written, so only
+    one image not kept elsewhere is held at a time.
+
+    Args:
+        report_sections: Sections of the report, with their variables
+        report_json: Callable returning the JSON output
+        documents: Callables returning the Word documents, by version
+        report_id: Identifier of the report in the report store, if stored
+
+    Returns:
+        Name and loader of each entry
+    """
+    entries: List[BundleEntry] = [(JSON_FILENAME, report_json)]
+    entries += [(DOCX_FILENAMES[version], load) for version, load in documents.items()]
+    entries.append(
+        (VARIABLES_CSV_FILENAME, functools.partial(variables_csv, report_sections))
+    )
+
+    variables = {}
+    for section in report_sections:
+        variables.update(section.variables)
+    stored = set()
+    if report_id:
+        try:
+            stored = set(get_report_store().get_report(report_id).artifacts)
+        except KeyError:
+            report_id = None
+
+    for chart_id in get_available_charts(variables):
+        for fmt in CHART_FORMATS:
+            name = f"{CHARTS_DIRNAME}/{chart_id}.{fmt}"
+            if name in stored:
+                entries.append(
+                    (name, functools.partial(stored_artifact, report_id, name))
+                )
+                continue
+            entries.append(
+                (name, functools.partial(render_chart_image, chart_id, variables, fmt))
+            )
+    return entries
+
+
+def stored_bundle_entries(report_id: str) -> List[BundleEntry]:
+    """
+    Entries of the bundle of a stored report.
+
+    Word documents that were not saved with the report are built (once per content)
+    and saved with it.
+
+    Raises:
+        KeyError: If the report is unknown
+    """
+    store = get_report_store()
+    stored = store.get_report(report_id)
+    sections = store.get_sections(report_id)
+
+    def document(version: str) -> bytes:
+        name = stored_docx_name(version)
+        return get_word_doc(
+            stored.executive_summary,
+            stored.edited_output,
+            sections,
+            version == "edited",
+            load=functools.partial(stored_artifact, report_id, name),
+            save=lambda content: store.add_artifacts(report_id, {name: content}),
+        )
+
+    return report_bundle_entries(
+        sections,
+        functools.partial(stored_artifact, report_id, JSON_FILENAME),
+        {version: functools.partial(document, version) for version in DOCX_FILENAMES},
+        report_id,
+    )
@@ -11,10 +11,12 @@ MESSAGES = {
         "data_error": "Error al procesar los datos: {}",
         "report_error": "Error durante la generación del reporte: {}",
         "unexpected_error": "Error inesperado: {}",
+        "run_cancelled": "La generación del reporte se canceló: {}",
         "empty_suggestion": "Por favor, escribe una sugerencia antes de enviar.",
     },
     "success": {
         "report_generated": "🎉 ¡Reporte generado exitosamente!",
+        "report_loaded": "📂 Reporte cargado desde el historial.",
         "suggestion_sent": "¡Gracias por tu sugerencia! El equipo de IGL la revisará pronto.",
     },
     "info": {
@@ -22,7 +24,10 @@ MESSAGES = {
         "generating_summary": "📝 Generando resumen ejecutivo...",
         "editing_report": "✍️ Realizando edición final...",
         "preparing_json": "💾 Preparando archivo JSON...",
+        "preparing_docx": "📄 Preparando documentos Word...",
+        "rendering_charts": "📈 Generando gráficos...",
         "missing_variables": "Las siguientes variables no fueron encontradas en los datos:",
+        "approximate_tokens": "Tokens aproximados a partir de la longitud del texto: no hay un tokenizador disponible localmente.",
     },
 }
 
@@ -31,8 +36,34 @@ ALLOWED_EXTENSIONS = ["xlsx"]
 MIME_TYPES = {
     "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
     "json": "application/json",
+    "csv": "text/csv",
+    "pdf": "application/pdf",
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "zip": "application/zip",
 }
 
+# Names of the report files, in downloads, in the CLI output and in the report store
+JSON_FILENAME = "report.json"
+DOCX_FILENAMES = {
+    "edited": "reporte_zasca_editado.docx",
+    "unedited": "reporte_zasca_sin_editar.docx",
+}
+CHARTS_DIRNAME = "graficos"
+CHART_FORMATS = ("png", "svg")
+
+# Download formats of the charts: PNG is rasterised, SVG and PDF stay vectors
+CHART_DOWNLOAD_FORMATS = {
+    "png": "PNG (imagen)",
+    "svg": "SVG (vectorial)",
+    "pdf": "PDF (vectorial)",
+}
+VARIABLES_CSV_FILENAME = "variables.csv"
+BUNDLE_FILENAME = "reporte_zasca.zip"
+
+# Reports listed in "Reportes anteriores"
+STORED_REPORTS_LIMIT = 20
+
 # Model options
 OAI_MODEL_OPTIONS = {
     "gpt-3.5-turbo": "GPT-3.5 Turbo (Más rápido)",
@@ -44,13 +75,43 @@ GEMINI_MODEL_OPTIONS = {
     # "gemini-2.5-pro-exp-03-25": "Gemini 2.5 Pro (Experimental)",
 }
 
+# Prices in USD per million tokens, used to estimate the cost of a run
+MODEL_PRICES = {
+    "gpt-3.5-turbo": {"input": 0.50, "cached_input": 0.50, "output": 1.50},
+    "gpt-4-0125-preview": {"input": 10.00, "cached_input": 10.00, "output": 30.00},
+    "gemini-2.0-flash": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+}
+
+# Executive summary modes
+SUMMARY_MODE_OPTIONS = {
+    "standard": "Estándar (secciones completas)",
+    "hierarchical": "Jerárquico (resúmenes por sección)",
+    "speculative": "Especulativo (en paralelo con las secciones)",
+}
+
+# Model routing policies (see ROUTING_POLICIES)
+ROUTING_POLICY_OPTIONS = {
+    "selected": "Modelo seleccionado en todas las llamadas",
+    "balanced": "Balanceado (modelo rápido para secciones pequeñas y borradores)",
+    "economy": "Económico (modelo rápido salvo en secciones clave)",
+}
+
 # Help texts
 HELP_TEXTS = {
     "oai_model_select": "Selecciona el modelo de OpenAI a utilizar. GPT-4 es más potente pero más lento.",
     "gemini_model_select": "Selecciona el modelo de Google Gemini a utilizar. Actualmente solo Gemini 2.0 Flash, ya que Gemini 2.5 Pro es más potente pero tiene un rate limit demasiado bajo en el free tier.",
+    "summary_mode": "Estándar envía el contenido completo de todas las secciones al resumen ejecutivo. Jerárquico resume cada sección en paralelo y construye el resumen a partir de esos resúmenes, con un prompt más corto y de tamaño acotado. Especulativo redacta el resumen a partir de las interpretaciones mientras se generan las secciones y luego lo concilia con ellas.",
+    "batch_sections": "Agrupa las secciones con pocas variables en una sola solicitud a la API. Reduce el número de solicitudes y los tokens repetidos, útil cuando hay límites de uso.",
+    "routing_policy": "Define qué modelo atiende cada llamada. Las políticas distintas a la primera usan el modelo rápido del proveedor para las llamadas pequeñas o secundarias y, si el proveedor seleccionado presenta muchos errores o demoras, envían las llamadas al otro proveedor.",
+    "show_diagnostics": "Muestra, después de cada generación, los tiempos de cada etapa, los tokens y el costo estimado de cada llamada, los aciertos de caché y los reintentos.",
     "generate_button": "Haz clic para generar el reporte basado en los datos y detalles proporcionados",
+    "estimate_button": "Calcula, sin llamar a la API, el tamaño de cada prompt, los tokens, la duración y el costo esperados del reporte con la configuración actual, y avisa si algún prompt excede el contexto del modelo o requerirá continuación.",
     "file_upload": "Selecciona un archivo Excel (.xlsx) con los datos del centro ZASCA",
     "unedited_download": "Descarga el reporte sin editar en formato Word",
     "edited_download": "Descarga el reporte editado en formato Word",
     "json_download": "Descarga los datos del reporte en formato JSON",
+    "chart_format": "PNG es una imagen de tamaño fijo. SVG y PDF son vectoriales: se pueden ampliar sin perder calidad, insertar en Word (SVG) o convertir a EMF.",
+    "interactive_charts": "Muestra los gráficos de cada sección en la pestaña de secciones sin editar. Se dibujan en el navegador, sin generar imágenes.",
+    "bundle_download": "Descarga en un solo archivo ZIP los documentos Word, el JSON, los gráficos (PNG y SVG) y la tabla de variables (CSV)",
+    "stored_reports": "Reportes generados anteriormente en esta sesión (o por su usuario), que pueden verse y descargarse de nuevo sin volver a generarlos. Sin autenticación, al recargar la página se inicia una sesión nueva que ya no los lista.",
 }
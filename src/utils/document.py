@@ -1,10 +1,44 @@
-"""Utilities for document generation."""
+"""Utilities for document generation.
 
+Word documents are built at most once per content: get_word_doc memoizes the bytes
+of each document by a hash of the content it is built from, and concurrent requests
+for a document being built wait for that build instead of starting another one.
+prefetch_word_docs runs builds in background threads.
+
+With DOCX_EMBED_CHARTS, the charts of each section are inserted at its end, in the
+order of chart_config. All of them are requested from the chart cache at once before
+the document is built, so they render in parallel (see utils/plot_downloads).
+"""
+
+import hashlib
 import io
-from typing import List, Dict, Any
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Dict, Optional
+from src.config.charts import get_available_charts
+from src.config.generation import (
+    DOCX_BUILD_WORKERS,
+    DOCX_CACHE_SIZE,
+    DOCX_CHART_WIDTH_IN,
+    DOCX_EMBED_CHARTS,
+)
+from src.models.sections import ReportSection
+from src.utils.constants import DOCX_FILENAMES
 from docx import Document
-from docx.shared import Pt
+from docx.shared import Inches, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from src.utils.plot_downloads import chart_data, chart_key, render_chart_images
+from src.utils.telemetry import traced
+
+logger = logging.getLogger(__name__)
+
+_docx_cache: "OrderedDict[str, Future]" = OrderedDict()
+_docx_lock = threading.Lock()
+_docx_executor = ThreadPoolExecutor(
+    max_workers=DOCX_BUILD_WORKERS, thread_name_prefix="docx"
+)
 
 
 def process_paragraph_text(doc: Document, text: str) -> None:
@@ -62,17 +96,136 @@ def process_content_lines(doc: Document, lines: List[str]) -> None:
         process_paragraph_text(doc, "\n\n".join(current_paragraph))
 
 
-def create_word_doc(session_state: Dict[str, Any], edited: bool = True) -> io.BytesIO:
+def report_variables(report_sections: List[ReportSection]) -> Dict[str, Any]:
+    """Variables of all the sections of a report."""
+    variables = {}
+    for section in report_sections:
+        variables.update(section.variables)
+    return variables
+
+
+def render_section_charts(
+    report_sections: List[ReportSection],
+) -> Dict[str, Dict[str, bytes]]:
+    """
+    Render the charts of a report concurrently, grouped by section.
+
+    Args:
+        report_sections: List of report sections
+
+    Returns:
+        PNG bytes by chart ID, in the order of chart_config, by section title
+    """
+    variables = report_variables(report_sections)
+    available = get_available_charts(variables)
+    images = render_chart_images(available, variables)
+
+    section_charts: Dict[str, Dict[str, bytes]] = {}
+    for chart_id, config in available.items():
+        if chart_id in images:
+            section = config.get("section", "Otros indicadores")
+            section_charts.setdefault(section, {})[chart_id] = images[chart_id]
+    return section_charts
+
+
+def add_charts(doc: Document, images: Dict[str, bytes]) -> None:
+    """
+    Insert chart images, centred and scaled to DOCX_CHART_WIDTH_IN.
+
+    Args:
+        doc: Word document instance
+        images: PNG bytes by chart ID, in the order they are inserted
+    """
+    for chart_id, png in images.items():
+        try:
+            doc.add_picture(io.BytesIO(png), width=Inches(DOCX_CHART_WIDTH_IN))
+        except Exception as err:  # pylint: disable=broad-except
+            logger.warning(
+                "Leaving chart %s out of the Word document: %r", chart_id, err
+            )
+            continue
+        doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+
+def normalise_heading(line: str) -> str:
+    """Text of a markdown heading, for comparing headings across versions."""
+    return line.replace("#", "").replace("*", "").strip().casefold()
+
+
+def section_headings(report_sections: List[ReportSection]) -> Dict[str, str]:
+    """Title of each section, by the "##" heading its generated content starts with."""
+    headings = {}
+    for section in report_sections:
+        for line in (section.content or "").split("\n"):
+            if line.startswith("##") and not line.startswith("###"):
+                headings[normalise_heading(line)] = section.title
+                break
+    return headings
+
+
+def process_edited_lines(
+    doc: Document,
+    lines: List[str],
+    report_sections: List[ReportSection],
+    section_charts: Dict[str, Dict[str, bytes]],
+) -> None:
+    """
+    Process edited content lines, inserting the charts of each section at its end.
+
+    Sections are recognised by their "##" headings. The charts of sections whose
+    heading is not found are added at the end, under a "Gráficos" heading.
+
+    Args:
+        doc: Word document instance
+        lines: List of text lines to process
+        report_sections: List of report sections
+        section_charts: Chart images by section title
+    """
+    headings = section_headings(report_sections)
+    blocks: List[List[str]] = [[]]
+    titles: List[Optional[str]] = [None]
+    for line in lines:
+        if line.startswith("##") and not line.startswith("###"):
+            blocks.append([])
+            titles.append(headings.get(normalise_heading(line)))
+        blocks[-1].append(line)
+
+    placed = set()
+    for title, block in zip(titles, blocks):
+        process_content_lines(doc, block)
+        if title in section_charts and title not in placed:
+            add_charts(doc, section_charts[title])
+            placed.add(title)
+
+    remaining = [title for title in section_charts if title not in placed]
+    if remaining:
+        doc.add_heading("Gráficos", level=2)
+        for title in remaining:
+            add_charts(doc, section_charts[title])
+
+
+@traced("create_word_doc", "edited")
+def build_word_doc(
+    executive_summary: str,
+    edited_output: str,
+    report_sections: List[ReportSection],
+    edited: bool = True,
+    charts: bool = DOCX_EMBED_CHARTS,
+) -> io.BytesIO:
     """
     Create a Word document from the report content.
 
     Args:
-        session_state: Streamlit session state containing report data
+        executive_summary: Executive summary text
+        edited_output: Edited report content
+        report_sections: List of report sections
         edited: Whether to use edited or unedited content
+        charts: Whether to insert the charts of each section
 
     Returns:
         BytesIO buffer containing the Word document
     """
+    section_charts = render_section_charts(report_sections) if charts else {}
     doc = Document()
 
     # Add title
@@ -81,15 +234,15 @@ def create_word_doc(session_state: Dict[str, Any], edited: bool = True) -> io.By
 
     # Add executive summary
     doc.add_heading("Resumen Ejecutivo", level=1)
-    doc.add_paragraph(session_state.resumen_ejecutivo)
+    doc.add_paragraph(executive_summary)
 
     if edited:
         # Process edited content
-        lines = session_state.edited_output.split("\n")
-        process_content_lines(doc, lines)
+        lines = edited_output.split("\n")
+        process_edited_lines(doc, lines, report_sections, section_charts)
     else:
         # Add unedited content with variables subsections
-        for report_section in session_state.report_sections:
+        for report_section in report_sections:
             doc.add_heading(report_section.title, level=2)
 
             if report_section.content:
@@ -103,8 +256,152 @@ def create_word_doc(session_state: Dict[str, Any], edited: bool = True) -> io.By
                     p.add_run(f"{variable_data.description}: ").bold = True
                     p.add_run(variable_data.interpretation)
 
+            add_charts(doc, section_charts.get(report_section.title, {}))
+
     # Save to bytes buffer
     docx_buffer = io.BytesIO()
     doc.save(docx_buffer)
     docx_buffer.seek(0)
     return docx_buffer
+
+
+def word_doc_key(
+    executive_summary: str,
+    edited_output: str,
+    report_sections: List[ReportSection],
+    edited: bool = True,
+    charts: bool = DOCX_EMBED_CHARTS,
+) -> str:
+    """Hash of the content a Word document is built from.
+
+    With charts, the keys of the chart images (see plot_downloads.chart_key) are
+    included, computed from the variables without rendering the charts. Charts whose
+    data cannot be prepared are left out, as they are of the document.
+    """
+    if edited:
+        content = [executive_summary, edited_output]
+    else:
+        content = [executive_summary] + [
+            [
+                section.title,
+                section.content,
+                [
+                    [data.description, data.interpretation]
+                    for data in section.variables.values()
+                ],
+            ]
+            for section in report_sections
+        ]
+    if charts:
+        if edited:
+            # Where the charts go depends on the headings of the sections
+            content.append(sorted(section_headings(report_sections).items()))
+        variables = report_variables(report_sections)
+        for chart_id in get_available_charts(variables):
+            try:
+                data = chart_data(chart_id, variables)
+                if data is not None:
+                    content.append(chart_key(chart_id, data))
+            except Exception as err:  # pylint: disable=broad-except
+                logger.warning(
+                    "Leaving chart %s out of the Word document: %r", chart_id, err
+                )
+    digest = hashlib.sha256(repr(content).encode("utf-8")).hexdigest()
+    return f"{'edited' if edited else 'unedited'}:{digest}"
+
+
+def get_word_doc(
+    executive_summary: str,
+    edited_output: str,
+    report_sections: List[ReportSection],
+    edited: bool = True,
+    load: Optional[Callable[[], Optional[bytes]]] = None,
+    save: Optional[Callable[[bytes], None]] = None,
+    charts: bool = DOCX_EMBED_CHARTS,
+) -> bytes:
+    """
+    Get a Word document, building it only if the same content was not built before.
+
+    Args:
+        executive_summary: Executive summary text
+        edited_output: Edited report content
+        report_sections: List of report sections
+        edited: Whether to use edited or unedited content
+        load: Optional callable returning the document if it was saved before (e.g. in
+            the report store, under its stored_docx_name), tried before building it
+        save: Optional callable called with the bytes of a newly built document
+        charts: Whether to insert the charts of each section
+
+    Returns:
+        Bytes of the Word document
+    """
+    key = word_doc_key(
+        executive_summary, edited_output, report_sections, edited, charts
+    )
+    with _docx_lock:
+        future = _docx_cache.get(key)
+        owner = future is None
+        if owner:
+            future = _docx_cache[key] = Future()
+            while len(_docx_cache) > DOCX_CACHE_SIZE:
+                _docx_cache.popitem(last=False)
+        else:
+            _docx_cache.move_to_end(key)
+
+    if owner:
+        try:
+            content = load() if load else None
+            if content is None:
+                content = build_word_doc(
+                    executive_summary, edited_output, report_sections, edited, charts
+                ).getvalue()
+                if save:
+                    save(content)
+            future.set_result(content)
+        except BaseException as err:
+            # Failed builds are not cached, waiting callers get the error
+            with _docx_lock:
+                if _docx_cache.get(key) is future:
+                    del _docx_cache[key]
+            future.set_exception(err)
+            raise
+    return future.result()
+
+
+def stored_docx_name(version: str, charts: bool = True) -> str:
+    """
+    Name of a Word document in the report store.
+
+    Documents without charts are saved under their own name, so a stored document is
+    only loaded for requests with the same charts setting.
+
+    Args:
+        version: "edited" or "unedited"
+        charts: Whether the charts were asked for (without DOCX_EMBED_CHARTS,
+            documents never have them)
+
+    Returns:
+        Name of the artifact
+    """
+    name = DOCX_FILENAMES[version]
+    if charts and DOCX_EMBED_CHARTS:
+        return name
+    return name.replace(".docx", "_sin_graficos.docx")
+
+
+def prefetch_word_docs(builds: Dict[str, Callable[[], bytes]]) -> None:
+    """
+    Run Word document builds in background threads, logging their failures.
+
+    Args:
+        builds: Callables building each document (e.g. calling get_word_doc), by name
+    """
+
+    def run(name: str, build: Callable[[], bytes]) -> None:
+        try:
+            build()
+        except Exception as err:  # pylint: disable=broad-except
+            logger.warning("Could not prefetch the %s Word document: %s", name, err)
+
+    for name, build in builds.items():
+        _docx_executor.submit(run, name, build)
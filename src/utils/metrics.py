@@ -0,0 +1,118 @@
+"""In-process collection of stage timings and model usage for the diagnostics panel.
+
+The pipeline is already instrumented with telemetry spans, so the collector is fed by a
+span processor: while collect_metrics() is active, every span that ends in the same
+context (including asyncio tasks started from it) is recorded.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from pydantic import BaseModel, Field
+from src.utils.constants import MODEL_PRICES
+
+# Span name prefixes of the calls to the AI APIs
+LLM_SPAN_PREFIXES = ("openai", "gemini")
+
+
+class SpanRecord(BaseModel):
+    """A finished span."""
+
+    span_id: int = Field(..., description="OpenTelemetry span id.")
+    parent_id: Optional[int] = Field(None, description="Span id of the parent span.")
+    name: str = Field(..., description="Span name template, e.g. 'openai {model}'.")
+    label: str = Field(..., description="Span name with its attributes filled in.")
+    start_s: float = Field(..., description="Start time, relative to the collection start.")
+    duration_s: float = Field(..., description="Duration of the span in seconds.")
+    attributes: Dict[str, Any] = Field(default_factory=dict)
+
+    @property
+    def is_llm_call(self) -> bool:
+        """Whether the span is a call to an AI API."""
+        return self.name.startswith(LLM_SPAN_PREFIXES)
+
+
+class RunMetrics(BaseModel):
+    """Spans recorded during one collection (e.g. one report generation)."""
+
+    started_ns: int = Field(..., description="Collection start, in epoch nanoseconds.")
+    records: List[SpanRecord] = Field(default_factory=list)
+
+    def add(self, span: ReadableSpan) -> None:
+        """Record a finished span."""
+        attributes = {
+            key: value
+            for key, value in (span.attributes or {}).items()
+            if not key.startswith(("logfire.", "code."))
+        }
+        self.records.append(
+            SpanRecord(
+                span_id=span.context.span_id,
+                parent_id=span.parent.span_id if span.parent else None,
+                name=span.name,
+                label=str((span.attributes or {}).get("logfire.msg", span.name)),
+                start_s=(span.start_time - self.started_ns) / 1e9,
+                duration_s=(span.end_time - span.start_time) / 1e9,
+                attributes=attributes,
+            )
+        )
+
+    @property
+    def llm_calls(self) -> List[SpanRecord]:
+        """Spans of the calls to the AI APIs."""
+        return [record for record in self.records if record.is_llm_call]
+
+    def parent_label(self, record: SpanRecord) -> Optional[str]:
+        """Label of the recorded parent of a span, if any."""
+        return next(
+            (
+                parent.label
+                for parent in self.records
+                if parent.span_id == record.parent_id
+            ),
+            None,
+        )
+
+
+def estimate_cost(model_name: str, usage: Dict[str, Any]) -> Optional[float]:
+    """Estimate the cost in USD of a call from its token usage, if the model is priced."""
+    prices = MODEL_PRICES.get(model_name)
+    if not prices:
+        return None
+    cached_tokens = usage.get("cached_tokens", 0)
+    uncached_tokens = usage.get("prompt_tokens", 0) - cached_tokens
+    return (
+        uncached_tokens * prices["input"]
+        + cached_tokens * prices["cached_input"]
+        + usage.get("completion_tokens", 0) * prices["output"]
+    ) / 1e6
+
+
+_current_metrics: ContextVar[Optional[RunMetrics]] = ContextVar(
+    "current_metrics", default=None
+)
+
+
+@contextmanager
+def collect_metrics() -> Iterator[RunMetrics]:
+    """Record every span that ends inside the block into a new RunMetrics."""
+    # OpenTelemetry span timestamps are epoch nanoseconds
+    metrics = RunMetrics(started_ns=time.time_ns())
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+class MetricsSpanProcessor(SpanProcessor):
+    """Span processor forwarding finished spans to the active RunMetrics."""
+
+    def on_end(self, span: ReadableSpan) -> None:
+        metrics = _current_metrics.get()
+        attributes = span.attributes or {}
+        # logfire also emits zero-length "pending" spans when a span starts
+        if metrics is not None and attributes.get("logfire.span_type") == "span":
+            metrics.add(span)
@@ -1,20 +1,24 @@
 """Utilities for generating JSON output."""
 import json
-from typing import List
+from typing import List, Optional
 from src.models.sections import ReportSection  # Import VariableData from models
 
 
 def generate_json_output(
     report_sections: List[ReportSection],
     executive_summary: str,
-    output_filename="report.json",
+    output_filename: Optional[str] = None,
 ) -> str:
-    """Generate JSON output from the report sections."""
+    """Generate JSON output from the report sections.
+
+    The output is also written to output_filename, if given.
+    """
     report_data = {"executive_summary": executive_summary, "sections": {}}
 
     for section in report_sections:
         report_data["sections"][section.title] = {
             "content": section.content,
+            "usage": section.usage,
             "variables": {
                 var: {
                     "description": data.description,
@@ -29,7 +33,8 @@ def generate_json_output(
 
     json_output = json.dumps(report_data, indent=4, ensure_ascii=False)
 
-    with open(output_filename, "w", encoding="utf-8") as json_file:
-        json_file.write(json_output)
+    if output_filename:
+        with open(output_filename, "w", encoding="utf-8") as json_file:
+            json_file.write(json_output)
 
     return json_output
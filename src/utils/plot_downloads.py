@@ -1,26 +1,60 @@
-import base64
+"""Chart images for downloads and the report store.
+
+Images (PNG, or the SVG and PDF vector formats) are rendered at most once per chart
+and data: render_chart_image caches the bytes of each image by its chart id, format
+and a hash of its data and parameters, and concurrent requests for an image being
+rendered wait for that render instead of starting another one. Images are rendered
+by kaleido in worker processes, each keeping its headless Chrome running between
+renders, so render_chart_images renders several charts in parallel. Nothing is
+rendered until an image is requested; chart_spec returns the Plotly JSON of a chart,
+drawn by the browser, without kaleido.
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Optional
+import kaleido
 import pandas as pd
+import plotly.graph_objects as go
 from src.config.charts import chart_config
+from src.config.generation import (
+    CHART_CACHE_SIZE,
+    CHART_RENDER_PROCESSES,
+    CHART_RENDER_SCALE,
+)
+from src.utils.telemetry import span
+
+logger = logging.getLogger(__name__)
+
+_chart_cache: "OrderedDict[str, Future]" = OrderedDict()
+_chart_lock = threading.Lock()
+_chart_executor: Optional[Executor] = None
 
 
-def create_downloadable_chart(chart_id: str, variables_dict: dict):
+def chart_data(chart_id: str, variables_dict: dict) -> Optional[pd.DataFrame]:
     """
-    Creates a downloadable chart if all required variables are available
+    Prepare the data of a chart if all required variables are available
 
     Args:
         chart_id: ID of the chart to create
         variables_dict: Dictionary of available processed variables
 
     Returns:
-        tuple: (chart object, base64 string for download) or (None, None) if chart cannot be created
+        DataFrame passed to the chart function, or None if the chart cannot be created
     """
     config = chart_config.get(chart_id)
     if not config:
-        return None, None
+        return None
 
     # Check if we have all required variables
     if not all(var in variables_dict for var in config["required_variables"]):
-        return None, None
+        return None
 
     # Prepare data based on chart type
     if config["type"] == "multi_response":
@@ -41,18 +75,18 @@ def create_downloadable_chart(chart_id: str, variables_dict: dict):
                     },
                 ]
             )
-        data = pd.DataFrame(rows)
+        return pd.DataFrame(rows)
 
-    elif config["type"] == "simple_change":
+    if config["type"] == "simple_change":
         var = variables_dict[config["required_variables"][0]]
-        data = pd.DataFrame(
+        return pd.DataFrame(
             {
                 "period": ["Línea Base", "Cierre de la intervención"],
                 "value": [var.value_initial_intervention, var.value_final_intervention],
             }
         )
 
-    elif config["type"] == "categorical":
+    if config["type"] == "categorical":
         var = variables_dict[config["required_variables"][0]]
         # create a row for each category and period
         rows = []
@@ -71,14 +105,189 @@ def create_downloadable_chart(chart_id: str, variables_dict: dict):
                     },
                 ]
             )
-        data = pd.DataFrame(rows)
+        return pd.DataFrame(rows)
+
+    raise ValueError(f"Unsupported chart type: {config['type']}")
+
+
+def create_chart_figure(chart_id: str, variables_dict: dict) -> Optional[go.Figure]:
+    """Plotly figure of a chart, or None if the chart cannot be created."""
+    data = chart_data(chart_id, variables_dict)
+    if data is None:
+        return None
+    return chart_config[chart_id]["chart_func"](data, chart_config[chart_id]["params"])
+
+
+def chart_spec(chart_id: str, variables_dict: dict) -> Optional[str]:
+    """Plotly JSON spec of a chart, or None if the chart cannot be created."""
+    fig = create_chart_figure(chart_id, variables_dict)
+    return fig.to_json() if fig is not None else None
+
+
+def chart_key(chart_id: str, data: pd.DataFrame, fmt: str = "png") -> str:
+    """Cache key of a chart image: id, format and hashes of its data and parameters.
+
+    The data is hashed as JSON, as its cells may hold category percentages (dicts),
+    which pandas cannot hash.
+    """
+    data_json = json.dumps(
+        data.to_dict(orient="split"), ensure_ascii=False, default=str
+    )
+    data_digest = hashlib.sha256(data_json.encode("utf-8"))
+    params = json.dumps(
+        [chart_config[chart_id]["params"], CHART_RENDER_SCALE],
+        sort_keys=True,
+        default=str,
+    )
+    params_digest = hashlib.sha256(params.encode("utf-8"))
+    return f"{chart_id}.{fmt}:{data_digest.hexdigest()}:{params_digest.hexdigest()}"
 
-    else:
-        raise ValueError(f"Unsupported chart type: {config['type']}")
 
-    # Create and return chart
+def _start_renderer() -> None:
+    """Start the kaleido server of a worker process, kept running between renders."""
+    try:
+        # The server starts Chrome in a background thread, where a missing browser
+        # would leave every render waiting forever: look for it here first
+        kaleido.Kaleido()
+        kaleido.start_sync_server(silence_warnings=True)
+    except Exception as err:  # pylint: disable=broad-except
+        # Renders then start their own browser, or fail with a clearer error
+        logger.warning("Could not start the kaleido server: %s", err)
+
+
+def _render_image(chart_id: str, data: pd.DataFrame, fmt: str) -> bytes:
+    """Render a chart as an image; runs in a worker process."""
+    config = chart_config[chart_id]
     fig = config["chart_func"](data, config["params"])
-    img_bytes = fig.to_image(format="png", scale=2)
-    b64 = base64.b64encode(img_bytes).decode()
+    return fig.to_image(format=fmt, scale=CHART_RENDER_SCALE)
+
+
+def _get_executor() -> Executor:
+    """The executor rendering the charts, created on first use (under _chart_lock)."""
+    global _chart_executor  # pylint: disable=global-statement
+    if _chart_executor is None:
+        if CHART_RENDER_PROCESSES > 0:
+            # Spawned rather than forked: the parent runs threads (Streamlit, asyncio)
+            _chart_executor = ProcessPoolExecutor(
+                max_workers=CHART_RENDER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_start_renderer,
+            )
+        else:
+            _chart_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="charts"
+            )
+    return _chart_executor
+
+
+def _forget(key: str, executor: Executor, future: Future) -> None:
+    """Drop a failed render from the cache, and a broken pool so it is recreated."""
+    global _chart_executor  # pylint: disable=global-statement
+    if not future.cancelled() and future.exception() is None:
+        return
+    with _chart_lock:
+        if _chart_cache.get(key) is future:
+            del _chart_cache[key]
+        if _chart_executor is executor and (
+            not future.cancelled() and isinstance(future.exception(), BrokenProcessPool)
+        ):
+            executor.shutdown(wait=False, cancel_futures=True)
+            _chart_executor = None
+
+
+def chart_image_future(
+    chart_id: str, variables_dict: dict, fmt: str = "png"
+) -> Optional[Future]:
+    """
+    Start rendering an image of a chart, unless it was rendered or is being rendered.
+
+    Args:
+        chart_id: ID of the chart to render
+        variables_dict: Dictionary of available processed variables
+        fmt: Image format, "png", "svg" or "pdf"
+
+    Returns:
+        Future of the image bytes, or None if the chart cannot be created
+    """
+    global _chart_executor  # pylint: disable=global-statement
+    data = chart_data(chart_id, variables_dict)
+    if data is None:
+        return None
+
+    key = chart_key(chart_id, data, fmt)
+    with _chart_lock:
+        future = _chart_cache.get(key)
+        if future is not None:
+            _chart_cache.move_to_end(key)
+            return future
+
+        executor = _get_executor()
+        try:
+            future = executor.submit(_render_image, chart_id, data, fmt)
+        except (BrokenProcessPool, RuntimeError):
+            # The pool broke, or was shut down, since the last render
+            _chart_executor = None
+            executor = _get_executor()
+            future = executor.submit(_render_image, chart_id, data, fmt)
+        _chart_cache[key] = future
+        while len(_chart_cache) > CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+
+    # Failed renders are not cached, waiting callers get the error
+    future.add_done_callback(lambda done: _forget(key, executor, done))
+    return future
+
+
+def render_chart_image(
+    chart_id: str, variables_dict: dict, fmt: str = "png"
+) -> Optional[bytes]:
+    """
+    Image of a chart, rendered only if the same chart and data were not before.
+
+    Args:
+        chart_id: ID of the chart to render
+        variables_dict: Dictionary of available processed variables
+        fmt: Image format, "png", "svg" or "pdf"
+
+    Returns:
+        Image bytes, or None if the chart cannot be created
+    """
+    future = chart_image_future(chart_id, variables_dict, fmt)
+    return future.result() if future else None
+
+
+def render_chart_images(
+    chart_ids: Iterable[str], variables_dict: dict, fmt: str = "png"
+) -> Dict[str, bytes]:
+    """
+    Images of several charts, rendered in parallel.
+
+    Charts that cannot be created or fail to render are logged and left out.
+
+    Args:
+        chart_ids: IDs of the charts to render
+        variables_dict: Dictionary of available processed variables
+        fmt: Image format, "png", "svg" or "pdf"
+
+    Returns:
+        Image bytes by chart ID, in the order of chart_ids
+    """
+    chart_ids = list(chart_ids)
+    with span("charts {fmt}", fmt=fmt, count=len(chart_ids)) as charts_span:
+        futures = {}
+        for chart_id in chart_ids:
+            try:
+                futures[chart_id] = chart_image_future(chart_id, variables_dict, fmt)
+            except Exception as err:  # pylint: disable=broad-except
+                logger.warning("Could not render chart %s: %r", chart_id, err)
 
-    return fig, b64
+        images = {}
+        for chart_id, future in futures.items():
+            if future is None:
+                continue
+            try:
+                images[chart_id] = future.result()
+            except Exception as err:  # pylint: disable=broad-except
+                logger.warning("Could not render chart %s: %r", chart_id, err)
+        charts_span.set_attribute("rendered", len(images))
+    return images
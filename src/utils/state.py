@@ -1,7 +1,9 @@
 """Session state management utilities."""
 
-from typing import Dict, Any
+import os
+from typing import Dict, Any, Optional
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 
 def init_session_state() -> Dict[str, Any]:
@@ -19,11 +21,13 @@ def init_session_state() -> Dict[str, Any]:
         st.session_state.resumen_ejecutivo = None
         st.session_state.edited_output = None
         st.session_state.report_sections = None
+        st.session_state.report_id = None
         st.session_state.success_message = None
         st.session_state.loaded_data = None
         st.session_state.filtered_sections_config = {}
         st.session_state.variable_selections = {}
         st.session_state.missing_variables = {}
+        st.session_state.run_metrics = {}
 
     return st.session_state
 
@@ -33,6 +37,8 @@ def update_report_state(
     resumen_ejecutivo: str,
     edited_output: str,
     report_sections: list,
+    report_id: Optional[str] = None,
+    success_message: str = "🎉 ¡Reporte generado exitosamente!",
 ) -> None:
     """
     Update the session state with report generation results.
@@ -42,6 +48,8 @@ def update_report_state(
         resumen_ejecutivo: Executive summary text
         edited_output: Edited report content
         report_sections: List of report sections
+        report_id: Identifier of the report in the report store
+        success_message: Message shown in the sidebar
     """
     st.session_state.report_generated = True
     st.session_state.report_finalised = True
@@ -49,7 +57,29 @@ def update_report_state(
     st.session_state.resumen_ejecutivo = resumen_ejecutivo
     st.session_state.edited_output = edited_output
     st.session_state.report_sections = report_sections
+    st.session_state.report_id = report_id
     st.session_state.markdown_content = (
         f"# Reporte ZASCA\n\n## Resumen Ejecutivo\n{resumen_ejecutivo}\n\n{edited_output}"
     )
-    st.session_state.success_message = "🎉 ¡Reporte generado exitosamente!"
+    st.session_state.success_message = success_message
+
+
+def get_report_owner() -> str:
+    """
+    Owner of the reports stored from the current session.
+
+    Without authentication, reports are scoped to the Streamlit session, which a page
+    reload replaces, unless ZASCA_REPORT_OWNER sets a fixed owner (e.g. for an app
+    used by a single team).
+
+    Returns:
+        The email of the signed-in user if the app uses authentication, otherwise
+        ZASCA_REPORT_OWNER or the id of the Streamlit session, so stored reports are
+        only listed to whoever generated them
+    """
+    if st.user.get("is_logged_in") and st.user.get("email"):
+        return f"user:{st.user.get('email')}"
+    if os.getenv("ZASCA_REPORT_OWNER"):
+        return f"user:{os.getenv('ZASCA_REPORT_OWNER')}"
+    ctx = get_script_run_ctx()
+    return f"session:{ctx.session_id}" if ctx else "session:local"
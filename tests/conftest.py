@@ -0,0 +1,136 @@
+"""Shared fixtures: the offline LLM stand-in, an in-process chart renderer and stores."""
+
+import os
+import struct
+import zlib
+from collections import OrderedDict
+import pytest
+
+# The Gemini client is created when src.services.gemini_api is imported
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+os.environ.setdefault("GEMINI_API_KEY", "fake")
+
+# pylint: disable=wrong-import-position
+from src.config.charts import chart_config
+from src.data.synthetic import SyntheticCohortConfig, write_cohort
+from src.models.sections import ReportSection
+from src.models.variables import VariableData
+from src.services.fake_llm import FakeLLMConfig, FakeLLMServer
+from src.utils import document, plot_downloads
+
+
+def png_image() -> bytes:
+    """A valid 1x1 PNG image."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data))
+        )
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(b"\x00\xff\xff\xff"))
+        + chunk(b"IEND", b"")
+    )
+
+
+def variable(name: str, initial, final) -> VariableData:
+    """Processed variable with the given values at baseline and closing."""
+    return VariableData(
+        variable=name,
+        description=f"Descripción de {name}",
+        value_initial_intervention=initial,
+        value_final_intervention=final,
+        interpretation=f"Interpretación de {name}",
+    )
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Serve the OpenAI and Gemini APIs from services/fake_llm, without delays.
+
+    Tests can change server.config, e.g. to inject rate limit errors.
+    """
+    with FakeLLMServer(FakeLLMConfig(time_scale=0.0)) as server:
+        # Clients are created per event loop, from the environment at that time
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{server.base_url}/v1")
+        monkeypatch.setenv("GEMINI_BASE_URL", server.base_url)
+        yield server
+
+
+@pytest.fixture(scope="session")
+def cohort_workbook(tmp_path_factory):
+    """Synthetic cohort workbook with the layout of the real exports."""
+    path = tmp_path_factory.mktemp("data") / "cohorte.xlsx"
+    return write_cohort(SyntheticCohortConfig(n_firms=40, seed=1), path)
+
+
+@pytest.fixture
+def report_store(monkeypatch, tmp_path):
+    """Report store in a temporary directory."""
+    # pylint: disable=import-outside-toplevel
+    from src.services.report_store import get_report_store
+
+    monkeypatch.setenv("ZASCA_REPORT_STORE", str(tmp_path / "report_store"))
+    return get_report_store()
+
+
+@pytest.fixture
+def chart_renderer(monkeypatch):
+    """Render charts in a thread with a stub image instead of kaleido.
+
+    The chart figure is still built from its data, so charts whose data the chart
+    function cannot draw fail as they would with kaleido. Yields the list of the
+    charts rendered.
+    """
+    rendered = []
+
+    def render(chart_id, data, fmt):
+        config = chart_config[chart_id]
+        config["chart_func"](data, config["params"])
+        rendered.append(chart_id)
+        return png_image()
+
+    monkeypatch.setattr(plot_downloads, "CHART_RENDER_PROCESSES", 0)
+    monkeypatch.setattr(plot_downloads, "_chart_executor", None)
+    monkeypatch.setattr(plot_downloads, "_chart_cache", OrderedDict())
+    monkeypatch.setattr(plot_downloads, "_render_image", render)
+    monkeypatch.setattr(document, "_docx_cache", OrderedDict())
+    yield rendered
+    if plot_downloads._chart_executor is not None:  # pylint: disable=protected-access
+        plot_downloads._chart_executor.shutdown()  # pylint: disable=protected-access
+
+
+@pytest.fixture
+def quality_sections():
+    """Sections whose design_tools chart has a categorical variable.
+
+    software_design can be processed as categorical, in which case its values are
+    category percentages, which the multi_response chart cannot draw.
+    """
+    return [
+        ReportSection(
+            title="Mayor Calidad del Producto",
+            content="## MAYOR CALIDAD DEL PRODUCTO\nContenido de calidad.",
+            variables={
+                "software_design": variable(
+                    "software_design",
+                    {"CAD": 20.0, "Manual": 80.0},
+                    {"CAD": 45.0, "Manual": 55.0},
+                ),
+                "patterns_digitized": variable("patterns_digitized", 10.0, 30.0),
+                "patterns_prevcollections": variable(
+                    "patterns_prevcollections", 5.0, 15.0
+                ),
+            },
+        ),
+        ReportSection(
+            title="Talento Humano",
+            content="## TALENTO HUMANO\nContenido de talento.",
+            variables={"emp_total": variable("emp_total", 3.0, 4.5)},
+        ),
+    ]
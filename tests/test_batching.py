@@ -0,0 +1,151 @@
+"""Tests of the batching of small sections into shared structured requests."""
+
+import json
+import pytest
+from src.models.sections import APIResponse, ReportSection
+from src.models.variables import VariableData
+from src.services import api_helpers
+from src.services.api_helpers import (
+    BATCH_MAX_SECTIONS,
+    BATCH_MAX_VARIABLES,
+    generate_section_contents,
+    parse_batch_response,
+    plan_section_batches,
+)
+from src.services.runtime import run
+
+TITLES = ["Mayor Calidad del Producto", "Talento Humano", "Asociatividad"]
+
+
+def section(title: str, n_variables: int) -> ReportSection:
+    """Section with the given number of numeric variables."""
+    return ReportSection(
+        title=title,
+        content="",
+        variables={
+            f"var_{i}": VariableData(
+                variable=f"var_{i}",
+                description=f"Variable {i}",
+                value_initial_intervention=1.0,
+                value_final_intervention=2.0,
+                interpretation=f"La variable {i} pasó de 1 a 2.",
+            )
+            for i in range(n_variables)
+        },
+    )
+
+
+def titles(sections) -> list:
+    return [s.title for s in sections]
+
+
+def test_plan_batches_small_sections_up_to_the_batch_size():
+    small = [section(f"Pequeña {i}", BATCH_MAX_VARIABLES) for i in range(7)]
+    large = section("Grande", BATCH_MAX_VARIABLES + 1)
+
+    individual, batches = plan_section_batches([large] + small)
+
+    assert [len(batch) for batch in batches] == [BATCH_MAX_SECTIONS] * 2
+    assert titles(batches[0]) == titles(small[:BATCH_MAX_SECTIONS])
+    # A single small section left over is requested on its own
+    assert titles(individual) == ["Grande"] + titles(small[2 * BATCH_MAX_SECTIONS :])
+
+
+@pytest.mark.parametrize("n_small", [0, 1])
+def test_plan_without_enough_small_sections(n_small):
+    sections = [section(f"Pequeña {i}", 1) for i in range(n_small)]
+
+    assert plan_section_batches(sections) == (sections, [])
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "no es JSON",
+        '{"Talento Humano": "## TALENTO HUMANO\\nTexto."',  # Cut short
+        '["## TALENTO HUMANO\\nTexto.", "## ASOCIATIVIDAD\\nTexto."]',
+        '{"Talento Humano": "## TALENTO HUMANO\\nTexto."}',  # Missing a section
+        '{"Talento Humano": "## TALENTO HUMANO\\nTexto.", "Asociatividad": " "}',
+        '{"Talento Humano": "## TALENTO HUMANO\\nTexto.", "Asociatividad": 3}',
+    ],
+    ids=["not-json", "truncated", "not-object", "missing", "empty", "not-text"],
+)
+def test_parse_invalid_batch_responses(text):
+    assert parse_batch_response(text, ["Talento Humano", "Asociatividad"]) is None
+
+
+def test_parse_batch_response_ignores_extra_sections_and_code_fences():
+    contents = {
+        "Talento Humano": "## TALENTO HUMANO\nTexto.",
+        "Asociatividad": "## ASOCIATIVIDAD\nTexto.",
+    }
+    text = "```json\n" + json.dumps({**contents, "Financiero": "Otro"}) + "\n```"
+
+    assert parse_batch_response(text, list(contents)) == contents
+
+
+@pytest.fixture
+def stub_caller(monkeypatch):
+    """Answer section calls with their title and batch calls with batch["response"].
+
+    Returns the purposes of the calls made, and the batch dict to set the response in.
+    """
+    calls = []
+    batch = {"response": ""}
+
+    def get_api_caller(model_name, purpose="section"):
+        async def call(section, prompt, model_name, **kwargs):
+            calls.append(purpose)
+            content = batch["response"] if purpose == "batch" else section.title
+            return APIResponse(status="success", data={"content": content})
+
+        return call
+
+    monkeypatch.setattr(api_helpers, "get_api_caller", get_api_caller)
+    return calls, batch
+
+
+def test_batch_falls_back_to_individual_calls(stub_caller):
+    calls, batch = stub_caller
+    batch["response"] = '{"Talento Humano": "Texto."}'
+    sections = [section(title, 1) for title in TITLES]
+
+    run(
+        generate_section_contents(
+            sections, "", "gpt-3.5-turbo", batch_small_sections=True
+        )
+    )
+
+    assert calls == ["batch"] + ["section"] * len(TITLES)
+    assert titles(sections) == [s.content for s in sections]
+
+
+def test_batch_contents_are_assigned_to_their_sections(stub_caller):
+    calls, batch = stub_caller
+    batch["response"] = json.dumps({title: f"## {title}" for title in TITLES})
+    sections = [section(title, 1) for title in TITLES]
+
+    run(
+        generate_section_contents(
+            sections, "", "gpt-3.5-turbo", batch_small_sections=True
+        )
+    )
+
+    assert calls == ["batch"]
+    assert [s.content for s in sections] == [f"## {title}" for title in TITLES]
+    assert all(s.usage["batch_size"] == len(TITLES) for s in sections)
+
+
+def test_batching_with_the_fake_provider(fake_llm):
+    sections = [section(title, 1) for title in TITLES]
+
+    run(
+        generate_section_contents(
+            sections, "", "gpt-3.5-turbo", batch_small_sections=True
+        )
+    )
+
+    assert fake_llm.stats["requests"] == 1
+    assert [s.content.split("\n", 1)[0] for s in sections] == [
+        f"## {title.upper()}" for title in TITLES
+    ]
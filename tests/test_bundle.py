@@ -0,0 +1,88 @@
+"""Tests of the ZIP bundle with every artifact of a report."""
+
+import csv
+import io
+import json
+import zipfile
+from src.utils.bundle import report_bundle_entries, stored_bundle_entries, write_zip
+from src.utils.constants import (
+    CHARTS_DIRNAME,
+    DOCX_FILENAMES,
+    JSON_FILENAME,
+    VARIABLES_CSV_FILENAME,
+)
+
+REPORT_JSON = json.dumps({"resumen": "Resumen"}).encode("utf-8")
+
+
+def open_bundle(entries) -> zipfile.ZipFile:
+    """Write a bundle in memory and open it."""
+    fileobj = io.BytesIO()
+    write_zip(entries, fileobj)
+    return zipfile.ZipFile(io.BytesIO(fileobj.getvalue()))
+
+
+def test_bundle_entries(chart_renderer, quality_sections):
+    documents = {version: (lambda v=version: v.encode()) for version in DOCX_FILENAMES}
+
+    with open_bundle(
+        report_bundle_entries(quality_sections, lambda: REPORT_JSON, documents)
+    ) as archive:
+        # design_tools cannot be drawn from the category percentages: it is left out
+        assert archive.namelist() == [
+            JSON_FILENAME,
+            DOCX_FILENAMES["edited"],
+            DOCX_FILENAMES["unedited"],
+            VARIABLES_CSV_FILENAME,
+            f"{CHARTS_DIRNAME}/emp_total.png",
+            f"{CHARTS_DIRNAME}/emp_total.svg",
+        ]
+        assert archive.read(JSON_FILENAME) == REPORT_JSON
+        assert archive.read(DOCX_FILENAMES["edited"]) == b"edited"
+        assert archive.read(f"{CHARTS_DIRNAME}/emp_total.png").startswith(b"\x89PNG")
+        rows = list(
+            csv.reader(
+                io.StringIO(archive.read(VARIABLES_CSV_FILENAME).decode("utf-8-sig"))
+            )
+        )
+
+    assert [row[:2] for row in rows[1:]] == [
+        [section.title, name]
+        for section in quality_sections
+        for name in section.variables
+    ]
+    assert json.loads(rows[1][4]) == {"CAD": 45.0, "Manual": 55.0}
+
+
+def test_charts_are_rendered_when_written(chart_renderer, quality_sections):
+    def report_json():
+        # Nothing is rendered before the first entry is written
+        assert not chart_renderer
+        return REPORT_JSON
+
+    entries = report_bundle_entries(quality_sections, report_json, {})
+    assert not chart_renderer
+
+    with open_bundle(entries) as archive:
+        assert f"{CHARTS_DIRNAME}/emp_total.svg" in archive.namelist()
+
+
+def test_stored_report_bundle(chart_renderer, report_store, quality_sections):
+    stored_png = f"{CHARTS_DIRNAME}/emp_total.png"
+    report_id = report_store.save_report(
+        quality_sections,
+        "Resumen",
+        "## TALENTO HUMANO\nTexto.",
+        "centro: Pruebas",
+        "h",
+        {},
+        {JSON_FILENAME: REPORT_JSON, stored_png: b"imagen guardada"},
+    )
+
+    with open_bundle(stored_bundle_entries(report_id)) as archive:
+        assert archive.read(JSON_FILENAME) == REPORT_JSON
+        assert archive.read(stored_png) == b"imagen guardada"
+        edited = archive.read(DOCX_FILENAMES["edited"])
+
+    # The documents built for the bundle were saved with the report
+    assert report_store.get_artifact(report_id, DOCX_FILENAMES["edited"]) == edited
@@ -0,0 +1,150 @@
+"""Tests of the coalescing of identical concurrent LLM calls."""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+from benchmarks.pipeline import run_benchmark
+from src.models.sections import APIResponse
+from src.services.api_helpers import get_api_caller
+from src.services.coalescing import coalesce, prompt_key
+from src.services.runtime import run
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Makes a slow call through coalesce and prints the pid of the process that made it
+CALLER = """
+import asyncio, os
+from src.models.sections import APIResponse
+from src.services.coalescing import coalesce
+
+async def call():
+    await asyncio.sleep(1)
+    return APIResponse(status="success", message="ok", data={"pid": os.getpid()})
+
+print(asyncio.run(coalesce("k" * 64, call)).data["pid"])
+"""
+
+
+def counting_call(calls: list, delay: float = 0.1, error=None):
+    """Call recording each request it makes."""
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return APIResponse(status="success", message="ok", data={"content": "texto"})
+
+    return call
+
+
+def test_identical_concurrent_calls_share_one_request():
+    calls = []
+    key = prompt_key("gpt-3.5-turbo", "prompt")
+
+    async def main():
+        return await asyncio.gather(
+            *(coalesce(key, counting_call(calls)) for _ in range(5)),
+            coalesce(prompt_key("gpt-3.5-turbo", "otro"), counting_call(calls)),
+        )
+
+    responses = run(main())
+
+    assert len(calls) == 2
+    assert [bool(r.data.get("coalesced")) for r in responses] == [False] + [
+        True
+    ] * 4 + [False]
+    # Sequential calls are not coalesced: it is not a cache
+    run(coalesce(key, counting_call(calls)))
+    assert len(calls) == 3
+
+
+def test_waiting_calls_get_the_error_of_the_shared_call():
+    calls = []
+    key = prompt_key("gpt-3.5-turbo", "falla")
+
+    async def main():
+        return await asyncio.gather(
+            *(
+                coalesce(key, counting_call(calls, error=ValueError()))
+                for _ in range(3)
+            ),
+            return_exceptions=True,
+        )
+
+    assert all(isinstance(result, ValueError) for result in run(main()))
+    assert len(calls) == 1
+
+
+def test_waiting_call_runs_its_own_when_the_shared_one_is_cancelled():
+    calls = []
+    key = prompt_key("gpt-3.5-turbo", "cancelada")
+
+    async def main():
+        leader = asyncio.create_task(coalesce(key, counting_call(calls, 1.0)))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(coalesce(key, counting_call(calls)))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert run(main()).data["content"] == "texto"
+    assert len(calls) == 2
+
+
+def test_calls_are_coalesced_across_processes(tmp_path):
+    env = {**os.environ, "ZASCA_COALESCING_DIR": str(tmp_path), "PYTHONPATH": ROOT}
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", CALLER], cwd=ROOT, env=env, stdout=subprocess.PIPE
+        )
+        for _ in range(3)
+    ]
+    pids = {process.communicate(timeout=60)[0].strip() for process in processes}
+
+    assert len(pids) == 1
+    # Lock files are removed with their call
+    assert not list(tmp_path.glob("*.lock"))
+
+
+def test_api_caller_coalesces_requests(fake_llm):
+    caller = get_api_caller("gpt-3.5-turbo")
+
+    async def main():
+        return await asyncio.gather(
+            *(caller(None, "Mismo prompt", "gpt-3.5-turbo") for _ in range(4))
+        )
+
+    responses = run(main())
+
+    assert all(response.status == "success" for response in responses)
+    assert fake_llm.stats["requests"] == 1
+
+
+def test_benchmark_reports_are_not_coalesced(monkeypatch, fake_llm, cohort_workbook):
+    monkeypatch.setenv("ZASCA_REPORT_STORE", "")
+    args = argparse.Namespace(
+        data=str(cohort_workbook),
+        firms=None,
+        fake_seed=0,
+        model="gpt-3.5-turbo",
+        runs=1,
+        concurrency=1,
+        summary_mode="standard",
+        batch_sections=False,
+        routing_policy="selected",
+        edit=False,
+        targets=["report_json", "executive_summary"],
+        cohort_info="centro: Benchmark, cohorte: 1",
+    )
+    run(run_benchmark(args, fake_llm))
+    requests_per_report = fake_llm.stats["requests"]
+
+    args.concurrency = 3
+    run(run_benchmark(args, fake_llm))
+
+    # Every concurrent report sends its own calls
+    assert requests_per_report > 1
+    assert fake_llm.stats["requests"] == 4 * requests_per_report
@@ -0,0 +1,148 @@
+"""Tests of the compaction of the interpretations sent in the section prompts."""
+
+import logging
+import re
+import pandas as pd
+import pytest
+from src.config.generation import COMPACTION_MIN_SHARE
+from src.config.sections import CATEGORICAL_MAPPINGS
+from src.data.processors.array import ArrayProcessor
+from src.data.processors.categorical import CategoricalProcessor
+from src.models.sections import ReportSection
+from src.models.variables import VariableData
+from src.services.compaction import compact_interpretations
+
+PACKAGING = CATEGORICAL_MAPPINGS["packaging"]
+BOOKKEEPING = CATEGORICAL_MAPPINGS["bookkeeping"]
+
+# Category lines of the processors' interpretations
+CATEGORICAL_LINE = re.compile(r"^- (.+): pasó de (\d+)% a (\d+)% \((.+)\)$")
+ARRAY_LINE = re.compile(r"^'(.+)': (\d+)% → (\d+)% \((.+)\)$")
+# Category lines of the compacted interpretations
+COMPACT_LINE = re.compile(r"^- (.+): (\d+)% → (\d+)% \((.+)\)$")
+
+
+@pytest.fixture
+def section():
+    """Section with two categorical variables sharing their long labels.
+
+    Of 100 firms, packaging has a category with a 9% share and one with none, and
+    bookkeeping (multiple choice) has an option with a 1% share.
+    """
+    df = pd.DataFrame(
+        {
+            "empaque": [PACKAGING[0]] * 60 + [PACKAGING[1]] * 40,
+            "empaquec": [PACKAGING[0]] * 30 + [PACKAGING[1]] * 61 + [PACKAGING[2]] * 9,
+            "etiqueta": [PACKAGING[1]] * 100,
+            "etiquetac": [PACKAGING[1]] * 50 + [PACKAGING[2]] * 50,
+            "libros": [f"{BOOKKEEPING[0]};{BOOKKEEPING[4]}"] + [BOOKKEEPING[6]] * 99,
+            "librosc": [BOOKKEEPING[8]] * 70 + [BOOKKEEPING[4]] * 30,
+        }
+    )
+    description = "Tipo de empaque de los productos"
+    variables = [
+        CategoricalProcessor().process(
+            df, (initial, final), {"description": description, "mapping": PACKAGING}
+        )
+        for initial, final in (("empaque", "empaquec"), ("etiqueta", "etiquetac"))
+    ]
+    variables.append(
+        ArrayProcessor().process(
+            df, ("libros", "librosc"), {"description": "Registro contable"}
+        )
+    )
+    # Two numeric variables with the same interpretation
+    for name in ("emp_total", "emp_total_dup"):
+        variables.append(
+            VariableData(
+                variable=name,
+                description="Empleo total",
+                value_initial_intervention=3.0,
+                value_final_intervention=4.5,
+                interpretation="El empleo total pasó de 3 a 4.5 (50%).",
+            )
+        )
+
+    return ReportSection(
+        title="Mayor Calidad del Producto",
+        content="",
+        variables={data.variable: data for data in variables},
+    )
+
+
+def interpreted_shares(section: ReportSection) -> set:
+    """Category, baseline, closing and change of each line of the interpretations."""
+    shares = set()
+    for data in section.variables.values():
+        for line in data.interpretation.splitlines():
+            match = CATEGORICAL_LINE.match(line) or ARRAY_LINE.match(line)
+            if match:
+                shares.add(match.groups())
+    return shares
+
+
+def legend(text: str) -> dict:
+    """Codes of the legend of a compacted text, with the label each one stands for."""
+    if "Leyenda de categorías:" not in text:
+        return {}
+    lines = text.split("Leyenda de categorías:\n", 1)[1].splitlines()
+    return dict(line.split(" = ", 1) for line in lines)
+
+
+def compacted_shares(text: str, labels: dict) -> set:
+    """Category, baseline, closing and change of each line of a compacted text."""
+    shares = set()
+    for line in text.splitlines():
+        match = COMPACT_LINE.match(line)
+        if match:
+            label, initial, final, change = match.groups()
+            shares.add((labels.get(label, label), initial, final, change))
+    return shares
+
+
+def test_compaction_keeps_every_percentage(section):
+    text = compact_interpretations(section, token_budget=None)
+
+    expected = {
+        share
+        for share in interpreted_shares(section)
+        if max(int(share[1]), int(share[2])) > COMPACTION_MIN_SHARE
+    }
+    assert compacted_shares(text, legend(text)) == expected
+    # The 9% category is kept, the 1% option is summarised
+    assert (PACKAGING[2], "0", "9", "0%") in expected
+    assert "- Otra categoría: 1% o menos en ambos momentos" in text
+
+
+def test_compaction_legend_round_trips(section):
+    text = compact_interpretations(section, token_budget=None)
+    codes = legend(text)
+
+    # The packaging labels appear in both variables, so they are coded once
+    assert sorted(codes.values()) == sorted(PACKAGING)
+    body = text.split("Leyenda de categorías:", 1)[0]
+    assert not any(label in body for label in PACKAGING)
+    for label in re.findall(r"^- (L\d+):", body, re.MULTILINE):
+        assert label in codes
+
+
+def test_compaction_removes_duplicates(section):
+    text = compact_interpretations(section, token_budget=None)
+
+    assert text.count("El empleo total pasó de 3 a 4.5 (50%).") == 1
+    assert text.count("Tipo de empaque de los productos:") == 1
+    assert "[empaque]" in text and "[etiqueta]" in text
+
+
+def test_compaction_over_budget_keeps_every_category(section, caplog):
+    full = compact_interpretations(section, token_budget=None)
+
+    with caplog.at_level(logging.WARNING, logger="src.services.compaction"):
+        text = compact_interpretations(section, token_budget=10)
+
+    assert len(text) < len(full)
+    assert "over the budget" in caplog.text
+    # Labels are abbreviated, but no category or percentage is dropped
+    assert {share[1:] for share in compacted_shares(text, {})} == {
+        share[1:] for share in compacted_shares(full, legend(full))
+    }
@@ -0,0 +1,91 @@
+"""Tests of the Word documents and the chart images they embed."""
+
+import io
+import zipfile
+from src.pipeline.report import build_documents, store_documents
+from src.utils.document import get_word_doc, stored_docx_name, word_doc_key
+from src.utils.plot_downloads import chart_data, chart_key
+
+
+def docx_images(content: bytes) -> list:
+    """Names of the images embedded in a Word document."""
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        return [name for name in archive.namelist() if name.startswith("word/media/")]
+
+
+def test_chart_key_hashes_category_percentages(quality_sections):
+    variables = quality_sections[0].variables
+    data = chart_data("design_tools", variables)
+
+    key = chart_key("design_tools", data)
+
+    assert key == chart_key("design_tools", chart_data("design_tools", variables))
+    variables["software_design"].value_final_intervention = {
+        "CAD": 50.0,
+        "Manual": 50.0,
+    }
+    assert key != chart_key("design_tools", chart_data("design_tools", variables))
+
+
+def test_word_doc_key_with_categorical_multi_response(quality_sections):
+    edited = word_doc_key("Resumen", "## MAYOR CALIDAD DEL PRODUCTO", quality_sections)
+    unedited = word_doc_key("Resumen", "", quality_sections, edited=False)
+
+    assert edited.startswith("edited:") and unedited.startswith("unedited:")
+    assert (
+        word_doc_key(
+            "Resumen", "## MAYOR CALIDAD DEL PRODUCTO", quality_sections, charts=False
+        )
+        != edited
+    )
+
+
+def test_word_doc_skips_charts_that_cannot_be_drawn(chart_renderer, quality_sections):
+    content = get_word_doc(
+        "Resumen",
+        "## MAYOR CALIDAD DEL PRODUCTO\nTexto.\n## TALENTO HUMANO\nTexto.",
+        quality_sections,
+        charts=True,
+    )
+
+    # design_tools fails on the category percentages, emp_total is embedded
+    assert chart_renderer == ["emp_total"]
+    assert len(docx_images(content)) == 1
+
+
+def test_documents_without_charts(chart_renderer, quality_sections):
+    documents = build_documents(
+        quality_sections, "Resumen", "## TALENTO HUMANO\nTexto.", include_charts=False
+    )
+
+    assert set(documents) == {"edited", "unedited"}
+    assert not chart_renderer
+    assert not any(docx_images(content) for content in documents.values())
+
+
+def test_stored_documents_keep_their_charts_setting(
+    chart_renderer, report_store, quality_sections
+):
+    edited_output = "## TALENTO HUMANO\nTexto."
+    report_id = report_store.save_report(
+        quality_sections, "Resumen", edited_output, "", "h", {}
+    )
+    documents = build_documents(
+        quality_sections, "Resumen", edited_output, include_charts=False
+    )
+    store_documents(report_id, documents, include_charts=False)
+
+    def stored(charts):
+        try:
+            return report_store.get_artifact(
+                report_id, stored_docx_name("edited", charts)
+            )
+        except KeyError:
+            return None
+
+    # A document with charts is built rather than loaded from the one without them
+    content = get_word_doc(
+        "Resumen", edited_output, quality_sections, load=lambda: stored(True)
+    )
+    assert stored(False) == documents["edited"]
+    assert len(docx_images(content)) == 1
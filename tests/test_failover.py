@@ -0,0 +1,160 @@
+"""Tests of the provider failover and its circuit breakers."""
+
+import asyncio
+import json
+import os
+import pytest
+from src.models.sections import APIResponse
+from src.services import failover, throughput
+from src.services.failover import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    call_timeout,
+    call_with_failover,
+    get_breaker,
+)
+from src.services.runtime import run
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch, tmp_path):
+    """Start every test with closed breakers and no recorded throughput."""
+    monkeypatch.setattr(failover, "_breakers", {})
+    monkeypatch.setenv("ZASCA_THROUGHPUT_HISTORY", str(tmp_path / "history.json"))
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """Stub provider callers; set behaviour[provider] to "ok", "error" or a delay."""
+    behaviour = {"openai": "ok", "gemini": "ok"}
+    calls = []
+
+    def caller_for(model_name):
+        provider = failover.provider_of(model_name)
+
+        async def call(section, prompt, model_name, **kwargs):
+            calls.append(model_name)
+            outcome = behaviour[provider]
+            if isinstance(outcome, float):
+                await asyncio.sleep(outcome)
+            elif outcome == "error":
+                return APIResponse(status="error", message=f"{provider} down")
+            return APIResponse(
+                status="success", message="ok", data={"content": model_name}
+            )
+
+        return call
+
+    monkeypatch.setattr(failover, "get_provider_caller", caller_for)
+    return behaviour, calls
+
+
+def test_breaker_opens_half_opens_and_closes(monkeypatch):
+    breaker = CircuitBreaker("openai")
+    for success in (True, False, False, False):
+        breaker.record(success)
+
+    assert breaker.state == OPEN and breaker.is_open
+    assert not breaker.allow_request()
+
+    monkeypatch.setattr(failover, "FAILOVER_OPEN_S", 0)
+    assert breaker.allow_request()  # The probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()  # Only one probe at a time
+
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.allow_request()
+    breaker.record(True)
+    assert breaker.state == CLOSED and breaker.allow_request()
+
+
+def test_breaker_stays_closed_below_the_failure_rate():
+    breaker = CircuitBreaker("gemini")
+    for success in (True, False, True, False, True):
+        breaker.record(success)
+
+    assert breaker.state == CLOSED
+
+
+def test_call_timeout_covers_the_longest_output():
+    # 4096 tokens plus three 2048-token continuations at about 25 tokens per second
+    assert call_timeout("gpt-4-0125-preview") > 10240 / 25
+    assert call_timeout("gpt-3.5-turbo") < call_timeout("gpt-4-0125-preview")
+    assert call_timeout("gemini-2.0-flash") >= failover.FAILOVER_MIN_CALL_TIMEOUT_S
+
+
+def test_call_timeout_reloads_the_history_only_when_it_changes(monkeypatch):
+    loads = []
+    load_history = throughput.load_history
+    monkeypatch.setattr(
+        throughput, "load_history", lambda: loads.append(1) or load_history()
+    )
+    default = call_timeout("gpt-4-0125-preview")
+    assert call_timeout("gpt-4-0125-preview") == default
+    assert len(loads) == 1
+
+    # Recorded calls four times as fast as the default throughput
+    call = {"prompt_tokens": 100, "completion_tokens": 1000, "duration_s": 11.2}
+    with open(os.environ["ZASCA_THROUGHPUT_HISTORY"], "w", encoding="utf-8") as f:
+        json.dump({"gpt-4-0125-preview": [call] * 3}, f)
+
+    assert call_timeout("gpt-4-0125-preview") < default
+    call_timeout("gpt-4-0125-preview")
+    assert len(loads) == 2
+
+
+def test_failed_call_is_retried_on_the_alternate_model(providers):
+    behaviour, calls = providers
+    behaviour["openai"] = "error"
+
+    response = run(call_with_failover(None, "prompt", "gpt-4-0125-preview"))
+
+    assert response.status == "success"
+    assert calls == ["gpt-4-0125-preview", failover.FALLBACK_MODELS["openai"]]
+
+
+def test_open_breaker_sends_calls_to_the_alternate_model(providers):
+    _, calls = providers
+    for _ in range(failover.FAILOVER_MIN_CALLS):
+        get_breaker("openai").record(False)
+
+    response = run(call_with_failover(None, "prompt", "gpt-3.5-turbo"))
+
+    assert response.data["content"] == failover.FALLBACK_MODELS["openai"]
+    assert calls == [failover.FALLBACK_MODELS["openai"]]
+
+
+def test_slow_successful_calls_are_not_failures(monkeypatch, providers):
+    behaviour, calls = providers
+    behaviour["openai"] = 0.3
+    monkeypatch.setattr(failover, "call_timeout", lambda model_name: 5.0)
+
+    for _ in range(failover.FAILOVER_MIN_CALLS):
+        response = run(call_with_failover(None, "prompt", "gpt-3.5-turbo"))
+        assert response.status == "success"
+
+    assert get_breaker("openai").state == CLOSED
+    assert set(calls) == {"gpt-3.5-turbo"}
+
+
+def test_timed_out_call_is_abandoned_and_retried(monkeypatch, providers):
+    behaviour, calls = providers
+    behaviour["openai"] = 5.0
+    monkeypatch.setattr(failover, "call_timeout", lambda model_name: 0.1)
+
+    response = run(call_with_failover(None, "prompt", "gpt-3.5-turbo"))
+
+    assert response.data["content"] == failover.FALLBACK_MODELS["openai"]
+    assert calls == ["gpt-3.5-turbo", failover.FALLBACK_MODELS["openai"]]
+    # pylint: disable=protected-access
+    assert [failed for _, failed in get_breaker("openai")._outcomes] == [True]
+
+
+def test_failover_with_the_fake_provider(fake_llm):
+    response = run(call_with_failover(None, "Hola", "gemini-2.0-flash"))
+
+    assert response.status == "success" and response.data["content"]
+    assert fake_llm.stats["requests"] == 1
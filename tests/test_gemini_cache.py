@@ -0,0 +1,111 @@
+"""Tests of the registry of Gemini cached contents."""
+
+import datetime
+import time
+from types import SimpleNamespace
+import pytest
+from src.services import gemini_cache
+from src.services.gemini_cache import (
+    cache_key,
+    get_cached_content,
+    invalidate_cached_content,
+)
+
+MODEL = "gemini-2.0-flash"
+SYSTEM_PROMPT = "Instrucciones del sistema. " * 200
+
+
+class FakeCaches:
+    """The caches API of a client, counting the list and create calls."""
+
+    def __init__(self, existing=()):
+        self.contents = list(existing)
+        self.lists = 0
+        self.created = []
+
+    def list(self):
+        self.lists += 1
+        return list(self.contents)
+
+    def create(self, model, config):
+        cached = cached_content(
+            f"cachedContents/{len(self.created)}", config.display_name
+        )
+        self.created.append(cached)
+        self.contents.append(cached)
+        return cached
+
+
+def cached_content(name: str, display_name: str, ttl_s: float = 3600):
+    expire_time = datetime.datetime.fromtimestamp(
+        time.time() + ttl_s, datetime.timezone.utc
+    )
+    return SimpleNamespace(
+        name=name, display_name=display_name, expire_time=expire_time
+    )
+
+
+@pytest.fixture(autouse=True)
+def cold_start(monkeypatch):
+    """Start every test as a new process, with an empty registry."""
+    monkeypatch.setattr(gemini_cache, "_registry", {})
+    monkeypatch.setattr(gemini_cache, "_failures", {})
+    monkeypatch.setattr(gemini_cache, "_listed", False)
+
+
+def get(client, section: str):
+    return get_cached_content(client, MODEL, SYSTEM_PROMPT, f"Sección {section}")
+
+
+def test_cached_contents_are_listed_once_per_process():
+    other = cached_content(
+        "cachedContents/otro", cache_key(MODEL, SYSTEM_PROMPT, "Sección A")
+    )
+    caches = FakeCaches([other, cached_content("cachedContents/ajeno", "ajeno")])
+    client = SimpleNamespace(caches=caches)
+
+    # Found from another process, then created, then both from memory
+    assert get(client, "A") == "cachedContents/otro"
+    assert get(client, "B") == "cachedContents/0"
+    assert get(client, "A") == "cachedContents/otro"
+    assert get(client, "B") == "cachedContents/0"
+    assert caches.lists == 1 and len(caches.created) == 1
+
+
+def test_expired_and_invalidated_handles_are_replaced_without_listing():
+    caches = FakeCaches()
+    client = SimpleNamespace(caches=caches)
+    name = get(client, "A")
+
+    invalidate_cached_content(name)
+    assert get(client, "A") == "cachedContents/1"
+    # Expiring within the safety margin counts as expired
+    key = cache_key(MODEL, SYSTEM_PROMPT, "Sección A")
+    gemini_cache._registry[key] = (  # pylint: disable=protected-access
+        "cachedContents/1",
+        time.time() + gemini_cache.EXPIRY_MARGIN_SECONDS / 2,
+    )
+    assert get(client, "A") == "cachedContents/2"
+    assert caches.lists == 1
+
+
+def test_listing_errors_fall_back_to_uncached_requests():
+    class BrokenCaches(FakeCaches):
+        def list(self):
+            raise RuntimeError("caching not available")
+
+    client = SimpleNamespace(caches=BrokenCaches())
+
+    assert get(client, "A") is None
+    # Not retried until GEMINI_CACHE_RETRY_SECONDS have passed
+    assert get(client, "A") is None
+    assert not client.caches.created
+
+
+def test_short_prefixes_are_not_cached():
+    caches = FakeCaches()
+
+    assert (
+        get_cached_content(SimpleNamespace(caches=caches), MODEL, "Corto", "") is None
+    )
+    assert caches.lists == 0
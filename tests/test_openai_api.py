@@ -0,0 +1,49 @@
+"""Tests of the OpenAI caller's continuation stitching."""
+
+import pytest
+from src.services.openai_api import stitch_continuation
+
+TEXT = (
+    "## TALENTO HUMANO\n"
+    "El empleo total de las unidades productivas pasó de 3 a 4.5 personas, un"
+)
+
+
+@pytest.mark.parametrize(
+    "continuation, expected",
+    [
+        # Exact overlap: the continuation restarts with the last sentence
+        (
+            "productivas pasó de 3 a 4.5 personas, un aumento del 50%.",
+            TEXT + " aumento del 50%.",
+        ),
+        # Partial overlap: only the last words are repeated, after a space
+        (
+            " de 3 a 4.5 personas, un aumento del 50%.",
+            TEXT + " aumento del 50%.",
+        ),
+        # No overlap: the continuation is appended as it is
+        (" aumento del 50%.", TEXT + " aumento del 50%."),
+        # Too short to be told apart from a genuine continuation
+        (" un aumento del 50%.", TEXT + " un aumento del 50%."),
+        # Empty continuation
+        ("", TEXT),
+        # Restart from the very start of the text
+        ("\n" + TEXT + " aumento del 50%.", TEXT + " aumento del 50%."),
+    ],
+    ids=["exact", "partial", "none", "short", "empty", "restart"],
+)
+def test_stitch_continuation(continuation, expected):
+    assert stitch_continuation(TEXT, continuation) == expected
+
+
+def test_stitch_continuation_drops_a_repeated_heading():
+    continuation = "## TALENTO HUMANO\nEl empleo femenino también aumentó."
+
+    assert stitch_continuation(TEXT, continuation) == (
+        TEXT + "\nEl empleo femenino también aumentó."
+    )
+    # The rest of the continuation can still overlap the text
+    assert stitch_continuation(
+        TEXT, "## TALENTO HUMANO\nde 3 a 4.5 personas, un aumento del 50%."
+    ) == (TEXT + " aumento del 50%.")
@@ -0,0 +1,135 @@
+"""Tests of the pipeline engine and of the report pipeline."""
+
+import asyncio
+import pytest
+from src.pipeline.engine import Pipeline, PipelineError, Stage
+from src.pipeline.report import ReportOptions, run_report
+from src.services.runtime import run
+
+
+def record(log: list, name: str, value=None, delay: float = 0.0, error=None):
+    """Coroutine stage function appending its start and end to log."""
+
+    async def stage(**kwargs):
+        log.append(f"{name} started")
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        log.append(f"{name} finished")
+        return value if value is not None else sum(kwargs.values())
+
+    return stage
+
+
+def test_independent_stages_run_concurrently():
+    log = []
+    pipeline = Pipeline(
+        [
+            Stage(name="a", func=record(log, "a", 1, 0.05), outputs=["a"]),
+            Stage(name="b", func=record(log, "b", 2, 0.05), outputs=["b"]),
+            Stage(name="c", func=record(log, "c"), inputs=["a", "b"], outputs=["c"]),
+        ]
+    )
+
+    values = run(pipeline.run({}, ["c"]))
+
+    assert values["c"] == 3
+    assert log.index("b started") < log.index("a finished")
+    assert log[-2:] == ["c started", "c finished"]
+
+
+def test_only_needed_stages_run():
+    log = []
+    pipeline = Pipeline(
+        [
+            Stage(name="a", func=record(log, "a", 1), outputs=["a"]),
+            Stage(name="b", func=record(log, "b"), inputs=["a"], outputs=["b"]),
+            Stage(name="c", func=record(log, "c"), inputs=["x"], outputs=["c"]),
+        ]
+    )
+
+    values = run(pipeline.run({}, ["b"]))
+
+    assert values == {"a": 1, "b": 1}
+    assert "c started" not in log
+    # Given values are not recomputed
+    assert run(pipeline.run({"a": 5}, ["b"]))["b"] == 5
+
+
+def test_blocking_stages_and_several_outputs():
+    pipeline = Pipeline(
+        [
+            Stage(
+                name="split",
+                func=lambda n: {"half": n // 2, "rest": n - n // 2},
+                inputs=["n"],
+                outputs=["half", "rest"],
+                blocking=True,
+            )
+        ]
+    )
+
+    assert run(pipeline.run({"n": 5}))["rest"] == 3
+
+
+def test_failed_stage_cancels_the_others():
+    log = []
+    events = []
+    pipeline = Pipeline(
+        [
+            Stage(name="slow", func=record(log, "slow", 1, 5.0), outputs=["slow"]),
+            Stage(
+                name="broken",
+                func=record(log, "broken", error=ValueError("boom")),
+                outputs=["broken"],
+            ),
+        ]
+    )
+
+    with pytest.raises(PipelineError, match="Stage broken failed: boom"):
+        run(pipeline.run({}, on_event=events.append))
+
+    assert "slow finished" not in log
+    assert [(e.stage, e.status) for e in events][-1] == ("broken", "failed")
+
+
+def test_inconsistent_pipelines_are_rejected():
+    with pytest.raises(PipelineError, match="Cycle"):
+        Pipeline(
+            [
+                Stage(name="a", func=int, inputs=["b"], outputs=["a"]),
+                Stage(name="b", func=int, inputs=["a"], outputs=["b"]),
+            ]
+        )
+    with pytest.raises(PipelineError, match="No stage produces x"):
+        Pipeline([Stage(name="a", func=int, inputs=["x"], outputs=["a"])]).plan(
+            ["a"], []
+        )
+
+
+@pytest.mark.parametrize("summary_mode", ["standard", "hierarchical", "speculative"])
+def test_report_pipeline(fake_llm, report_store, cohort_workbook, summary_mode):
+    events = []
+
+    results = run(
+        run_report(
+            "centro: Pruebas, cohorte: 1",
+            ReportOptions(summary_mode=summary_mode),
+            workbook=cohort_workbook,
+            on_event=events.append,
+            owner="session:test",
+        )
+    )
+
+    sections = [s for s in results["generated_sections"] if s.content]
+    assert sections and results["executive_summary"]
+    # Only the hierarchical summary waits for a digest of each section
+    assert all(bool(s.digest) == (summary_mode == "hierarchical") for s in sections)
+    assert bool(results["draft_summary"]) == (summary_mode == "speculative")
+    started = [e.stage for e in events if e.status == "started"]
+    assert "charts" not in started and "docx" not in started
+
+    stored = report_store.get_report(results["report_id"], "session:test")
+    assert stored.executive_summary == results["executive_summary"]
+    assert stored.options["summary_mode"] == summary_mode
+    assert fake_llm.stats["requests"] > 0
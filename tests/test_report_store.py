@@ -0,0 +1,113 @@
+"""Tests of the report store."""
+
+import sqlite3
+from pathlib import Path
+import pandas as pd
+import pytest
+from src.services.report_store import ReportStore, hash_inputs
+from src.utils.state import get_report_owner
+
+
+def save(store: ReportStore, sections, owner=None, inputs_hash="h", artifacts=None):
+    """Store a report with fixed content."""
+    return store.save_report(
+        sections,
+        "Resumen",
+        "Texto editado",
+        "centro: Pruebas",
+        inputs_hash,
+        {"model_name": "gpt-3.5-turbo"},
+        artifacts,
+        owner,
+    )
+
+
+def test_report_round_trip(report_store, quality_sections):
+    report_id = save(report_store, quality_sections, artifacts={"report.json": b"{}"})
+
+    stored = report_store.get_report(report_id)
+    assert (stored.executive_summary, stored.edited_output) == (
+        "Resumen",
+        "Texto editado",
+    )
+    assert stored.options == {"model_name": "gpt-3.5-turbo"}
+    assert list(stored.artifacts) == ["report.json"]
+    assert report_store.get_artifact(report_id, "report.json") == b"{}"
+
+    sections = report_store.get_sections(report_id)
+    assert [s.title for s in sections] == [s.title for s in quality_sections]
+    assert sections[0].variables == quality_sections[0].variables
+
+
+def test_artifacts_are_stored_once(report_store, quality_sections):
+    first = save(report_store, quality_sections, artifacts={"a.png": b"imagen"})
+    second = save(report_store, quality_sections)
+
+    assert report_store.add_artifacts(second, {"b.png": b"imagen"}) == ["b.png"]
+    digest = report_store.get_report(first).artifacts["a.png"]
+    assert report_store.get_report(second).artifacts == {"b.png": digest}
+    assert len([p for p in Path(report_store.blobs_dir).rglob("*") if p.is_file()]) == 1
+
+
+def test_unknown_reports_and_artifacts(report_store, quality_sections):
+    report_id = save(report_store, quality_sections)
+
+    with pytest.raises(KeyError):
+        report_store.get_report("desconocido")
+    with pytest.raises(KeyError):
+        report_store.get_artifact(report_id, "report.json")
+    with pytest.raises(KeyError):
+        report_store.add_artifacts("desconocido", {"a.png": b"imagen"})
+
+
+def test_reports_are_scoped_to_their_owner(report_store, quality_sections):
+    mine = save(report_store, quality_sections, owner="session:a")
+    other = save(report_store, quality_sections, owner="session:b", inputs_hash="g")
+
+    assert [r.report_id for r in report_store.list_reports(owner="session:a")] == [mine]
+    assert report_store.get_report(mine, "session:a").owner == "session:a"
+    with pytest.raises(KeyError):
+        report_store.get_report(other, "session:a")
+    # Without an owner, the whole store is listed, most recent first
+    assert [r.report_id for r in report_store.list_reports()] == [other, mine]
+    assert [r.report_id for r in report_store.list_reports(inputs_hash="g")] == [other]
+
+
+def test_stores_without_owners_are_migrated(tmp_path, quality_sections):
+    with sqlite3.connect(tmp_path / "reports.db") as conn:
+        conn.execute(
+            "CREATE TABLE reports (report_id TEXT PRIMARY KEY, created_at REAL NOT NULL,"
+            " cohort_info TEXT NOT NULL, inputs_hash TEXT NOT NULL, options TEXT NOT"
+            " NULL, executive_summary TEXT NOT NULL, edited_output TEXT NOT NULL)"
+        )
+        conn.execute("INSERT INTO reports VALUES ('old', 1, '', 'h', '{}', 'r', 'e')")
+
+    store = ReportStore(str(tmp_path))
+    new = save(store, quality_sections, owner="session:a")
+
+    assert store.get_report("old").owner is None
+    assert [r.report_id for r in store.list_reports()] == [new, "old"]
+
+
+def test_hash_inputs_depends_on_every_input():
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    config = {"Sección": {"a": {}, "b": {}}}
+    options = {"model_name": "gpt-3.5-turbo"}
+    base = hash_inputs(df, config, "centro", options)
+
+    assert base == hash_inputs(
+        df.copy(), {"Sección": {"b": {}, "a": {}}}, "centro", options
+    )
+    assert base != hash_inputs(df.assign(a=[1, 3]), config, "centro", options)
+    assert base != hash_inputs(df, {"Sección": {"a": {}}}, "centro", options)
+    assert base != hash_inputs(df, config, "otro centro", options)
+    assert base != hash_inputs(df, config, "centro", {"model_name": "gpt-4"})
+
+
+def test_report_owner_without_authentication(monkeypatch):
+    monkeypatch.delenv("ZASCA_REPORT_OWNER", raising=False)
+    assert get_report_owner() == "session:local"
+
+    # A fixed owner keeps the reports listed across sessions
+    monkeypatch.setenv("ZASCA_REPORT_OWNER", "equipo")
+    assert get_report_owner() == "user:equipo"